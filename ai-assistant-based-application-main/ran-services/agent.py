@@ -2,17 +2,195 @@
 Simple ReACT Agent for RAN Troubleshooting
 Uses pure Python with vLLM for reasoning
 """
+from concurrent.futures import ThreadPoolExecutor
 import requests
 import json
-from typing import Dict, List, Any
+import os
+import re
+from typing import Dict, Iterator, List, Any
+
+class HttpToolBackend:
+    """Runs tools through the RAN Services REST API (remote deployments)"""
+
+    def __init__(self, ran_services_url: str):
+        self.ran_services_url = ran_services_url
+        self.session = requests.Session()
+
+    def call(self, tool_name: str, params: Dict) -> tuple:
+        """Return (HTTP status, decoded JSON body on 200 else response text)"""
+        if tool_name == "get_alarms":
+            url = f"{self.ran_services_url}/api/ran/alarms"
+            response = self.session.get(url, params=params, timeout=5)
+
+        elif tool_name == "get_incidents":
+            url = f"{self.ran_services_url}/api/ran/incidents"
+            response = self.session.get(url, params=params, timeout=5)
+
+        elif tool_name == "get_kpis":
+            site_id = params.get('site_id')
+            if site_id:
+                url = f"{self.ran_services_url}/api/ran/kpis/{site_id}"
+            else:
+                url = f"{self.ran_services_url}/api/ran/kpis"
+            response = self.session.get(url, params=params, timeout=5)
+
+        elif tool_name == "get_cell_details":
+            site_id = params.get('site_id', '')
+            url = f"{self.ran_services_url}/api/ran/cell-details/{site_id}"
+            response = self.session.get(url, timeout=5)
+
+        elif tool_name == "search_remediation":
+            url = f"{self.ran_services_url}/api/ran/search-remediation"
+            response = self.session.post(url, json=params, timeout=5)
+
+        if response.status_code == 200:
+            return 200, response.json()
+        return response.status_code, response.text
+
+
+class LocalToolBackend:
+    """Runs tools in-process through handler functions (tool name -> params -> (body, status))
+
+    Avoids the HTTP loopback into the serving process: no JSON round trip,
+    and no deadlock on a single-threaded dev server.
+    """
+
+    def __init__(self, tools: Dict):
+        self.tools = tools
+
+    def call(self, tool_name: str, params: Dict) -> tuple:
+        """Return (HTTP status, body dict on 200 else the error body as JSON text)"""
+        body, status = self.tools[tool_name](params)
+        if status == 200:
+            return 200, body
+        return status, json.dumps(body)
+
+
+TOOL_NAMES = ("get_alarms", "get_incidents", "get_kpis", "get_cell_details", "search_remediation")
+
+# Actions the model may request in one step; they run concurrently, shared by all agents
+MAX_ACTIONS_PER_STEP = 5
+tool_pool = ThreadPoolExecutor(max_workers=int(os.environ.get('AGENT_TOOL_WORKERS', 16)),
+                               thread_name_prefix='agent-tool')
+
+# Search modes ran-services answered with 503 (sentence-transformers not installed);
+# that does not change while it runs, so later calls go straight to keyword search
+unavailable_search_modes = set()
+
+SITE_PATTERN = re.compile(r'SITE-\d+')
+CELL_PATTERN = re.compile(r'CELL-\w+')
+
+# Tool calls started for the sites and cells named in the query while the model plans;
+# nearly every such query asks for them, so their latency overlaps the first vLLM call
+SITE_PREFETCH_TOOLS = ("get_alarms", "get_kpis", "get_cell_details")
+CELL_PREFETCH_TOOLS = ("get_alarms",)
+MAX_PREFETCH_ENTITIES = 3
+# Lines that end a multi-line Action Input
+STEP_PREFIXES = ('Action', 'Thought:', 'Final Answer:', 'Observation:')
+FINAL_ANSWER = 'Final Answer:'
+
+# Prompt history budget, estimated at CHARS_PER_TOKEN characters per token
+HISTORY_TOKEN_BUDGET = int(os.environ.get('AGENT_HISTORY_TOKENS', 3000))
+CHARS_PER_TOKEN = 4
+# Compaction frees history down to this fraction of the budget, so it happens rarely
+HISTORY_LOW_WATER = 0.75
+OMITTED_OBSERVATION = "Observation: [earlier result omitted, see the retrieved data]"
+
+# Static, byte-identical for every query and iteration: with vLLM prefix caching
+# (--enable-prefix-caching, on by default in the V1 engine) its KV cache is computed once
+SYSTEM_PROMPT = """You are an expert RAN (Radio Access Network) troubleshooting agent. Your goal is to help diagnose and resolve network issues.
+
+You have access to these tools:
+- get_incidents: Active alarms correlated into incidents per site, each with its likely root cause (start here)
+- get_alarms: Retrieve active alarms from the network
+- get_kpis: Get Key Performance Indicators for sites
+- get_cell_details: Get detailed cell-level RF metrics
+- search_remediation: Search for remediation playbooks based on symptoms
+
+Use the ReACT framework:
+1. Thought: Reason about what you need to do
+2. Action: Choose a tool to use
+3. Action Input: Specify the input for the tool
+4. Observation: The tool will return data
+5. Repeat until you have enough information
+6. Final Answer: Provide your conclusion and recommendations
+
+Format your response exactly like this:
+Thought: [your reasoning]
+Action: [tool name]
+Action Input: [input for the tool]
+
+If you need several independent tools (for example alarms, KPIs and cell details for the same site),
+request them together by repeating the Action / Action Input lines; they run at the same time and you
+get one Observation per action.
+
+After seeing the observations, either:
+- Continue with another Thought/Action/Action Input
+- Or provide: Final Answer: [your complete response]
+"""
+
+
+class PromptHistory:
+    """ReAct prompt as a fixed prefix plus completed turns, bounded by a token budget
+
+    Turns are only appended, so each iteration's prompt extends the previous
+    one and vLLM reuses the cached prefix; only the newest turn is prefilled.
+    Over budget, the oldest turns' observations are replaced with a short
+    note (their data stays in retrieved_data), then the oldest turns dropped.
+    """
+
+    def __init__(self, prefix: str, budget_tokens: int = HISTORY_TOKEN_BUDGET):
+        self.prefix = prefix
+        self.budget_chars = budget_tokens * CHARS_PER_TOKEN
+        self.turns = []  # [thought, observations, rendered text]
+        self.size = 0
+        self.compacted = 0
+        self.dropped = 0
+
+    @staticmethod
+    def render(thought: str, observations: List[str]) -> str:
+        return f"Thought: {thought}\n" + "\n".join(observations) + "\n\n"
+
+    def add(self, thought: str, observations: List[str]):
+        text = self.render(thought, observations)
+        self.turns.append([thought, observations, text])
+        self.size += len(text)
+        if self.size > self.budget_chars:
+            self.shrink(int(self.budget_chars * HISTORY_LOW_WATER))
+
+    def shrink(self, target_chars: int):
+        # The newest turn is always kept whole
+        for turn in self.turns[:-1]:
+            if self.size <= target_chars:
+                return
+            thought, observations, text = turn
+            if observations != [OMITTED_OBSERVATION]:
+                turn[1] = [OMITTED_OBSERVATION]
+                turn[2] = self.render(thought, turn[1])
+                self.size += len(turn[2]) - len(text)
+                self.compacted += 1
+        while self.size > target_chars and len(self.turns) > 1:
+            self.size -= len(self.turns.pop(0)[2])
+            self.dropped += 1
+
+    def prompt(self) -> str:
+        return self.prefix + "".join(turn[2] for turn in self.turns)
+
 
 class RANAgent:
-    def __init__(self, vllm_url: str, ran_services_url: str):
+    def __init__(self, vllm_url: str, ran_services_url: str = None, tool_backend=None):
         self.vllm_url = vllm_url
         self.ran_services_url = ran_services_url
+        self.tools = tool_backend or HttpToolBackend(ran_services_url)
         self.steps = []  # Track agent workflow steps
         self.retrieved_data = {}  # Track retrieved data
+        self.prefetched = {}  # (tool, params) -> Future of a speculative tool call
         self.max_iterations = 5
+        # Stream completions so generation stops as soon as the step's actions are complete
+        self.stream = os.environ.get('VLLM_STREAM', 'true').lower() == 'true'
+        self._emitted_steps = 0
+        # Free-text Action Input matches far more playbooks with embedding + BM25 ranking
+        self.search_mode = os.environ.get('REMEDIATION_SEARCH_MODE', 'hybrid')
 
     def log_step(self, step_type: str, action: str, observation: str = None):
         """Log agent workflow step"""
@@ -29,35 +207,31 @@ class RANAgent:
 
     def call_tool(self, tool_name: str, params: Dict = None) -> Dict:
         """Call a RAN service tool"""
-        try:
-            if tool_name == "get_alarms":
-                url = f"{self.ran_services_url}/api/ran/alarms"
-                response = requests.get(url, params=params or {}, timeout=5)
-
-            elif tool_name == "get_kpis":
-                site_id = params.get('site_id') if params else None
-                if site_id:
-                    url = f"{self.ran_services_url}/api/ran/kpis/{site_id}"
-                else:
-                    url = f"{self.ran_services_url}/api/ran/kpis"
-                response = requests.get(url, params=params or {}, timeout=5)
-
-            elif tool_name == "get_cell_details":
-                site_id = params.get('site_id', '')
-                url = f"{self.ran_services_url}/api/ran/cell-details/{site_id}"
-                response = requests.get(url, timeout=5)
+        if tool_name not in TOOL_NAMES:
+            return {'error': f'Unknown tool: {tool_name}'}
 
-            elif tool_name == "search_remediation":
-                url = f"{self.ran_services_url}/api/ran/search-remediation"
-                response = requests.post(url, json=params or {}, timeout=5)
+        params = params or {}
+        try:
+            if tool_name == "get_incidents":
+                params = {'limit': 10, **params}
 
+            if tool_name == "search_remediation":
+                mode = self.search_mode
+                if mode == 'keyword' or mode in unavailable_search_modes:
+                    status, body = self.tools.call(tool_name, params)
+                else:
+                    status, body = self.tools.call(tool_name, {**params, 'mode': mode})
+                    if status == 503:
+                        # sentence-transformers not installed in ran-services; use keyword matching
+                        unavailable_search_modes.add(mode)
+                        status, body = self.tools.call(tool_name, params)
             else:
-                return {'error': f'Unknown tool: {tool_name}'}
+                status, body = self.tools.call(tool_name, params)
 
-            if response.status_code == 200:
-                return response.json()
+            if status == 200:
+                return body
             else:
-                return {'error': f'HTTP {response.status_code}: {response.text}'}
+                return {'error': f'HTTP {status}: {body}'}
 
         except Exception as e:
             return {'error': str(e)}
@@ -86,134 +260,272 @@ class RANAgent:
         except Exception as e:
             return f"Error calling vLLM: {str(e)}"
 
+    def stream_vllm(self, prompt: str, max_tokens: int = 300) -> Iterator[str]:
+        """Yield completion text from vLLM's SSE stream, stopping once the step's actions are complete
+
+        Closing the stream early makes vLLM abort the request, so the tokens the
+        model would spend on a made-up next step are never decoded.
+        """
+        try:
+            with requests.post(
+                self.vllm_url,
+                json={
+                    'model': 'vllm',
+                    'prompt': prompt,
+                    'max_tokens': max_tokens,
+                    'temperature': 0.3,
+                    'stop': ['Observation:', 'User:', '\n\n\n'],
+                    'stream': True
+                },
+                stream=True,
+                timeout=30
+            ) as response:
+                if response.status_code != 200:
+                    yield f"Error: vLLM returned status {response.status_code}"
+                    return
+
+                text = ''
+                for line in response.iter_lines(chunk_size=None):
+                    if not line.startswith(b'data:'):
+                        continue
+                    data = line[len(b'data:'):].strip()
+                    if data == b'[DONE]':
+                        break
+                    delta = json.loads(data).get('choices', [{}])[0].get('text', '')
+                    if not delta:
+                        continue
+                    text += delta
+                    yield delta
+                    if self.actions_complete(text):
+                        break
+
+        except Exception as e:
+            yield f"Error calling vLLM: {str(e)}"
+
+    def actions_complete(self, text: str) -> bool:
+        """True once `text` has a complete Action / Action Input pair and the model has moved on"""
+        if FINAL_ANSWER in text:
+            return False
+        lines = text.split('\n')
+        pairs = 0
+        for i, line in enumerate(lines):
+            if line.startswith('Action Input:'):
+                # The last line's input may still be growing
+                pairs += i < len(lines) - 1
+                if pairs >= MAX_ACTIONS_PER_STEP:
+                    return True
+            elif pairs and line.startswith(('Thought:', 'Observation:')):
+                return True
+        return False
+
+    def complete_actions(self, text: str) -> str:
+        """`text` cut after its last complete Action Input when the model had moved on to a next step
+
+        This is the text a stream stopped by actions_complete should have
+        ended with; other text is returned unchanged.
+        """
+        if not self.actions_complete(text):
+            return text
+        # The stream was (or would have been) stopped mid-line
+        lines = text.split('\n')[:-1]
+        end = pairs = 0
+        for i, line in enumerate(lines):
+            if line.startswith('Action Input:'):
+                end = i + 1
+                while end < len(lines) and lines[end].strip() and not lines[end].startswith(STEP_PREFIXES):
+                    end += 1
+                pairs += 1
+                if pairs >= MAX_ACTIONS_PER_STEP:
+                    break
+        return '\n'.join(lines[:end]).strip()
+
+    def generate(self, prompt: str, max_tokens: int = 300):
+        """Generator of ('token', final answer text) events; returns the full completion
+
+        Use as `response = yield from self.generate(...)`. Without streaming the
+        final answer arrives as a single token event.
+        """
+        chunks = self.stream_vllm(prompt, max_tokens) if self.stream else [self.call_vllm(prompt, max_tokens)]
+        text = ''
+        sent = 0
+        for chunk in chunks:
+            text += chunk
+            start = text.find(FINAL_ANSWER)
+            if start >= 0:
+                answer = text[start + len(FINAL_ANSWER):].lstrip()
+                if len(answer) > sent:
+                    yield 'token', {'text': answer[sent:]}
+                    sent = len(answer)
+        return text.strip()
+
     def parse_action(self, thought_text: str) -> tuple:
-        """Parse action from agent's thought"""
-        # Simple parsing - look for Action: and Action Input:
+        """Parse the first action from agent's thought"""
+        actions = self.parse_actions(thought_text)
+        return actions[0] if actions else (None, None)
+
+    def parse_actions(self, thought_text: str) -> List[tuple]:
+        """Parse every Action / Action Input pair from agent's thought, in order"""
         lines = thought_text.split('\n')
 
+        actions = []
         action = None
-        action_input = None
 
         for i, line in enumerate(lines):
             if line.startswith('Action:'):
+                if action:
+                    # Previous action had no input
+                    actions.append((action, ''))
                 action = line.replace('Action:', '').strip()
-            elif line.startswith('Action Input:'):
+            elif line.startswith('Action Input:') and action:
                 # Get the rest of the text as action input
                 action_input = line.replace('Action Input:', '').strip()
                 # If action input spans multiple lines, get them
                 for j in range(i+1, len(lines)):
-                    if lines[j].strip() and not lines[j].startswith('Action'):
+                    if lines[j].strip() and not lines[j].startswith(STEP_PREFIXES):
                         action_input += ' ' + lines[j].strip()
                     else:
                         break
-
-        return action, action_input
+                actions.append((action, action_input))
+                action = None
+
+        if action:
+            actions.append((action, ''))
+        return actions[:MAX_ACTIONS_PER_STEP]
+
+    def tool_params(self, action: str, action_input: str) -> Dict:
+        """Tool parameters for an action's free-text input"""
+        site = SITE_PATTERN.search(action_input.upper())
+
+        if action == "get_alarms":
+            if "CRITICAL" in action_input.upper():
+                return {'severity': 'CRITICAL'}
+            elif site:
+                return {'site_id': site.group()}
+
+            elif CELL_PATTERN.search(action_input.upper()):
+                return {'cell_id': CELL_PATTERN.search(action_input.upper()).group()}
+
+        elif action in ("get_incidents", "get_kpis", "get_cell_details"):
+            if site:
+                return {'site_id': site.group()}
+
+        elif action == "search_remediation":
+            # Parse symptoms from action input
+            return {
+                'alarm_type': action_input,
+                'symptoms': [action_input]
+            }
+
+        return {}
+
+    @staticmethod
+    def call_key(tool_name: str, params: Dict) -> tuple:
+        return tool_name, tuple(sorted(params.items()))
+
+    def prefetch(self, user_query: str):
+        """Start the tool calls the query's SITE-/CELL- entities will most likely need"""
+        query = user_query.upper()
+        sites = list(dict.fromkeys(SITE_PATTERN.findall(query)))[:MAX_PREFETCH_ENTITIES]
+        cells = list(dict.fromkeys(CELL_PATTERN.findall(query)))[:MAX_PREFETCH_ENTITIES]
+
+        calls = [(tool, {'site_id': site}) for site in sites for tool in SITE_PREFETCH_TOOLS]
+        calls += [(tool, {'cell_id': cell}) for cell in cells for tool in CELL_PREFETCH_TOOLS]
+        for tool_name, params in calls:
+            self.prefetched[self.call_key(tool_name, params)] = tool_pool.submit(self.call_tool, tool_name, params)
+
+    def run_actions(self, actions: List[tuple]) -> List[tuple]:
+        """Call the tools for several actions concurrently; (result, prefetched) in action order"""
+        calls = [(action, self.tool_params(action, action_input)) for action, action_input in actions]
+        futures = [self.prefetched.pop(self.call_key(action, params), None) for action, params in calls]
+        prefetched = [future is not None for future in futures]
+
+        if prefetched.count(False) > 1:
+            futures = [future or tool_pool.submit(self.call_tool, action, params)
+                       for future, (action, params) in zip(futures, calls)]
+        return [
+            (future.result() if future else self.call_tool(action, params), hit)
+            for future, (action, params), hit in zip(futures, calls, prefetched)
+        ]
+
+    def step_events(self):
+        """('step', step) events for the steps logged since the last call"""
+        while self._emitted_steps < len(self.steps):
+            yield 'step', self.steps[self._emitted_steps]
+            self._emitted_steps += 1
 
     def process_query(self, user_query: str) -> Dict:
         """Process user query using ReACT framework"""
-        self.steps = []
-        self.retrieved_data = {}
-
-        system_prompt = """You are an expert RAN (Radio Access Network) troubleshooting agent. Your goal is to help diagnose and resolve network issues.
-
-You have access to these tools:
-- get_alarms: Retrieve active alarms from the network
-- get_kpis: Get Key Performance Indicators for sites
-- get_cell_details: Get detailed cell-level RF metrics
-- search_remediation: Search for remediation playbooks based on symptoms
+        for event, data in self.stream_query(user_query):
+            if event == 'done':
+                return data
 
-Use the ReACT framework:
-1. Thought: Reason about what you need to do
-2. Action: Choose a tool to use
-3. Action Input: Specify the input for the tool
-4. Observation: The tool will return data
-5. Repeat until you have enough information
-6. Final Answer: Provide your conclusion and recommendations
+    def stream_query(self, user_query: str) -> Iterator[tuple]:
+        """Process user query, yielding (event, data) as the agent works
 
-Format your response exactly like this:
-Thought: [your reasoning]
-Action: [tool name]
-Action Input: [input for the tool]
-
-After seeing the observation, either:
-- Continue with another Thought/Action/Action Input
-- Or provide: Final Answer: [your complete response]
-"""
+        Events are 'step' (each workflow step as it is logged), 'token' (final
+        answer text as it is generated) and finally 'done' with the same
+        result process_query returns.
+        """
+        self.steps = []
+        self._emitted_steps = 0
+        self.retrieved_data = {}
+        self.prefetched = {}
+        self.prefetch(user_query)
 
-        conversation_history = f"{system_prompt}\n\nUser Question: {user_query}\n\n"
+        history = PromptHistory(f"{SYSTEM_PROMPT}\n\nUser Question: {user_query}\n\n")
 
         for iteration in range(self.max_iterations):
             # Get agent's next thought/action
             self.log_step("REASONING", f"Iteration {iteration + 1}: Thinking about next step...")
+            yield from self.step_events()
 
-            response = self.call_vllm(conversation_history, max_tokens=400)
+            response = yield from self.generate(history.prompt(), max_tokens=400)
+            # Drop the next Thought the model had started before the stream was cut
+            response = self.complete_actions(response)
 
             # Check if agent wants to give final answer
-            if "Final Answer:" in response:
-                final_answer = response.split("Final Answer:")[1].strip()
+            if FINAL_ANSWER in response:
+                final_answer = response.split(FINAL_ANSWER)[1].strip()
                 self.log_step("FINAL_ANSWER", "Providing conclusion", final_answer)
                 break
 
-            # Parse action
-            action, action_input = self.parse_action(response)
+            # Parse actions
+            actions = self.parse_actions(response)
 
-            if not action:
+            if not actions:
                 # If we can't parse an action, provide default final answer
                 final_answer = "I apologize, but I'm having trouble formulating a proper response. Please try rephrasing your question."
                 self.log_step("ERROR", "Could not parse action", response)
                 break
 
-            # Execute action
-            self.log_step("ACTION", f"{action} with input: {action_input}")
-
-            # Prepare tool parameters
-            tool_params = {}
-            if action == "get_alarms":
-                if "CRITICAL" in action_input.upper():
-                    tool_params = {'severity': 'CRITICAL'}
-                elif "SITE-" in action_input.upper():
-                    # Extract site ID
-                    import re
-                    match = re.search(r'SITE-\d+', action_input.upper())
-                    if match:
-                        tool_params = {'site_id': match.group()}
-
-            elif action == "get_kpis":
-                if "SITE-" in action_input.upper():
-                    import re
-                    match = re.search(r'SITE-\d+', action_input.upper())
-                    if match:
-                        tool_params = {'site_id': match.group()}
-
-            elif action == "get_cell_details":
-                import re
-                match = re.search(r'SITE-\d+', action_input.upper())
-                if match:
-                    tool_params = {'site_id': match.group()}
-
-            elif action == "search_remediation":
-                # Parse symptoms from action input
-                tool_params = {
-                    'alarm_type': action_input,
-                    'symptoms': [action_input]
-                }
-
-            # Call the tool
-            result = self.call_tool(action, tool_params)
-            self.retrieved_data[action] = result
-
-            # Format observation
-            observation = json.dumps(result, indent=2)[:1000]  # Limit size
-            self.log_step("OBSERVATION", f"Tool returned data", observation)
+            # Execute actions
+            for action, action_input in actions:
+                self.log_step("ACTION", f"{action} with input: {action_input}")
+            yield from self.step_events()
+
+            results = self.run_actions(actions)
+
+            observations = []
+            for (action, action_input), (result, prefetched) in zip(actions, results):
+                # One entry per target, labelled like the observation
+                self.retrieved_data[f"{action} {action_input}".strip()] = result
+
+                # Format observation
+                observation = json.dumps(result, indent=2)[:1000]  # Limit size
+                source = " (prefetched)" if prefetched else ""
+                self.log_step("OBSERVATION", f"{action} returned data{source}", observation)
+                observations.append(f"Observation ({action} {action_input}): {observation}"
+                                    if len(actions) > 1 else f"Observation: {observation}")
 
             # Add to conversation
-            conversation_history += f"Thought: {response}\nObservation: {observation}\n\n"
+            history.add(response, observations)
 
         else:
             # Max iterations reached
             final_answer = "I've gathered the available information but need more iterations to provide a complete analysis. Based on what I found so far, please review the retrieved data in the tabs."
 
-        return {
+        yield from self.step_events()
+        yield 'done', {
             'answer': final_answer,
             'steps': self.steps,
             'retrieved_data': self.retrieved_data
@@ -0,0 +1,144 @@
+"""
+Alarm storm correlation
+Groups active alarms into incidents by topology (all cells of a site) and
+time (alarms closer than the correlation window chain into one incident),
+ranks root-cause candidates inside each incident, and returns one compact
+record per incident instead of every raw alarm.
+
+A transport failure followed by "Cell Down" on the same site within the
+window becomes one incident whose root cause is the transport alarm.
+"""
+from collections import OrderedDict
+from datetime import datetime, timezone
+import re
+import threading
+
+DEFAULT_WINDOW_SECONDS = 300
+MAX_CANDIDATES = 3
+MAX_ALARM_IDS = 10
+CACHE_ENTRIES = 32
+
+# Sorts alarms without a parseable firstOccurrence last
+NO_TIME = datetime.max.replace(tzinfo=timezone.utc)
+
+SEVERITY_RANK = {'CRITICAL': 4, 'MAJOR': 3, 'MINOR': 2, 'WARNING': 1}
+
+# Alarm type keywords, most likely root cause first; the first match wins. Keywords
+# match at the start of a word ("link" matches "Link Down", not "Uplink Interference")
+ROOT_CAUSE_PRIORITY = (
+    ('transport', 100), ('backhaul', 100), ('n2', 95), ('ng interface', 95), ('link', 90),
+    ('power', 90), ('hardware', 80), ('synchron', 75), ('vswr', 70), ('antenna', 70),
+    ('cell down', 40), ('interference', 30), ('congestion', 20), ('degrad', 10)
+)
+NON_WORD = re.compile(r'[^a-z0-9]+')
+
+# Site-wide alarms (no cellId) usually explain the cell-level ones
+SITE_SCOPE_BONUS = 20
+
+
+def parse_time(value):
+    """UTC datetime of an ISO timestamp, or None"""
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def root_cause_score(alarm):
+    # "Uplink_Interference" -> " uplink interference", so " link" only matches at a word start
+    alarm_type = ' ' + NON_WORD.sub(' ', str(alarm.get('type', '')).lower())
+    type_score = next((score for keyword, score in ROOT_CAUSE_PRIORITY if ' ' + keyword in alarm_type), 0)
+    scope_score = 0 if alarm.get('cellId') else SITE_SCOPE_BONUS
+    return type_score + scope_score + 10 * SEVERITY_RANK.get(alarm.get('severity'), 0)
+
+
+def group_site_alarms(alarms, window_seconds):
+    """Split one site's alarms into incidents; a gap longer than the window starts a new one"""
+    timed = sorted(((parse_time(a.get('firstOccurrence')), a) for a in alarms),
+                   key=lambda item: item[0] or NO_TIME)
+    groups = []
+    last_time = None
+    for time, alarm in timed:
+        if groups and (time is None or last_time is None or (time - last_time).total_seconds() <= window_seconds):
+            groups[-1].append((time, alarm))
+        else:
+            groups.append([(time, alarm)])
+        if time is not None:
+            last_time = time
+    return groups
+
+
+def summarize(site_id, group):
+    """Compact incident record for a group of (time, alarm) pairs"""
+    ranked = sorted(group, key=lambda item: (-root_cause_score(item[1]), item[0] or NO_TIME))
+    root = ranked[0][1]
+    times = [time for time, _ in group if time is not None]
+    alarm_types = {}
+    for _, alarm in group:
+        alarm_types[alarm.get('type')] = alarm_types.get(alarm.get('type'), 0) + 1
+
+    return {
+        'incidentId': f"INC-{site_id}-{root['alarmId']}",
+        'siteId': site_id,
+        'severity': max((alarm.get('severity') for _, alarm in group), key=lambda s: SEVERITY_RANK.get(s, 0)),
+        'start': min(times).strftime('%Y-%m-%dT%H:%M:%SZ') if times else None,
+        'end': max(times).strftime('%Y-%m-%dT%H:%M:%SZ') if times else None,
+        'alarmCount': len(group),
+        'cells': sorted({alarm['cellId'] for _, alarm in group if alarm.get('cellId')}),
+        'alarmTypes': alarm_types,
+        'rootCause': {
+            'alarmId': root['alarmId'],
+            'type': root.get('type'),
+            'severity': root.get('severity'),
+            'cellId': root.get('cellId'),
+            'description': root.get('description')
+        },
+        'rootCauseCandidates': [
+            {'alarmId': alarm['alarmId'], 'type': alarm.get('type'), 'cellId': alarm.get('cellId'),
+             'score': root_cause_score(alarm)}
+            for _, alarm in ranked[:MAX_CANDIDATES]
+        ],
+        'alarmIds': [alarm['alarmId'] for _, alarm in ranked[:MAX_ALARM_IDS]],
+        'moreAlarms': max(0, len(group) - MAX_ALARM_IDS)
+    }
+
+
+def correlate(alarms_by_site, window_seconds=DEFAULT_WINDOW_SECONDS):
+    """Incidents for a site -> alarms mapping, most severe and largest first"""
+    incidents = [
+        summarize(site_id, group)
+        for site_id, alarms in alarms_by_site.items()
+        for group in group_site_alarms(alarms, window_seconds)
+    ]
+    incidents.sort(key=lambda i: (-SEVERITY_RANK.get(i['severity'], 0), -i['alarmCount'], i['start'] or ''))
+    return incidents
+
+
+class IncidentCorrelator:
+    """Correlates AlarmSnapshots, caching results per (snapshot version, site, window)"""
+
+    def __init__(self, window_seconds=DEFAULT_WINDOW_SECONDS):
+        self.window_seconds = window_seconds
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def incidents(self, snapshot, site_id=None, window_seconds=None):
+        window_seconds = self.window_seconds if window_seconds is None else window_seconds
+        key = (snapshot.version, site_id, window_seconds)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        if site_id:
+            alarms_by_site = {site_id: snapshot.by_site.get(site_id, ())}
+        else:
+            alarms_by_site = snapshot.by_site
+        incidents = correlate(alarms_by_site, window_seconds)
+
+        with self._lock:
+            self._cache[key] = incidents
+            while len(self._cache) > CACHE_ENTRIES:
+                self._cache.popitem(last=False)
+        return incidents
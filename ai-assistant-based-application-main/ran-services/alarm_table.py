@@ -0,0 +1,384 @@
+"""
+Active alarm table
+Live alarm events (raise/clear, deduplicated by alarmId) are applied to a
+writer-side table indexed by site, cell and severity. Readers never touch it:
+a publisher thread periodically publishes an immutable AlarmSnapshot, rebuilding
+only the index buckets that changed, so /api/ran/alarms and the agent tools
+read at full speed during an alarm storm and see data at most one publish
+interval old.
+
+alarms.json is the baseline: its alarms are seeded at startup and re-synced
+when the content of the file changes, while ingested alarms are left alone. A
+baseline alarm cleared by a live event stays cleared until its entry in
+alarms.json changes.
+
+The table lives in process memory, so events and reads must reach the same
+process: serve ran-services from a single worker (the Dockerfile runs one
+gunicorn worker with threads).
+"""
+from datetime import datetime
+from itertools import chain
+import json
+from operator import itemgetter
+import threading
+import time
+
+from fixtures import intersect
+
+ACTIONS = ('raise', 'clear')
+REQUIRED_FIELDS = ('alarmId', 'siteId', 'severity', 'type')
+
+# Events applied per lock acquisition when streaming NDJSON
+INGEST_BATCH_SIZE = 1000
+READ_CHUNK_BYTES = 1 << 20
+MAX_REPORTED_ERRORS = 10
+
+FIXTURE = 'fixture'
+INGESTED = 'ingested'
+
+
+def utc_timestamp():
+    return datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def new_result():
+    return {'accepted': 0, 'raised': 0, 'updated': 0, 'cleared': 0, 'ignored': 0, 'rejected': 0, 'errors': []}
+
+
+def iter_lines(stream, chunk_size=READ_CHUNK_BYTES):
+    """Lines of a binary stream, read in large chunks (per-line readline on a request stream is slow)"""
+    pending = b''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        yield from lines
+    if pending:
+        yield pending
+
+
+class InvalidEvent:
+    """Placeholder for an NDJSON line that did not parse"""
+
+    def __init__(self, error):
+        self.error = error
+
+
+class AlarmSnapshot:
+    """Read-only view of the active alarms at one publish
+
+    Buckets are tuples ordered by first raise. The flat `alarms` list is
+    merged from the per-site buckets on first use, on the reader's side,
+    so publishing never copies every active alarm.
+    """
+
+    def __init__(self, version, timestamp, count, by_site, by_cell, by_severity, site_sequences):
+        self.version = version
+        self.timestamp = timestamp
+        self.count = count
+        self.by_site = by_site
+        self.by_cell = by_cell
+        self.by_severity = by_severity
+        self._site_sequences = site_sequences
+        self._alarms = None
+
+    @property
+    def alarms(self):
+        """All active alarms in order of first raise"""
+        if self._alarms is None:
+            by_sequence = dict(zip(chain.from_iterable(self._site_sequences[site] for site in self.by_site),
+                                   chain.from_iterable(self.by_site.values())))
+            self._alarms = tuple(map(by_sequence.__getitem__, sorted(by_sequence)))
+        return self._alarms
+
+    def filter(self, severity=None, site_id=None, cell_id=None):
+        """Active alarms matching every given filter, in order of first raise"""
+        candidates, predicates = [], []
+        if severity:
+            candidates.append(self.by_severity.get(severity, ()))
+            predicates.append(lambda a: a['severity'] == severity)
+        if site_id:
+            candidates.append(self.by_site.get(site_id, ()))
+            predicates.append(lambda a: a['siteId'] == site_id)
+        if cell_id:
+            candidates.append(self.by_cell.get(cell_id, ()))
+            predicates.append(lambda a: a.get('cellId') == cell_id)
+        if not candidates:
+            return list(self.alarms)
+        return intersect(candidates, predicates)
+
+
+class _Index:
+    """Writer-side key -> {alarmId: (sequence, alarm)} buckets plus the keys changed since the last publish"""
+
+    def __init__(self, key):
+        self.key = key
+        self.buckets = {}
+        self.dirty = set()
+        # Buckets an alarm moved into out of sequence order
+        self.unsorted = set()
+
+    def put(self, sequence, alarm):
+        key = self.key(alarm)
+        self.buckets.setdefault(key, {})[alarm['alarmId']] = (sequence, alarm)
+        self.dirty.add(key)
+
+    def replace(self, sequence, previous, alarm):
+        """Swap in an updated alarm, keeping its position when the key is unchanged"""
+        if self.key(previous) != self.key(alarm):
+            self.remove(previous)
+            self.unsorted.add(self.key(alarm))
+        self.put(sequence, alarm)
+
+    def remove(self, alarm):
+        key = self.key(alarm)
+        bucket = self.buckets.get(key)
+        if bucket is not None:
+            bucket.pop(alarm['alarmId'], None)
+            if not bucket:
+                del self.buckets[key]
+        self.dirty.add(key)
+
+    def publish(self, previous, previous_sequences=None):
+        """New key -> tuple mappings (alarms, and sequences if tracked), reusing the previous tuples of unchanged keys"""
+        published = dict(previous)
+        sequences = None if previous_sequences is None else dict(previous_sequences)
+        for key in self.dirty:
+            bucket = self.buckets.get(key)
+            if bucket:
+                if key in self.unsorted:
+                    # New alarms get the highest sequence, so only moved-in alarms break the order
+                    bucket = self.buckets[key] = dict(sorted(bucket.items(), key=lambda item: item[1][0]))
+                published[key] = tuple(map(itemgetter(1), bucket.values()))
+                if sequences is not None:
+                    sequences[key] = tuple(map(itemgetter(0), bucket.values()))
+            else:
+                published.pop(key, None)
+                if sequences is not None:
+                    sequences.pop(key, None)
+        self.dirty.clear()
+        self.unsorted.clear()
+        return published, sequences
+
+
+class ActiveAlarmTable:
+    """Raise/clear alarm events into an indexed table published as AlarmSnapshots"""
+
+    def __init__(self, baseline, publish_interval=0.2):
+        self.publish_interval = publish_interval
+        self._lock = threading.Lock()
+        self._alarms = {}
+        self._sources = {}
+        self._sequences = {}  # alarmId -> order of first raise
+        self._next_sequence = 0
+        self._by_site = _Index(lambda a: a['siteId'])
+        self._by_cell = _Index(lambda a: a.get('cellId'))
+        self._by_severity = _Index(lambda a: a['severity'])
+        self._dirty = False
+        self._publisher = None
+        self._baseline = None
+        self._baseline_by_id = {}
+        self._baseline_timestamp = None
+        # Baseline alarms cleared by live events: alarmId -> the alarms.json entry that was cleared
+        self._cleared_baseline = {}
+        self._site_sequences = {}
+        self.counters = {'raised': 0, 'updated': 0, 'cleared': 0, 'rejected': 0}
+        self.current = AlarmSnapshot(0, None, 0, {}, {}, {}, {})
+
+        self.seed(baseline)
+        self.publish()
+
+    def _put(self, alarm, source):
+        alarm_id = alarm['alarmId']
+        previous = self._alarms.get(alarm_id)
+        if previous is None:
+            self._sequences[alarm_id] = self._next_sequence
+            self._next_sequence += 1
+        sequence = self._sequences[alarm_id]
+        self._alarms[alarm_id] = alarm
+        self._sources[alarm_id] = source
+        for index in (self._by_site, self._by_cell, self._by_severity):
+            if previous is None:
+                index.put(sequence, alarm)
+            else:
+                index.replace(sequence, previous, alarm)
+        self._dirty = True
+
+    def _remove_from_indexes(self, alarm):
+        for index in (self._by_site, self._by_cell, self._by_severity):
+            index.remove(alarm)
+
+    def _clear(self, alarm_id):
+        alarm = self._alarms.pop(alarm_id, None)
+        if alarm is None:
+            return False
+        self._sources.pop(alarm_id, None)
+        self._sequences.pop(alarm_id, None)
+        self._remove_from_indexes(alarm)
+        self._dirty = True
+        return True
+
+    def seed(self, alarms_data):
+        """Sync the fixture baseline with `alarms_data` (alarms.json); ingested alarms are kept
+
+        Only entries that were added, edited or removed since the last seed
+        change the table, so reloading unchanged content (e.g. after another
+        fixture file changed) is a no-op. Baseline alarms cleared by a live
+        event are not restored while their alarms.json entry is unchanged.
+        """
+        if alarms_data is self._baseline:
+            return
+        baseline_by_id = {alarm['alarmId']: alarm for alarm in alarms_data['alarms']}
+        with self._lock:
+            self._baseline = alarms_data
+            self._baseline_timestamp = alarms_data.get('timestamp')
+            if baseline_by_id == self._baseline_by_id:
+                return
+            self._baseline_by_id = baseline_by_id
+
+            for alarm_id in [i for i, source in self._sources.items() if source == FIXTURE]:
+                if alarm_id not in baseline_by_id:
+                    self._clear(alarm_id)
+            self._cleared_baseline = {
+                alarm_id: alarm for alarm_id, alarm in self._cleared_baseline.items()
+                if baseline_by_id.get(alarm_id) == alarm
+            }
+            for alarm_id, alarm in baseline_by_id.items():
+                source = self._sources.get(alarm_id)
+                if source == INGESTED or alarm_id in self._cleared_baseline:
+                    continue
+                if source is None or self._alarms[alarm_id] != alarm:
+                    self._put(alarm, FIXTURE)
+
+    def apply(self, events):
+        """Apply raise/clear events; returns per-outcome counts and the first few errors
+
+        A raise for an active alarmId updates it in place (firstOccurrence is
+        kept, lastOccurrence is set); a clear for an unknown alarmId is a no-op.
+        """
+        return self._apply_numbered(enumerate(events), new_result())
+
+    def ingest_ndjson(self, lines, batch_size=INGEST_BATCH_SIZE):
+        """Apply one event per line of `lines` (bytes or str), holding the lock for `batch_size` events at a time
+
+        Error indexes in the result are 1-based line numbers.
+        """
+        result = new_result()
+        batch = []
+        for line_number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                event = json.loads(line)
+            except ValueError as e:
+                event = InvalidEvent(f'Invalid JSON: {e}')
+            batch.append((line_number, event))
+            if len(batch) >= batch_size:
+                self._apply_numbered(batch, result)
+                batch = []
+        return self._apply_numbered(batch, result)
+
+    def _apply_numbered(self, numbered_events, result):
+        now = utc_timestamp()
+        with self._lock:
+            before = {outcome: result[outcome] for outcome in self.counters}
+            for position, event in numbered_events:
+                error = self._apply_event(event, now, result)
+                if error:
+                    result['rejected'] += 1
+                    if len(result['errors']) < MAX_REPORTED_ERRORS:
+                        result['errors'].append({'index': position, 'error': error})
+                else:
+                    result['accepted'] += 1
+            for outcome in self.counters:
+                self.counters[outcome] += result[outcome] - before[outcome]
+        return result
+
+    def _apply_event(self, event, now, result):
+        if isinstance(event, InvalidEvent):
+            return event.error
+        if not isinstance(event, dict):
+            return 'Event must be an object'
+        action = event.get('action', 'raise')
+        if action not in ACTIONS:
+            return f"Unknown action '{action}', expected one of {list(ACTIONS)}"
+        if not event.get('alarmId'):
+            return 'alarmId is required'
+
+        if action == 'clear':
+            cleared = self._clear(event['alarmId'])
+            if cleared and event['alarmId'] in self._baseline_by_id:
+                self._cleared_baseline[event['alarmId']] = self._baseline_by_id[event['alarmId']]
+            result['cleared' if cleared else 'ignored'] += 1
+            return None
+
+        missing = [field for field in REQUIRED_FIELDS if not event.get(field)]
+        if missing:
+            return f"Missing fields: {', '.join(missing)}"
+
+        alarm = {k: v for k, v in event.items() if k != 'action'}
+        alarm['severity'] = str(alarm['severity']).upper()
+        previous = self._alarms.get(alarm['alarmId'])
+        if previous is not None:
+            alarm = {**previous, **alarm, 'firstOccurrence': previous.get('firstOccurrence')}
+            alarm['lastOccurrence'] = event.get('lastOccurrence') or event.get('firstOccurrence') or now
+            result['updated'] += 1
+        else:
+            alarm.setdefault('firstOccurrence', now)
+            result['raised'] += 1
+        self._cleared_baseline.pop(alarm['alarmId'], None)
+        self._put(alarm, INGESTED)
+        return None
+
+    def publish(self):
+        """Publish a new snapshot if anything changed
+
+        Cost is proportional to the alarms in changed buckets plus a shallow
+        copy of the bucket maps; unchanged buckets are shared with the
+        previous snapshot.
+        """
+        with self._lock:
+            if not self._dirty:
+                return self.current
+            previous = self.current
+            by_site, self._site_sequences = self._by_site.publish(previous.by_site, self._site_sequences)
+            by_cell, _ = self._by_cell.publish(previous.by_cell)
+            by_severity, _ = self._by_severity.publish(previous.by_severity)
+            snapshot = AlarmSnapshot(
+                previous.version + 1,
+                utc_timestamp() if previous.version else self._baseline_timestamp,
+                len(self._alarms),
+                by_site,
+                by_cell,
+                by_severity,
+                self._site_sequences
+            )
+            self._dirty = False
+            self.current = snapshot
+        return snapshot
+
+    def start(self):
+        """Publish changes every `publish_interval` seconds in a daemon thread"""
+        if self._publisher is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(self.publish_interval)
+                self.publish()
+
+        self._publisher = threading.Thread(target=run, name='alarm-publisher', daemon=True)
+        self._publisher.start()
+
+    def stats(self):
+        snapshot = self.current
+        return {
+            'active_alarms': snapshot.count,
+            'version': snapshot.version,
+            'published_at': snapshot.timestamp,
+            'publish_interval_seconds': self.publish_interval,
+            **self.counters
+        }
@@ -3,33 +3,90 @@ RAN Services API
 Provides endpoints for RAN data, alarms, KPIs, and remediation playbooks
 Also provides proxy endpoints to live RAN simulator
 """
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
 import json
 import os
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from alarm_correlation import IncidentCorrelator
+from alarm_table import ActiveAlarmTable, iter_lines
+from fixtures import FixtureStore
+from playbook_embeddings import DEFAULT_HYBRID_ALPHA, SEMANTIC_MODES, PlaybookEmbedder
+from playbook_search import SEARCH_MODES
+from proxy_cache import TTLCache
+from simulator_client import client_from_env
+
 app = Flask(__name__)
 CORS(app)
 
 # Configuration
 RAN_SIMULATOR_URL = os.environ.get('RAN_SIMULATOR_URL', 'http://ran-simulator:5001')
 
-# Load data from JSON files
-DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+# Shared keep-alive connection pool for all simulator calls
+simulator = client_from_env(RAN_SIMULATOR_URL)
+
+# Simulator data changes once per tick; identical proxy calls within the TTL
+# share one upstream response and concurrent misses share one in-flight call
+live_cache = TTLCache(ttl=float(os.environ.get('SIMULATOR_CACHE_TTL', 2.0)))
+
+def fetch_live(endpoint, path, params=None, transform=None):
+    """Cached, coalesced simulator GET
+
+    Returns (data, CacheInfo); `transform` is applied once per upstream fetch
+    and its result is what gets cached. Raises requests.RequestException.
+    """
+    key = (endpoint, path, tuple(sorted((params or {}).items())))
+
+    def fetch():
+        data = simulator.get_json(endpoint, path, params=params)
+        return transform(data) if transform else data
 
-def load_json(filename):
-    """Load JSON data from file"""
-    filepath = os.path.join(DATA_DIR, filename)
-    with open(filepath, 'r') as f:
-        return json.load(f)
+    return live_cache.get_or_fetch(key, fetch)
 
-# Cache data in memory
-alarms_data = load_json('alarms.json')
-kpis_data = load_json('kpis.json')
-cell_details_data = load_json('cell_details.json')
-remediation_data = load_json('remediation_playbooks.json')
+# Query parameters /api/ran/live-ues forwards to the simulator's /gnb/ues
+LIVE_UE_PARAMS = ('site_id', 'cell_id', 'limit', 'after', 'fields',
+                  'sinr_lt', 'sinr_gt', 'throughput_lt', 'throughput_gt')
+
+def live_response(data, cache_info):
+    """JSON response carrying cache staleness headers"""
+    response = jsonify(data)
+    response.headers.update(cache_info.headers())
+    return response
+
+# Load data from JSON files, indexed for per-request lookups. The files are
+# polled for changes and reloaded in the background; handlers read
+# fixture_store.current once per request so a swap never splits a response.
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+
+fixture_store = FixtureStore(DATA_DIR)
+fixture_store.watch(float(os.environ.get('FIXTURE_RELOAD_INTERVAL', 2.0)))
+
+# Active alarms: alarms.json is the baseline, live events are ingested through
+# /api/ran/alarms/events and readers get the snapshot published by a background thread
+alarm_table = ActiveAlarmTable(fixture_store.current.alarms_data,
+                               publish_interval=float(os.environ.get('ALARM_PUBLISH_INTERVAL', 0.2)))
+fixture_store.subscribe(lambda data: alarm_table.seed(data.alarms_data))
+alarm_table.start()
+
+# Alarm storms are compressed into incidents (site topology + time window, ranked root causes)
+incident_correlator = IncidentCorrelator(window_seconds=int(os.environ.get('INCIDENT_WINDOW_SECONDS', 300)))
+MAX_INCIDENTS = 1000
+
+# Semantic/hybrid playbook search; embeddings are cached by playbook content
+embedder = PlaybookEmbedder(
+    model_name=os.environ.get('EMBEDDING_MODEL', 'all-MiniLM-L6-v2'),
+    cache_path=os.environ.get('EMBEDDING_CACHE_PATH') or None
+)
+if os.environ.get('SEMANTIC_SEARCH_PRELOAD', 'false').lower() == 'true' and embedder.available:
+    embedder.warm(fixture_store.current.playbook_index)
+
+# Simulator calls for site analyses run here while the fixture work proceeds
+MAX_BATCH_SITES = int(os.environ.get('MAX_BATCH_SITES', 50))
+fan_out_pool = ThreadPoolExecutor(max_workers=int(os.environ.get('FAN_OUT_WORKERS', 16)),
+                                  thread_name_prefix='site-analysis')
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -37,7 +94,7 @@ def health_check():
     # Check simulator connectivity
     simulator_status = 'unknown'
     try:
-        sim_response = requests.get(f'{RAN_SIMULATOR_URL}/health', timeout=2)
+        sim_response = simulator.get('health', '/health')
         if sim_response.status_code == 200:
             simulator_status = 'connected'
         else:
@@ -45,21 +102,33 @@ def health_check():
     except:
         simulator_status = 'unreachable'
 
-    return jsonify({
+    return jsonify(health_payload(simulator_status))
+
+def health_payload(simulator_status):
+    """Health check body, shared with the ASGI serving mode"""
+    return {
         'status': 'healthy',
         'service': 'ran-services',
         'simulator_status': simulator_status,
         'simulator_url': RAN_SIMULATOR_URL,
+        'simulator_cache': live_cache.stats(),
+        'fixtures': fixture_store.status(),
+        'alarm_table': alarm_table.stats(),
+        'semantic_search': embedder.status(),
         'endpoints': {
             'fixtures': [
                 '/api/ran/alarms',
+                '/api/ran/alarms/events (POST)',
+                '/api/ran/incidents',
                 '/api/ran/kpis',
                 '/api/ran/kpis/<site_id>',
                 '/api/ran/cell-details',
                 '/api/ran/cell-details/<site_id>',
                 '/api/ran/remediation',
                 '/api/ran/remediation/<playbook_id>',
-                '/api/ran/search-remediation'
+                '/api/ran/search-remediation',
+                '/api/ran/fixtures/reload (POST)',
+                '/api/ran/fixtures/<dataset> (PUT)'
             ],
             'live_simulator': [
                 '/api/ran/live-sites',
@@ -71,92 +140,164 @@ def health_check():
                 '/api/ran/live-status'
             ],
             'combined': [
-                '/api/ran/combined-site-analysis/<site_id>'
+                '/api/ran/combined-site-analysis/<site_id>',
+                '/api/ran/combined-site-analysis (POST, batch)'
             ]
         }
-    })
+    }
 
 @app.route('/api/ran/alarms', methods=['GET'])
 def get_alarms():
     """Get all active alarms"""
-    severity = request.args.get('severity')
-    site_id = request.args.get('site_id')
-
-    filtered_alarms = alarms_data['alarms']
-
-    if severity:
-        filtered_alarms = [a for a in filtered_alarms if a['severity'] == severity.upper()]
-
-    if site_id:
-        filtered_alarms = [a for a in filtered_alarms if a['siteId'] == site_id]
-
-    return jsonify({
-        'timestamp': alarms_data['timestamp'],
+    payload, status = alarms_payload(
+        severity=request.args.get('severity'),
+        site_id=request.args.get('site_id'),
+        cell_id=request.args.get('cell_id')
+    )
+    return jsonify(payload), status
+
+def alarms_payload(severity=None, site_id=None, cell_id=None):
+    """Active alarms matching the filters; returns (response body, HTTP status)"""
+    alarms = alarm_table.current
+    filtered_alarms = alarms.filter(
+        severity=severity.upper() if severity else None,
+        site_id=site_id,
+        cell_id=cell_id
+    )
+
+    return {
+        'timestamp': alarms.timestamp,
         'count': len(filtered_alarms),
         'alarms': filtered_alarms
-    })
+    }, 200
+
+@app.route('/api/ran/alarms/events', methods=['POST'])
+def ingest_alarm_events():
+    """
+    Ingest live alarm events into the active alarm table
+    Accepts NDJSON (application/x-ndjson, streamed, one event per line) or a
+    JSON array / {"events": [...]}. Each event is an alarm object with an
+    optional "action" of "raise" (default) or "clear"; alarms are deduplicated
+    by alarmId.
+    """
+    if request.mimetype == 'application/x-ndjson':
+        result = alarm_table.ingest_ndjson(iter_lines(request.stream))
+    else:
+        data = request.get_json(silent=True)
+        events = data.get('events') if isinstance(data, dict) else data
+        if not isinstance(events, list):
+            return jsonify({'error': 'Body must be a JSON array of events, {"events": [...]}, or NDJSON'}), 400
+        result = alarm_table.apply(events)
+
+    result['alarm_table'] = alarm_table.stats()
+    return jsonify(result)
+
+@app.route('/api/ran/incidents', methods=['GET'])
+def get_incidents():
+    """Active alarms correlated into incidents with likely root causes"""
+    try:
+        window = request.args.get('window', type=int)
+        limit = int(request.args.get('limit', 50))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+
+    payload, status = incidents_payload(site_id=request.args.get('site_id'), window=window, limit=limit)
+    return jsonify(payload), status
+
+def incidents_payload(site_id=None, window=None, limit=50):
+    """Correlated incidents; returns (response body, HTTP status)"""
+    if limit < 1 or (window is not None and window < 0):
+        return {'error': 'limit must be positive and window non-negative'}, 400
+
+    alarms = alarm_table.current
+    incidents = incident_correlator.incidents(alarms, site_id=site_id, window_seconds=window)
+    alarm_count = sum(incident['alarmCount'] for incident in incidents)
+
+    return {
+        'timestamp': alarms.timestamp,
+        'window_seconds': incident_correlator.window_seconds if window is None else window,
+        'alarm_count': alarm_count,
+        'incident_count': len(incidents),
+        'incidents': incidents[:min(limit, MAX_INCIDENTS)]
+    }, 200
 
 @app.route('/api/ran/kpis', methods=['GET'])
 def get_kpis():
     """Get KPI reports for all sites"""
-    status = request.args.get('status')
+    payload, status = kpis_payload(request.args.get('status'))
+    return jsonify(payload), status
 
-    filtered_kpis = kpis_data['kpiReport']
+def kpis_payload(status=None):
+    """KPI reports, optionally filtered by status; returns (response body, HTTP status)"""
+    fixtures = fixture_store.current
 
     if status:
-        filtered_kpis = [k for k in filtered_kpis if k['status'] == status.upper()]
+        filtered_kpis = fixtures.kpis_by_status.get(status.upper(), [])
+    else:
+        filtered_kpis = fixtures.kpis_data['kpiReport']
 
-    return jsonify({
-        'timestamp': kpis_data['timestamp'],
+    return {
+        'timestamp': fixtures.kpis_data['timestamp'],
         'count': len(filtered_kpis),
         'kpiReport': filtered_kpis
-    })
+    }, 200
 
 @app.route('/api/ran/kpis/<site_id>', methods=['GET'])
 def get_kpis_by_site(site_id):
     """Get KPI report for specific site"""
-    site_kpis = next((k for k in kpis_data['kpiReport'] if k['siteId'] == site_id), None)
+    payload, status = site_kpis_payload(site_id)
+    return jsonify(payload), status
+
+def site_kpis_payload(site_id):
+    """KPI report of one site; returns (response body, HTTP status)"""
+    fixtures = fixture_store.current
+    site_kpis = fixtures.kpis_by_site.get(site_id)
 
     if not site_kpis:
-        return jsonify({'error': f'Site {site_id} not found'}), 404
+        return {'error': f'Site {site_id} not found'}, 404
 
-    return jsonify({
-        'timestamp': kpis_data['timestamp'],
+    return {
+        'timestamp': fixtures.kpis_data['timestamp'],
         'siteKpis': site_kpis
-    })
+    }, 200
 
 @app.route('/api/ran/cell-details', methods=['GET'])
 def get_all_cell_details():
     """Get cell details for all sites"""
-    return jsonify(cell_details_data)
+    fixtures = fixture_store.current
+    return jsonify(fixtures.cell_details_data)
 
 @app.route('/api/ran/cell-details/<site_id>', methods=['GET'])
 def get_cell_details(site_id):
     """Get cell details for specific site"""
-    site_data = cell_details_data['sites'].get(site_id)
+    payload, status = cell_details_payload(site_id)
+    return jsonify(payload), status
+
+def cell_details_payload(site_id):
+    """Cell details of one site; returns (response body, HTTP status)"""
+    fixtures = fixture_store.current
+    site_data = fixtures.cell_details_data['sites'].get(site_id)
 
     if not site_data:
-        return jsonify({'error': f'Site {site_id} not found'}), 404
+        return {'error': f'Site {site_id} not found'}, 404
 
-    return jsonify({
-        'timestamp': cell_details_data['timestamp'],
+    return {
+        'timestamp': fixtures.cell_details_data['timestamp'],
         'siteId': site_id,
         'siteData': site_data
-    })
+    }, 200
 
 @app.route('/api/ran/remediation', methods=['GET'])
 def get_remediation_playbooks():
     """Get all remediation playbooks"""
+    fixtures = fixture_store.current
     category = request.args.get('category')
     severity = request.args.get('severity')
 
-    filtered_playbooks = remediation_data['playbooks']
-
-    if category:
-        filtered_playbooks = [p for p in filtered_playbooks if p['category'] == category]
-
-    if severity:
-        filtered_playbooks = [p for p in filtered_playbooks if p['severity'] == severity.upper()]
+    filtered_playbooks = fixtures.filter_playbooks(
+        category=category,
+        severity=severity.upper() if severity else None
+    )
 
     return jsonify({
         'count': len(filtered_playbooks),
@@ -166,7 +307,8 @@ def get_remediation_playbooks():
 @app.route('/api/ran/remediation/<playbook_id>', methods=['GET'])
 def get_remediation_playbook(playbook_id):
     """Get specific remediation playbook"""
-    playbook = next((p for p in remediation_data['playbooks'] if p['playbookId'] == playbook_id), None)
+    fixtures = fixture_store.current
+    playbook = fixtures.playbooks_by_id.get(playbook_id)
 
     if not playbook:
         return jsonify({'error': f'Playbook {playbook_id} not found'}), 404
@@ -176,44 +318,64 @@ def get_remediation_playbook(playbook_id):
 @app.route('/api/ran/search-remediation', methods=['POST'])
 def search_remediation():
     """Search for relevant remediation playbooks based on symptoms"""
-    data = request.json
+    payload, status = remediation_search_payload(request.json)
+    return jsonify(payload), status
+
+def remediation_search_payload(data):
+    """Top 3 playbooks for an {alarm_type, symptoms, mode} query; returns (response body, HTTP status)"""
+    fixtures = fixture_store.current
     alarm_type = data.get('alarm_type', '')
     symptoms = data.get('symptoms', [])
+    mode = data.get('mode', 'keyword')
 
-    # Simple matching logic
-    matching_playbooks = []
+    if mode not in SEARCH_MODES + SEMANTIC_MODES:
+        return {'error': f"Unknown search mode '{mode}', expected one of {list(SEARCH_MODES + SEMANTIC_MODES)}"}, 400
+    alpha = data.get('alpha', DEFAULT_HYBRID_ALPHA)
+    if isinstance(alpha, bool) or not isinstance(alpha, (int, float)) or not 0.0 <= alpha <= 1.0:
+        return {'error': 'alpha must be a number between 0 and 1'}, 400
 
-    for playbook in remediation_data['playbooks']:
-        score = 0
+    # Index lookups; scores as before (alarm type +10, category +10, +5 per
+    # matching symptom), pure BM25 over the playbook text with mode=bm25, or
+    # embedding similarity (alone or blended with BM25) with mode=semantic/hybrid
+    try:
+        if mode in SEMANTIC_MODES:
+            count, results = embedder.search(fixtures.playbook_index, alarm_type, symptoms, mode=mode,
+                                             alpha=float(alpha))
+        else:
+            count, results = fixtures.playbook_index.search(alarm_type, symptoms, mode=mode)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    except RuntimeError as e:
+        return {
+            'error': 'Semantic search not available',
+            'details': str(e)
+        }, 503
 
-        # Check if alarm type matches
-        if alarm_type and alarm_type in playbook.get('applicableAlarms', []):
-            score += 10
+    return {
+        'count': count,
+        'results': results  # Top 3 matches
+    }, 200
 
-        # Check if alarm type matches category
-        if alarm_type and alarm_type == playbook.get('category'):
-            score += 10
+@app.route('/api/ran/fixtures/reload', methods=['POST'])
+def reload_fixtures():
+    """Re-read the fixture files now instead of waiting for the watcher"""
+    reloaded = fixture_store.reload()
+    status = fixture_store.status()
 
-        # Check for symptom matches
-        playbook_symptoms = [s.lower() for s in playbook.get('symptoms', [])]
-        for symptom in symptoms:
-            symptom_lower = symptom.lower()
-            if any(symptom_lower in ps for ps in playbook_symptoms):
-                score += 5
+    if not reloaded:
+        return jsonify({'error': 'Fixture reload failed', 'details': status['last_error'], 'fixtures': status}), 500
 
-        if score > 0:
-            matching_playbooks.append({
-                'playbook': playbook,
-                'relevance_score': score
-            })
+    return jsonify({'fixtures': status})
 
-    # Sort by relevance score
-    matching_playbooks.sort(key=lambda x: x['relevance_score'], reverse=True)
+@app.route('/api/ran/fixtures/<dataset>', methods=['PUT'])
+def push_fixture_dataset(dataset):
+    """Replace one dataset (alarms, kpis, cell_details, remediation) in memory with the request body"""
+    try:
+        fixture_store.push(dataset, request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-    return jsonify({
-        'count': len(matching_playbooks),
-        'results': matching_playbooks[:3]  # Top 3 matches
-    })
+    return jsonify({'fixtures': fixture_store.status()})
 
 # ============================================================================
 # Live RAN Simulator Proxy Endpoints
@@ -223,9 +385,8 @@ def search_remediation():
 def get_live_sites():
     """Proxy to RAN simulator - get live site data"""
     try:
-        response = requests.get(f'{RAN_SIMULATOR_URL}/gnb/sites', timeout=5)
-        response.raise_for_status()
-        return jsonify(response.json())
+        data, cache_info = fetch_live('sites', '/gnb/sites')
+        return live_response(data, cache_info)
     except requests.RequestException as e:
         return jsonify({
             'error': 'Failed to connect to RAN simulator',
@@ -236,45 +397,42 @@ def get_live_sites():
 def get_live_site(site_id):
     """Proxy to RAN simulator - get live site data for specific site"""
     try:
-        response = requests.get(f'{RAN_SIMULATOR_URL}/gnb/sites/{site_id}', timeout=5)
-        response.raise_for_status()
-        return jsonify(response.json())
+        data, cache_info = fetch_live('site', f'/gnb/sites/{site_id}')
+        return live_response(data, cache_info)
     except requests.RequestException as e:
         return jsonify({
             'error': f'Failed to get site {site_id} from RAN simulator',
             'details': str(e)
         }), 503
 
+def enrich_cells(simulator_data):
+    """Transform simulator cell data to match our data model"""
+    cells = simulator_data.get('cells', [])
+
+    # Enrich with calculated metrics
+    enriched_cells = []
+    for cell in cells:
+        enriched_cell = cell.copy()
+        # Add calculated fields if needed
+        enriched_cell['quality'] = 'GOOD' if cell.get('averageSINR_dB', 0) > 15 else 'DEGRADED'
+        enriched_cells.append(enriched_cell)
+
+    return {
+        'timestamp': datetime.utcnow().isoformat(),
+        'source': 'ran-simulator',
+        'total_cells': len(enriched_cells),
+        'cells': enriched_cells
+    }
+
 @app.route('/api/ran/live-cells', methods=['GET'])
 def get_live_cells():
     """Proxy to RAN simulator - get live cell data"""
     try:
         site_id = request.args.get('site_id')
-        url = f'{RAN_SIMULATOR_URL}/gnb/cells'
-        if site_id:
-            url += f'?site_id={site_id}'
-
-        response = requests.get(url, timeout=5)
-        response.raise_for_status()
-
-        # Transform simulator data to match our data model
-        simulator_data = response.json()
-        cells = simulator_data.get('cells', [])
+        params = {'site_id': site_id} if site_id else None
 
-        # Enrich with calculated metrics
-        enriched_cells = []
-        for cell in cells:
-            enriched_cell = cell.copy()
-            # Add calculated fields if needed
-            enriched_cell['quality'] = 'GOOD' if cell.get('averageSINR_dB', 0) > 15 else 'DEGRADED'
-            enriched_cells.append(enriched_cell)
-
-        return jsonify({
-            'timestamp': datetime.utcnow().isoformat(),
-            'source': 'ran-simulator',
-            'total_cells': len(enriched_cells),
-            'cells': enriched_cells
-        })
+        data, cache_info = fetch_live('cells', '/gnb/cells', params=params, transform=enrich_cells)
+        return live_response(data, cache_info)
     except requests.RequestException as e:
         return jsonify({
             'error': 'Failed to get cells from RAN simulator',
@@ -285,9 +443,8 @@ def get_live_cells():
 def get_live_cell(cell_id):
     """Proxy to RAN simulator - get live cell data for specific cell"""
     try:
-        response = requests.get(f'{RAN_SIMULATOR_URL}/gnb/cells/{cell_id}', timeout=5)
-        response.raise_for_status()
-        return jsonify(response.json())
+        data, cache_info = fetch_live('cell', f'/gnb/cells/{cell_id}')
+        return live_response(data, cache_info)
     except requests.RequestException as e:
         return jsonify({
             'error': f'Failed to get cell {cell_id} from RAN simulator',
@@ -296,43 +453,39 @@ def get_live_cell(cell_id):
 
 @app.route('/api/ran/live-ues', methods=['GET'])
 def get_live_ues():
-    """Proxy to RAN simulator - get live UE data"""
-    try:
-        site_id = request.args.get('site_id')
-        cell_id = request.args.get('cell_id')
+    """Proxy to RAN simulator - get live UE data
 
-        params = {}
-        if site_id:
-            params['site_id'] = site_id
-        if cell_id:
-            params['cell_id'] = cell_id
-
-        response = requests.get(f'{RAN_SIMULATOR_URL}/gnb/ues', params=params, timeout=5)
-        response.raise_for_status()
-        return jsonify(response.json())
+    Forwards the simulator's filters, paging (limit/after) and fields=
+    projection; its 400 for an invalid value is passed through.
+    """
+    try:
+        params = {name: request.args[name] for name in LIVE_UE_PARAMS if request.args.get(name)}
+        data, cache_info = fetch_live('ues', '/gnb/ues', params=params)
+        return live_response(data, cache_info)
     except requests.RequestException as e:
+        upstream = e.response
+        if upstream is not None and 400 <= upstream.status_code < 500:
+            # e.g. an invalid limit or filter value
+            return jsonify(upstream.json()), upstream.status_code
         return jsonify({
             'error': 'Failed to get UEs from RAN simulator',
             'details': str(e)
         }), 503
 
+def enhance_metrics(metrics):
+    """Wrap simulator metrics with additional metadata"""
+    return {
+        'timestamp': datetime.utcnow().isoformat(),
+        'source': 'ran-simulator',
+        'metrics': metrics
+    }
+
 @app.route('/api/ran/live-metrics', methods=['GET'])
 def get_live_metrics():
     """Proxy to RAN simulator - get live metrics"""
     try:
-        response = requests.get(f'{RAN_SIMULATOR_URL}/gnb/metrics', timeout=5)
-        response.raise_for_status()
-
-        metrics = response.json()
-
-        # Enhance with additional metadata
-        enhanced_metrics = {
-            'timestamp': datetime.utcnow().isoformat(),
-            'source': 'ran-simulator',
-            'metrics': metrics
-        }
-
-        return jsonify(enhanced_metrics)
+        data, cache_info = fetch_live('metrics', '/gnb/metrics', transform=enhance_metrics)
+        return live_response(data, cache_info)
     except requests.RequestException as e:
         return jsonify({
             'error': 'Failed to get metrics from RAN simulator',
@@ -343,9 +496,8 @@ def get_live_metrics():
 def get_live_status():
     """Proxy to RAN simulator - get overall status"""
     try:
-        response = requests.get(f'{RAN_SIMULATOR_URL}/gnb/status', timeout=5)
-        response.raise_for_status()
-        return jsonify(response.json())
+        data, cache_info = fetch_live('status', '/gnb/status')
+        return live_response(data, cache_info)
     except requests.RequestException as e:
         return jsonify({
             'error': 'Failed to get status from RAN simulator',
@@ -362,6 +514,52 @@ def get_combined_site_analysis(site_id):
     - KPIs from fixtures
     - Remediation recommendations
     """
+    return jsonify(analyze_sites([site_id])[0])
+
+@app.route('/api/ran/combined-site-analysis', methods=['POST'])
+def get_combined_site_analysis_batch():
+    """Combined analysis for many sites in one request: {"site_ids": [...]}"""
+    site_ids, error = batch_site_ids(request.get_json(silent=True))
+    if error:
+        return jsonify({'error': error}), 400
+
+    analyses = analyze_sites(site_ids)
+    return jsonify({
+        'count': len(analyses),
+        'analyses': analyses
+    })
+
+def batch_site_ids(data):
+    """(site_ids, None) for a valid {"site_ids": [...]} body, else (None, error message)"""
+    site_ids = data.get('site_ids') if isinstance(data, dict) else None
+    if not isinstance(site_ids, list) or not site_ids or \
+            not all(isinstance(site_id, str) and site_id for site_id in site_ids):
+        return None, 'site_ids must be a non-empty list of site ID strings'
+    if len(site_ids) > MAX_BATCH_SITES:
+        return None, f'At most {MAX_BATCH_SITES} sites per request'
+    return site_ids, None
+
+def fetch_live_site(site_id):
+    """Live site data from the simulator, or {} if it is unreachable"""
+    try:
+        data, _ = fetch_live('site', f'/gnb/sites/{site_id}')
+        return data
+    except requests.RequestException:
+        return {}
+
+def analyze_sites(site_ids):
+    """Site analyses in request order; all simulator calls are in flight while the fixture work runs"""
+    live_futures = [fan_out_pool.submit(fetch_live_site, site_id) for site_id in site_ids]
+    fixtures, alarms = fixture_store.current, alarm_table.current
+    analyses = [site_fixture_analysis(site_id, fixtures, alarms) for site_id in site_ids]
+    for analysis, live_future in zip(analyses, live_futures):
+        analysis['live_data'] = live_future.result()
+    return analyses
+
+def site_fixture_analysis(site_id, fixtures=None, alarms=None):
+    """Fixture part of a site analysis; `live_data` is filled in by the caller"""
+    fixtures = fixtures or fixture_store.current
+    alarms = alarms or alarm_table.current
     analysis = {
         'siteId': site_id,
         'timestamp': datetime.utcnow().isoformat(),
@@ -372,91 +570,181 @@ def get_combined_site_analysis(site_id):
         'recommendations': []
     }
 
-    # Get live data from simulator
-    try:
-        site_response = requests.get(f'{RAN_SIMULATOR_URL}/gnb/sites/{site_id}', timeout=5)
-        if site_response.status_code == 200:
-            analysis['live_data'] = site_response.json()
-    except:
-        pass
-
-    # Get alarms from fixtures
-    site_alarms = [a for a in alarms_data['alarms'] if a['siteId'] == site_id]
+    # Get active alarms (fixture baseline plus ingested events)
+    site_alarms = list(alarms.by_site.get(site_id, ()))
     analysis['alarms'] = site_alarms
 
     # Get KPIs from fixtures
-    site_kpis = next((k for k in kpis_data['kpiReport'] if k['siteId'] == site_id), None)
+    site_kpis = fixtures.kpis_by_site.get(site_id)
     if site_kpis:
         analysis['kpis'] = site_kpis
 
     # Get cell details from fixtures
-    site_cell_data = cell_details_data['sites'].get(site_id)
+    site_cell_data = fixtures.cell_details_data['sites'].get(site_id)
     if site_cell_data:
         analysis['cells'] = site_cell_data.get('cells', [])
 
-    # Find relevant remediation playbooks based on alarms
-    for alarm in site_alarms:
-        matching = [p for p in remediation_data['playbooks']
-                   if alarm['type'] in p.get('applicableAlarms', []) or
-                      alarm['type'] == p.get('category')]
-        analysis['recommendations'].extend(matching)
-
-    # Deduplicate recommendations
+    # Relevant remediation playbooks for the site's alarms, deduplicated in first-seen order
     seen = set()
-    unique_recommendations = []
-    for rec in analysis['recommendations']:
-        if rec['playbookId'] not in seen:
-            seen.add(rec['playbookId'])
-            unique_recommendations.append(rec)
-    analysis['recommendations'] = unique_recommendations
-
-    return jsonify(analysis)
+    for alarm in site_alarms:
+        for playbook in fixtures.playbooks_by_alarm_type.get(alarm['type'], []):
+            if playbook['playbookId'] not in seen:
+                seen.add(playbook['playbookId'])
+                analysis['recommendations'].append(playbook)
+
+    return analysis
+
+# Agent tools served in-process: tool name -> params -> (response body, HTTP status),
+# the same handler logic as the HTTP endpoints the agent would otherwise call
+AGENT_TOOLS = {
+    'get_alarms': lambda params: alarms_payload(
+        params.get('severity'), params.get('site_id'), params.get('cell_id')),
+    'get_incidents': lambda params: incidents_payload(
+        params.get('site_id'), params.get('window'), int(params.get('limit', 50))),
+    'get_kpis': lambda params: (site_kpis_payload(params['site_id']) if params.get('site_id')
+                                else kpis_payload(params.get('status'))),
+    'get_cell_details': lambda params: cell_details_payload(params.get('site_id', '')),
+    'search_remediation': remediation_search_payload
+}
 
 @app.route('/api/agent/query', methods=['POST'])
 def agent_query():
     """
     Use the ReAct agent to process queries
     This endpoint connects to vLLM and uses the agent.py implementation
-    """
-    try:
-        data = request.get_json()
-        query = data.get('query', '')
-
-        if not query:
-            return jsonify({'error': 'Query is required'}), 400
-
-        # Import the agent
-        from agent import RANAgent
 
-        # Configure agent with vLLM and RAN services URLs
-        VLLM_URL = os.environ.get('VLLM_URL', 'http://vllm:8000/v1/completions')
-        RAN_SERVICES_URL = 'http://localhost:5000'  # Self-reference
+    With {"stream": true} (or Accept: text/event-stream) the response is a
+    Server-Sent Events stream of step, token and done events.
+    """
+    data = request.get_json(silent=True)
+    if wants_stream(data, request.headers.get('Accept', '')):
+        events, status = stream_agent_query(data)
+        if status == 200:
+            return sse_response(stream_with_context(events))
+        return jsonify(events), status
+
+    payload, status = run_agent_query(data)
+    return jsonify(payload), status
+
+def wants_stream(data, accept):
+    return bool(isinstance(data, dict) and data.get('stream')) or 'text/event-stream' in accept
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def sse_response(events):
+    # X-Accel-Buffering stops nginx-style proxies from holding back events
+    return Response(events, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def create_agent():
+    """RANAgent configured from the environment; raises ImportError if the agent module is unavailable"""
+    # Import the agent
+    from agent import HttpToolBackend, LocalToolBackend, RANAgent, unavailable_search_modes
+
+    # Configure agent with vLLM and RAN services URLs
+    VLLM_URL = os.environ.get('VLLM_URL', 'http://vllm:8000/v1/completions')
+    RAN_SERVICES_URL = os.environ.get('AGENT_RAN_SERVICES_URL', 'http://localhost:5000')
+
+    # Tools run in-process against the loaded data unless AGENT_TOOL_BACKEND=http
+    if os.environ.get('AGENT_TOOL_BACKEND', 'local') == 'http':
+        tool_backend = HttpToolBackend(RAN_SERVICES_URL)
+    else:
+        tool_backend = LocalToolBackend(AGENT_TOOLS)
+        if not embedder.available:
+            # Known up front in-process, so the agent never tries a search that would 503
+            unavailable_search_modes.update(SEMANTIC_MODES)
+
+    return RANAgent(vllm_url=VLLM_URL, ran_services_url=RAN_SERVICES_URL, tool_backend=tool_backend)
+
+def agent_unavailable(e):
+    return {
+        'error': 'Agent module not available',
+        'details': str(e),
+        'fallback_message': 'Live agent requires vLLM service. Using demo mode.'
+    }, 503
+
+def invalid_agent_query(data):
+    """(error body, 400) unless `data` is a JSON object with a non-empty query string, else None"""
+    query = data.get('query') if isinstance(data, dict) else None
+    if not isinstance(query, str) or not query.strip():
+        return {
+            'error': 'Query is required',
+            'details': 'Body must be a JSON object with a non-empty "query" string'
+        }, 400
+    return None
+
+def run_agent_query(data):
+    """Run one agent query; returns (response body, HTTP status)
+
+    Blocking (vLLM round trips); the ASGI serving mode runs it in a worker thread.
+    """
+    invalid = invalid_agent_query(data)
+    if invalid:
+        return invalid
+    query = data['query']
 
+    try:
         # Create agent instance
-        agent = RANAgent(vllm_url=VLLM_URL, ran_services_url=RAN_SERVICES_URL)
+        agent = create_agent()
 
         # Process the query using ReAct framework
         result = agent.process_query(query)
 
-        return jsonify({
+        return {
             'success': True,
             'answer': result.get('answer', 'No answer generated'),
             'steps': result.get('steps', []),
             'retrieved_data': result.get('retrieved_data', {})
-        })
+        }, 200
 
     except ImportError as e:
-        return jsonify({
-            'error': 'Agent module not available',
-            'details': str(e),
-            'fallback_message': 'Live agent requires vLLM service. Using demo mode.'
-        }), 503
+        return agent_unavailable(e)
 
     except Exception as e:
-        return jsonify({
+        return {
+            'error': 'Agent processing failed',
+            'details': str(e)
+        }, 500
+
+def stream_agent_query(data):
+    """Start one streamed agent query; returns (iterator of SSE chunks, 200) or (error body, status)
+
+    Validation and agent setup happen before streaming starts, so those
+    failures are still plain JSON errors. Iterating blocks on vLLM.
+    """
+    invalid = invalid_agent_query(data)
+    if invalid:
+        return invalid
+    query = data['query']
+
+    try:
+        agent = create_agent()
+
+    except ImportError as e:
+        return agent_unavailable(e)
+
+    except Exception as e:
+        return {
             'error': 'Agent processing failed',
             'details': str(e)
-        }), 500
+        }, 500
+
+    def events():
+        try:
+            for event, payload in agent.stream_query(query):
+                if event == 'done':
+                    payload = {
+                        'success': True,
+                        'answer': payload.get('answer', 'No answer generated'),
+                        'steps': payload.get('steps', []),
+                        'retrieved_data': payload.get('retrieved_data', {})
+                    }
+                yield sse_event(event, payload)
+        except Exception as e:
+            yield sse_event('error', {'error': 'Agent processing failed', 'details': str(e)})
+
+    return events(), 200
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
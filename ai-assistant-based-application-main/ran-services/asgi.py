@@ -0,0 +1,197 @@
+"""
+ASGI serving mode for RAN Services
+Serves the simulator proxies, the combined site analysis and /health on an
+asyncio event loop with a non-blocking simulator client, runs the (blocking)
+agent queries in worker threads, and mounts the Flask app for every other
+route, so paths and response shapes are the same as in the WSGI deployment.
+
+Run with: uvicorn asgi:app --host 0.0.0.0 --port 5000
+"""
+from contextlib import asynccontextmanager
+import asyncio
+import json
+import os
+
+import anyio
+import httpx
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+import app as ran_services
+from proxy_cache import AsyncTTLCache
+from simulator_client import AsyncSimulatorClient, client_from_env
+
+# Concurrent agent queries; each one blocks a worker thread on vLLM round trips
+AGENT_MAX_CONCURRENCY = int(os.environ.get('AGENT_MAX_CONCURRENCY', 256))
+
+simulator = client_from_env(ran_services.RAN_SIMULATOR_URL, client_class=AsyncSimulatorClient)
+live_cache = AsyncTTLCache(ttl=ran_services.live_cache.ttl)
+
+
+class FlaskJSONResponse(JSONResponse):
+    """JSON rendered like Flask's jsonify (sorted keys, compact, trailing newline)"""
+
+    def render(self, content):
+        return (json.dumps(content, sort_keys=True, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+async def fetch_live(endpoint, path, params=None, transform=None):
+    """Cached, coalesced, non-blocking simulator GET; returns (data, CacheInfo)"""
+    key = (endpoint, path, tuple(sorted((params or {}).items())))
+
+    async def fetch():
+        data = await simulator.get_json(endpoint, path, params=params)
+        return transform(data) if transform else data
+
+    return await live_cache.get_or_fetch_async(key, fetch)
+
+
+def live_proxy(endpoint, path, error, params=(), transform=None, relay_client_errors=False):
+    """Build an async handler proxying `path` (formatted with path params) to the simulator
+
+    With `relay_client_errors`, a 4xx from the simulator (e.g. an invalid
+    query parameter) is returned as is instead of as a 503.
+    """
+
+    async def handler(request: Request):
+        path_params = request.path_params
+        query = {name: request.query_params[name] for name in params if request.query_params.get(name)}
+        try:
+            data, cache_info = await fetch_live(endpoint, path.format(**path_params), params=query or None,
+                                                transform=transform)
+        except httpx.HTTPStatusError as e:
+            if relay_client_errors and 400 <= e.response.status_code < 500:
+                return FlaskJSONResponse(e.response.json(), status_code=e.response.status_code)
+            return FlaskJSONResponse({'error': error.format(**path_params), 'details': str(e)}, status_code=503)
+        except httpx.HTTPError as e:
+            return FlaskJSONResponse({'error': error.format(**path_params), 'details': str(e)}, status_code=503)
+        return FlaskJSONResponse(data, headers=cache_info.headers())
+
+    return handler
+
+
+async def health_check(request: Request):
+    """Health check endpoint"""
+    try:
+        response = await simulator.get('health', '/health')
+        simulator_status = 'connected' if response.status_code == 200 else 'unreachable'
+    except httpx.HTTPError:
+        simulator_status = 'unreachable'
+
+    payload = ran_services.health_payload(simulator_status)
+    payload['simulator_cache'] = live_cache.stats()
+    payload['serving_mode'] = 'asgi'
+    return FlaskJSONResponse(payload)
+
+
+async def fetch_live_site(site_id):
+    """Live site data from the simulator, or {} if it is unreachable"""
+    try:
+        data, _ = await fetch_live('site', f'/gnb/sites/{site_id}')
+        return data
+    except httpx.HTTPError:
+        return {}
+
+
+async def analyze_sites(site_ids):
+    """Site analyses in request order; all simulator calls are in flight while the fixture work runs"""
+    live_tasks = [asyncio.ensure_future(fetch_live_site(site_id)) for site_id in site_ids]
+    fixtures, alarms = ran_services.fixture_store.current, ran_services.alarm_table.current
+    analyses = [ran_services.site_fixture_analysis(site_id, fixtures, alarms) for site_id in site_ids]
+    for analysis, live_data in zip(analyses, await asyncio.gather(*live_tasks)):
+        analysis['live_data'] = live_data
+    return analyses
+
+
+async def combined_site_analysis(request: Request):
+    """Combined live + fixture site analysis"""
+    analyses = await analyze_sites([request.path_params['site_id']])
+    return FlaskJSONResponse(analyses[0])
+
+
+async def combined_site_analysis_batch(request: Request):
+    """Combined analysis for many sites in one request: {"site_ids": [...]}"""
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    site_ids, error = ran_services.batch_site_ids(data)
+    if error:
+        return FlaskJSONResponse({'error': error}, status_code=400)
+
+    analyses = await analyze_sites(site_ids)
+    return FlaskJSONResponse({'count': len(analyses), 'analyses': analyses})
+
+
+async def agent_query(request: Request):
+    """ReAct agent query, run in a worker thread so the event loop stays free"""
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+
+    limiter = request.app.state.agent_limiter
+    if ran_services.wants_stream(data, request.headers.get('accept', '')):
+        events, status = await anyio.to_thread.run_sync(ran_services.stream_agent_query, data, limiter=limiter)
+        if status != 200:
+            return FlaskJSONResponse(events, status_code=status)
+        return StreamingResponse(iterate_in_agent_threads(events, limiter), media_type='text/event-stream',
+                                 headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    payload, status = await anyio.to_thread.run_sync(
+        ran_services.run_agent_query, data, limiter=limiter
+    )
+    return FlaskJSONResponse(payload, status_code=status)
+
+
+async def iterate_in_agent_threads(iterator, limiter):
+    """Drive a blocking iterator from worker threads, one item at a time, under the agent limiter"""
+    done = object()
+    while True:
+        item = await anyio.to_thread.run_sync(next, iterator, done, limiter=limiter)
+        if item is done:
+            break
+        yield item
+
+
+@asynccontextmanager
+async def lifespan(app):
+    app.state.agent_limiter = anyio.CapacityLimiter(AGENT_MAX_CONCURRENCY)
+    yield
+    await simulator.aclose()
+
+
+routes = [
+    Route('/health', health_check),
+    Route('/api/ran/live-sites', live_proxy('sites', '/gnb/sites', 'Failed to connect to RAN simulator')),
+    Route('/api/ran/live-sites/{site_id}', live_proxy(
+        'site', '/gnb/sites/{site_id}', 'Failed to get site {site_id} from RAN simulator')),
+    Route('/api/ran/live-cells', live_proxy(
+        'cells', '/gnb/cells', 'Failed to get cells from RAN simulator',
+        params=('site_id',), transform=ran_services.enrich_cells)),
+    Route('/api/ran/live-cells/{cell_id}', live_proxy(
+        'cell', '/gnb/cells/{cell_id}', 'Failed to get cell {cell_id} from RAN simulator')),
+    Route('/api/ran/live-ues', live_proxy(
+        'ues', '/gnb/ues', 'Failed to get UEs from RAN simulator', params=ran_services.LIVE_UE_PARAMS,
+        relay_client_errors=True)),
+    Route('/api/ran/live-metrics', live_proxy(
+        'metrics', '/gnb/metrics', 'Failed to get metrics from RAN simulator',
+        transform=ran_services.enhance_metrics)),
+    Route('/api/ran/live-status', live_proxy('status', '/gnb/status', 'Failed to get status from RAN simulator')),
+    Route('/api/ran/combined-site-analysis', combined_site_analysis_batch, methods=['POST']),
+    Route('/api/ran/combined-site-analysis/{site_id}', combined_site_analysis),
+    Route('/api/agent/query', agent_query, methods=['POST']),
+    # Fixture routes are CPU-only and fast; they stay on the Flask app
+    Mount('/', WSGIMiddleware(ran_services.app))
+]
+
+app = Starlette(
+    routes=routes,
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan
+)
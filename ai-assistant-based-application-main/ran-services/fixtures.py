@@ -0,0 +1,258 @@
+"""
+Fixture datasets with lookup indexes
+The KPI, cell detail and playbook JSON files are indexed once at load time
+(by siteId, status, severity, category, alarm type and playbookId), so
+request handlers do dictionary lookups instead of scanning every record.
+Index lists keep the order of the source file, so filtered responses are
+ordered exactly as a scan would return them. Alarms are served from the
+active alarm table (alarm_table.py), seeded from alarms.json.
+
+FixtureStore keeps the current FixtureData and replaces it wholesale when the
+files change or an update is pushed. The new data is parsed and indexed off to
+the side and published with a single reference assignment, so readers never
+block and never see a half-loaded dataset.
+"""
+from datetime import datetime
+import json
+import logging
+import os
+import threading
+import time
+
+from playbook_search import PlaybookIndex
+
+logger = logging.getLogger(__name__)
+
+# Fields the active alarm table indexes baseline alarms by
+BASELINE_ALARM_FIELDS = ('alarmId', 'siteId', 'severity')
+
+# Dataset name -> (file, top-level key that must be present)
+DATASETS = {
+    'alarms': ('alarms.json', 'alarms'),
+    'kpis': ('kpis.json', 'kpiReport'),
+    'cell_details': ('cell_details.json', 'sites'),
+    'remediation': ('remediation_playbooks.json', 'playbooks')
+}
+
+
+def group_by(records, key):
+    """Map key(record) -> records with that key, in source order"""
+    index = {}
+    for record in records:
+        index.setdefault(key(record), []).append(record)
+    return index
+
+
+def first_by(records, key):
+    """Map key(record) -> the first record with that key (like next(...) over a scan)"""
+    index = {}
+    for record in records:
+        index.setdefault(key(record), record)
+    return index
+
+
+def index_playbooks_by_alarm_type(playbooks):
+    """Map each alarm type to the playbooks that apply to it (applicableAlarms or category), in playbook order"""
+    index = {}
+    for playbook in playbooks:
+        alarm_types = set(playbook.get('applicableAlarms', []))
+        if playbook.get('category'):
+            alarm_types.add(playbook['category'])
+        for alarm_type in alarm_types:
+            index.setdefault(alarm_type, []).append(playbook)
+    return index
+
+
+def validate_alarms(alarms):
+    """Raise ValueError unless every alarm is an object with the BASELINE_ALARM_FIELDS"""
+    for position, alarm in enumerate(alarms):
+        if not isinstance(alarm, dict):
+            raise ValueError(f"alarms[{position}] must be an object")
+        missing = [field for field in BASELINE_ALARM_FIELDS if not alarm.get(field)]
+        if missing:
+            raise ValueError(f"alarms[{position}] is missing {', '.join(missing)}")
+
+
+def intersect(candidates, predicates):
+    """Records of the smallest candidate list that pass every predicate
+
+    `candidates` are index lists (one per active filter) and `predicates`
+    the matching per-record checks; only the shortest list is scanned.
+    """
+    smallest = min(candidates, key=len)
+    return [record for record in smallest if all(predicate(record) for predicate in predicates)]
+
+
+class FixtureData:
+    """Parsed fixture datasets plus their indexes; treated as read-only once built"""
+
+    def __init__(self, alarms_data, kpis_data, cell_details_data, remediation_data):
+        self.alarms_data = alarms_data
+        self.kpis_data = kpis_data
+        self.cell_details_data = cell_details_data
+        self.remediation_data = remediation_data
+
+        validate_alarms(alarms_data['alarms'])
+
+        kpis = kpis_data['kpiReport']
+        self.kpis_by_site = first_by(kpis, lambda k: k['siteId'])
+        self.kpis_by_status = group_by(kpis, lambda k: k['status'])
+
+        playbooks = remediation_data['playbooks']
+        self.playbooks_by_id = first_by(playbooks, lambda p: p['playbookId'])
+        self.playbooks_by_category = group_by(playbooks, lambda p: p.get('category'))
+        self.playbooks_by_severity = group_by(playbooks, lambda p: p['severity'])
+        self.playbooks_by_alarm_type = index_playbooks_by_alarm_type(playbooks)
+        self.playbook_index = PlaybookIndex(playbooks)
+
+    @classmethod
+    def load(cls, data_dir):
+        """Parse and index the four fixture files in `data_dir`"""
+        def load_json(filename):
+            with open(os.path.join(data_dir, filename), 'r') as f:
+                return json.load(f)
+
+        return cls(*(load_json(filename) for filename, _ in DATASETS.values()))
+
+    def datasets(self):
+        """Dataset name -> parsed JSON, in DATASETS order"""
+        return dict(zip(DATASETS, (self.alarms_data, self.kpis_data,
+                                   self.cell_details_data, self.remediation_data)))
+
+    def filter_playbooks(self, category=None, severity=None):
+        """Playbooks matching every given filter, in fixture order"""
+        candidates, predicates = [], []
+        if category:
+            candidates.append(self.playbooks_by_category.get(category, []))
+            predicates.append(lambda p: p.get('category') == category)
+        if severity:
+            candidates.append(self.playbooks_by_severity.get(severity, []))
+            predicates.append(lambda p: p['severity'] == severity)
+        if not candidates:
+            return self.remediation_data['playbooks']
+        return intersect(candidates, predicates)
+
+
+class FixtureStore:
+    """Current FixtureData, hot-reloaded from `data_dir` and swapped in atomically
+
+    Readers take `store.current` once per request and use that object
+    throughout. Reloads and pushes are serialized by a writer lock; a failed
+    reload or push (including one a subscriber rejects) keeps serving the
+    previous data and is reported in `status()`.
+    """
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self._write_lock = threading.Lock()
+        self._watcher = None
+        self._subscribers = []
+        self.version = 0
+        self.source = None
+        self.loaded_at = None
+        self.reload_ms = None
+        self.last_error = None
+        self._signature = self._file_signature()
+        self.current = None
+        self._publish(FixtureData.load(data_dir), 'files', time.perf_counter())
+
+    def _file_signature(self):
+        """(mtime_ns, size) of every fixture file; changes when any file is rewritten"""
+        signature = []
+        for filename, _ in DATASETS.values():
+            try:
+                stat = os.stat(os.path.join(self.data_dir, filename))
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _publish(self, data, source, started):
+        """Hand `data` to the subscribers, then make it current
+
+        A subscriber that rejects the data raises before anything is swapped,
+        so the previous version stays live.
+        """
+        for callback in self._subscribers:
+            callback(data)
+        self.current = data
+        self.version += 1
+        self.source = source
+        self.loaded_at = datetime.utcnow().isoformat()
+        self.reload_ms = round((time.perf_counter() - started) * 1000, 2)
+        self.last_error = None
+
+    def subscribe(self, callback):
+        """Call `callback(data)` with every newly published FixtureData (from the writer's thread)"""
+        self._subscribers.append(callback)
+
+    def reload(self):
+        """Re-read the files; returns True if new data was published"""
+        with self._write_lock:
+            started = time.perf_counter()
+            signature = self._file_signature()
+            self._signature = signature
+            try:
+                self._publish(FixtureData.load(self.data_dir), 'files', started)
+            except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+                # Possibly a file caught mid-write; keep serving the old data and retry once it changes again
+                self.last_error = f'{type(e).__name__}: {e}'
+                logger.warning(f"Fixture reload failed, keeping version {self.version}: {self.last_error}")
+                return False
+        logger.info(f"Fixtures reloaded from {self.data_dir} (version {self.version}, {self.reload_ms} ms)")
+        return True
+
+    def push(self, dataset, payload):
+        """Replace one dataset in memory with `payload` (same shape as its JSON file)
+
+        Raises ValueError for an unknown dataset or malformed payload. Files are
+        not written; the next file change reloads everything from disk.
+        """
+        if dataset not in DATASETS:
+            raise ValueError(f"Unknown dataset '{dataset}', expected one of {sorted(DATASETS)}")
+        required_key = DATASETS[dataset][1]
+        if not isinstance(payload, dict) or required_key not in payload:
+            raise ValueError(f"'{dataset}' payload must be an object with a '{required_key}' field")
+
+        with self._write_lock:
+            started = time.perf_counter()
+            datasets = self.current.datasets()
+            datasets[dataset] = payload
+            try:
+                self._publish(FixtureData(*datasets.values()), f'push:{dataset}', started)
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                self.last_error = f"Malformed '{dataset}' payload: {type(e).__name__}: {e}"
+                raise ValueError(self.last_error)
+        return self.version
+
+    def check_for_changes(self):
+        """Reload if any fixture file changed since the last load"""
+        if self._file_signature() != self._signature:
+            return self.reload()
+        return False
+
+    def watch(self, interval):
+        """Poll the fixture files every `interval` seconds in a daemon thread"""
+        if self._watcher is not None or interval <= 0:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.check_for_changes()
+                except Exception:
+                    logger.exception("Fixture watcher error")
+
+        self._watcher = threading.Thread(target=run, name='fixture-watcher', daemon=True)
+        self._watcher.start()
+
+    def status(self):
+        return {
+            'version': self.version,
+            'source': self.source,
+            'loaded_at': self.loaded_at,
+            'reload_ms': self.reload_ms,
+            'watching': self._watcher is not None,
+            'last_error': self.last_error
+        }
@@ -0,0 +1,205 @@
+"""
+Semantic playbook retrieval
+Embeds playbooks with the same SentenceTransformer model as the RAG service
+(rag_service.py) and ranks them by cosine similarity to the free-text query,
+alone (mode=semantic) or blended with BM25 (mode=hybrid).
+
+Embeddings are cached by playbook content hash, so a fixture reload only
+embeds new or edited playbooks, and can be persisted with
+EMBEDDING_CACHE_PATH so a restart does not re-embed everything. The model is
+loaded on the first semantic query (or at startup with
+SEMANTIC_SEARCH_PRELOAD=true); sentence-transformers is optional and only
+needed for these modes.
+"""
+from collections import OrderedDict
+import hashlib
+import logging
+import os
+import threading
+import weakref
+
+try:
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # only needed for semantic and hybrid search
+    np = None
+    SentenceTransformer = None
+
+from playbook_search import field_text
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = 'all-MiniLM-L6-v2'
+SEMANTIC_MODES = ('semantic', 'hybrid')
+
+# Playbooks below this cosine similarity are not counted as semantic matches
+MIN_SIMILARITY = 0.25
+# Weight of the vector score in hybrid mode; BM25 (normalized to the best hit) gets the rest
+DEFAULT_HYBRID_ALPHA = 0.6
+QUERY_CACHE_SIZE = 1024
+
+
+def playbook_text(playbook):
+    """Text embedded for a playbook"""
+    return (f"{field_text(playbook, 'title')}. "
+            f"Category: {field_text(playbook, 'category')}. "
+            f"Alarms: {', '.join(playbook.get('applicableAlarms', []))}. "
+            f"Symptoms: {'; '.join(playbook.get('symptoms', []))}. "
+            f"Root causes: {'; '.join(playbook.get('rootCauses', []))}.")
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class PlaybookEmbedder:
+    """Embedding model plus playbook and query embedding caches, shared across fixture reloads"""
+
+    def __init__(self, model_name=DEFAULT_MODEL, cache_path=None):
+        self.model_name = model_name
+        self.cache_path = cache_path
+        self._model = None
+        self._lock = threading.Lock()
+        self._vectors = {}  # content hash -> normalized float32 vector
+        self._matrices = weakref.WeakKeyDictionary()  # PlaybookIndex -> (n, dim) matrix
+        self._queries = OrderedDict()
+        self.embedded = 0
+
+    @property
+    def available(self):
+        return SentenceTransformer is not None
+
+    def _load_model(self):
+        if SentenceTransformer is None:
+            raise RuntimeError("Semantic search needs sentence-transformers (pip install sentence-transformers)")
+        if self._model is None:
+            logger.info(f"Loading embedding model {self.model_name}")
+            self._model = SentenceTransformer(self.model_name)
+            self._load_cache()
+        return self._model
+
+    def _encode(self, texts):
+        vectors = self._load_model().encode(texts, batch_size=64, convert_to_numpy=True,
+                                            normalize_embeddings=True, show_progress_bar=False)
+        return np.asarray(vectors, dtype=np.float32)
+
+    def _load_cache(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with np.load(self.cache_path, allow_pickle=False) as cache:
+                if str(cache['model']) != self.model_name:
+                    return
+                self._vectors.update(zip(cache['hashes'].tolist(), cache['vectors']))
+            logger.info(f"Loaded {len(self._vectors)} cached playbook embeddings from {self.cache_path}")
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring embedding cache {self.cache_path}: {e}")
+
+    def _save_cache(self):
+        if not self.cache_path or not self._vectors:
+            return
+        hashes = list(self._vectors)
+        tmp_path = f'{self.cache_path}.tmp.npz'
+        try:
+            np.savez(tmp_path, model=np.array(self.model_name), hashes=np.array(hashes),
+                     vectors=np.stack([self._vectors[h] for h in hashes]))
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logger.warning(f"Could not write embedding cache {self.cache_path}: {e}")
+
+    def playbook_matrix(self, index):
+        """Normalized embeddings of `index.playbooks`, one row per playbook (computed once per index)"""
+        matrix = self._matrices.get(index)
+        if matrix is not None:
+            return matrix
+
+        with self._lock:
+            matrix = self._matrices.get(index)
+            if matrix is not None:
+                return matrix
+
+            self._load_model()
+            hashes = [content_hash(playbook_text(p)) for p in index.playbooks]
+            missing = {h: playbook_text(p) for h, p in zip(hashes, index.playbooks) if h not in self._vectors}
+            if missing:
+                self._vectors.update(zip(missing, self._encode(list(missing.values()))))
+                self.embedded += len(missing)
+                self._save_cache()
+
+            dim = self._model.get_sentence_embedding_dimension()
+            matrix = np.stack([self._vectors[h] for h in hashes]) if hashes else np.zeros((0, dim), np.float32)
+            self._matrices[index] = matrix
+            return matrix
+
+    def embed_query(self, text):
+        """Normalized query embedding; repeated agent queries hit the LRU cache"""
+        with self._lock:
+            vector = self._queries.get(text)
+            if vector is not None:
+                self._queries.move_to_end(text)
+                return vector
+        vector = self._encode([text])[0]
+        with self._lock:
+            self._queries[text] = vector
+            while len(self._queries) > QUERY_CACHE_SIZE:
+                self._queries.popitem(last=False)
+        return vector
+
+    def warm(self, index):
+        """Embed `index` in a background thread so the first semantic query is fast"""
+        def run():
+            try:
+                self.playbook_matrix(index)
+            except Exception:
+                logger.exception("Embedding warm-up failed")
+
+        threading.Thread(target=run, name='embedding-warmup', daemon=True).start()
+
+    def search(self, index, alarm_type, symptoms, mode='semantic', limit=3, alpha=DEFAULT_HYBRID_ALPHA):
+        """Return (number of matching playbooks, top `limit` results), like PlaybookIndex.search
+
+        Results carry relevance_score (cosine similarity in semantic mode, the
+        blended score in hybrid mode), similarity and bm25_score.
+        """
+        if mode not in SEMANTIC_MODES:
+            raise ValueError(f"Unknown search mode '{mode}', expected one of {list(SEMANTIC_MODES)}")
+
+        query = ' '.join(filter(None, [alarm_type, *symptoms]))
+        matrix = self.playbook_matrix(index)
+        if not query or not len(matrix):
+            return 0, []
+
+        similarity = matrix @ self.embed_query(query)
+        bm25 = np.zeros(len(matrix))
+        if mode == 'hybrid':
+            for doc, score in index.bm25_scores(query).items():
+                bm25[doc] = score
+
+        matched = similarity >= MIN_SIMILARITY
+        if mode == 'semantic':
+            scores = similarity
+        else:
+            matched |= bm25 > 0
+            bm25_max = bm25.max()
+            scores = alpha * np.clip(similarity, 0, None) + (1 - alpha) * (bm25 / bm25_max if bm25_max > 0 else bm25)
+
+        candidates = np.flatnonzero(matched)
+        top = candidates[np.argsort(-scores[candidates], kind='stable')[:limit]]
+        return len(candidates), [
+            {
+                'playbook': index.playbooks[doc],
+                'relevance_score': round(float(scores[doc]), 4),
+                'similarity': round(float(similarity[doc]), 4),
+                'bm25_score': round(float(bm25[doc]), 4)
+            }
+            for doc in top
+        ]
+
+    def status(self):
+        return {
+            'available': self.available,
+            'model': self.model_name,
+            'loaded': self._model is not None,
+            'cached_embeddings': len(self._vectors),
+            'embedded': self.embedded
+        }
@@ -0,0 +1,169 @@
+"""
+Remediation playbook search
+Playbooks are tokenized once when the fixtures are loaded into:
+- alarm-type and category indexes plus a trigram index over the lowercased
+  symptoms, which reproduce the keyword relevance scores exactly (10 for an
+  applicable alarm, 10 for the category, 5 per symptom found as a substring)
+  without scanning every playbook
+- an inverted index over title, symptoms, applicableAlarms, category and
+  rootCauses for BM25 ranking
+"""
+import heapq
+import math
+import re
+
+# Fields indexed for BM25 ranking
+BM25_FIELDS = ('title', 'symptoms', 'applicableAlarms', 'category', 'rootCauses')
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Search modes: keyword = relevance scores as before, ties ranked by BM25; bm25 = pure BM25
+SEARCH_MODES = ('keyword', 'bm25')
+
+ALARM_TYPE_SCORE = 10
+CATEGORY_SCORE = 10
+SYMPTOM_SCORE = 5
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def field_text(playbook, field):
+    value = playbook.get(field) or ''
+    return ' '.join(value) if isinstance(value, list) else str(value)
+
+
+class PlaybookIndex:
+    """Keyword and BM25 search over a list of playbooks; read-only once built"""
+
+    def __init__(self, playbooks):
+        self.playbooks = playbooks
+
+        self.by_applicable_alarm = {}
+        self.by_category = {}
+        # Lowercased symptom strings, the playbook each belongs to, and trigram -> symptom ids
+        self.symptom_texts = []
+        self.symptom_docs = []
+        self.symptom_trigrams = {}
+
+        term_counts_by_doc = []
+
+        for doc, playbook in enumerate(playbooks):
+            for alarm_type in set(playbook.get('applicableAlarms', [])):
+                self.by_applicable_alarm.setdefault(alarm_type, []).append(doc)
+            if playbook.get('category'):
+                self.by_category.setdefault(playbook['category'], []).append(doc)
+
+            for symptom in playbook.get('symptoms', []):
+                symptom_id = len(self.symptom_texts)
+                text = symptom.lower()
+                self.symptom_texts.append(text)
+                self.symptom_docs.append(doc)
+                for trigram in trigrams(text):
+                    self.symptom_trigrams.setdefault(trigram, set()).add(symptom_id)
+
+            term_counts = {}
+            for field in BM25_FIELDS:
+                for token in tokenize(field_text(playbook, field)):
+                    term_counts[token] = term_counts.get(token, 0) + 1
+            term_counts_by_doc.append(term_counts)
+
+        # BM25 term weights do not depend on the query, so they are computed here:
+        # postings map token -> [(doc, weight)] and doc_weights doc -> {token: weight}
+        doc_freq = {}
+        for term_counts in term_counts_by_doc:
+            for token in term_counts:
+                doc_freq[token] = doc_freq.get(token, 0) + 1
+        doc_lengths = [sum(term_counts.values()) for term_counts in term_counts_by_doc]
+        # Playbooks without any indexable text would make the average 0
+        avg_doc_length = (sum(doc_lengths) / len(doc_lengths) if doc_lengths else 0.0) or 1.0
+
+        self.postings = {}
+        self.doc_weights = []
+        for doc, term_counts in enumerate(term_counts_by_doc):
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths[doc] / avg_doc_length)
+            weights = {}
+            for token, tf in term_counts.items():
+                idf = math.log(1 + (len(playbooks) - doc_freq[token] + 0.5) / (doc_freq[token] + 0.5))
+                weights[token] = idf * tf * (BM25_K1 + 1) / (tf + norm)
+                self.postings.setdefault(token, []).append((doc, weights[token]))
+            self.doc_weights.append(weights)
+
+    def docs_with_symptom(self, symptom):
+        """Playbooks with a symptom containing `symptom` (case-insensitive substring)"""
+        query = symptom.lower()
+        query_trigrams = trigrams(query)
+        if query_trigrams:
+            # Every trigram of the query must occur in a matching symptom; verify the survivors
+            candidates = None
+            for trigram in sorted(query_trigrams, key=lambda t: len(self.symptom_trigrams.get(t, ()))):
+                ids = self.symptom_trigrams.get(trigram)
+                if not ids:
+                    return set()
+                candidates = set(ids) if candidates is None else candidates & ids
+                if not candidates:
+                    return set()
+        else:
+            candidates = range(len(self.symptom_texts))
+        return {self.symptom_docs[i] for i in candidates if query in self.symptom_texts[i]}
+
+    def keyword_scores(self, alarm_type, symptoms):
+        """doc -> relevance score, for playbooks scoring above zero"""
+        scores = {}
+        if alarm_type:
+            for doc in self.by_applicable_alarm.get(alarm_type, []):
+                scores[doc] = scores.get(doc, 0) + ALARM_TYPE_SCORE
+            for doc in self.by_category.get(alarm_type, []):
+                scores[doc] = scores.get(doc, 0) + CATEGORY_SCORE
+        for symptom in symptoms:
+            for doc in self.docs_with_symptom(symptom):
+                scores[doc] = scores.get(doc, 0) + SYMPTOM_SCORE
+        return scores
+
+    def bm25_scores(self, text):
+        """doc -> BM25 score of the query `text`, for every playbook sharing a token with it"""
+        scores = {}
+        for token in tokenize(text):
+            for doc, weight in self.postings.get(token, ()):
+                scores[doc] = scores.get(doc, 0.0) + weight
+        return scores
+
+    def bm25_score(self, doc, tokens):
+        """BM25 score of one playbook for already tokenized query `tokens`"""
+        weights = self.doc_weights[doc]
+        return sum(weights.get(token, 0.0) for token in tokens)
+
+    def search(self, alarm_type, symptoms, mode='keyword', limit=3):
+        """Return (number of matching playbooks, top `limit` results)
+
+        Each result is {'playbook', 'relevance_score', 'bm25_score'}; in bm25
+        mode the relevance score is the BM25 score.
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{mode}', expected one of {list(SEARCH_MODES)}")
+
+        query = ' '.join([alarm_type or '', *symptoms])
+        if mode == 'keyword':
+            scores = self.keyword_scores(alarm_type, symptoms)
+            # BM25 only breaks ties, so it is only needed for the matched playbooks
+            tokens = tokenize(query)
+            bm25 = {doc: self.bm25_score(doc, tokens) for doc in scores}
+        else:
+            scores = bm25 = self.bm25_scores(query)
+
+        top = heapq.nsmallest(limit, scores, key=lambda doc: (-scores[doc], -bm25.get(doc, 0.0), doc))
+        return len(scores), [
+            {
+                'playbook': self.playbooks[doc],
+                'relevance_score': round(scores[doc], 4) if mode == 'bm25' else scores[doc],
+                'bm25_score': round(bm25.get(doc, 0.0), 4)
+            }
+            for doc in top
+        ]
@@ -0,0 +1,162 @@
+"""
+TTL cache with single-flight request coalescing for simulator proxies
+Simulator data only changes once per tick, so identical requests within the
+TTL share one upstream response, and concurrent misses for the same key wait
+for a single in-flight fetch instead of each calling the simulator
+"""
+from collections import OrderedDict
+import asyncio
+import threading
+import time
+
+# Cache outcomes reported to clients
+HIT = 'HIT'
+MISS = 'MISS'
+COALESCED = 'COALESCED'
+
+
+class CacheInfo:
+    """How a cached value was obtained and how old it is"""
+
+    def __init__(self, status, fetched_at, ttl):
+        self.status = status
+        self.fetched_at = fetched_at
+        self.ttl = ttl
+
+    @property
+    def age(self):
+        return max(0.0, time.time() - self.fetched_at)
+
+    def headers(self):
+        """Staleness headers for the proxied response"""
+        return {
+            'X-Cache': self.status,
+            'Age': str(int(self.age)),
+            'X-Cache-Age-Ms': str(int(self.age * 1000)),
+            'Cache-Control': f'max-age={int(max(0.0, self.ttl - self.age))}'
+        }
+
+
+class _Flight:
+    """An in-flight upstream fetch that other callers can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.fetched_at = None
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after `ttl` seconds"""
+
+    def __init__(self, ttl=2.0, max_entries=1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get_or_fetch(self, key, fetch):
+        """Return (value, CacheInfo), calling `fetch()` at most once per key at a time
+
+        Errors raised by `fetch` propagate to every waiting caller and are not cached.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[1] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0], CacheInfo(HIT, entry[1], self.ttl)
+
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value, CacheInfo(COALESCED, flight.fetched_at, self.ttl)
+
+        try:
+            flight.value = fetch()
+            flight.fetched_at = time.time()
+            with self._lock:
+                self._entries[key] = (flight.value, flight.fetched_at)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+        return flight.value, CacheInfo(MISS, flight.fetched_at, self.ttl)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'ttl_seconds': self.ttl,
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced
+            }
+
+
+class AsyncTTLCache(TTLCache):
+    """TTLCache for asyncio code: waiters await a shared future instead of blocking a thread
+
+    Only used from the event loop thread, so the inherited lock is never contended.
+    """
+
+    async def get_or_fetch_async(self, key, fetch):
+        """Return (value, CacheInfo), awaiting `fetch()` at most once per key at a time
+
+        The fetch runs as its own task, so a caller that is cancelled (e.g. its
+        client disconnected) does not cancel it for the callers coalesced on it.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and time.time() - entry[1] < self.ttl:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], CacheInfo(HIT, entry[1], self.ttl)
+
+        flight = self._flights.get(key)
+        if flight is None:
+            self.misses += 1
+            status = MISS
+            flight = asyncio.get_running_loop().create_task(self._fetch(key, fetch))
+            # Retrieve the error here so one with no callers left is not reported as unhandled
+            flight.add_done_callback(lambda task: task.cancelled() or task.exception())
+            self._flights[key] = flight
+        else:
+            self.coalesced += 1
+            status = COALESCED
+
+        value, fetched_at = await asyncio.shield(flight)
+        return value, CacheInfo(status, fetched_at, self.ttl)
+
+    async def _fetch(self, key, fetch):
+        """Run the upstream fetch for `key` and cache its value; returns (value, fetched_at)"""
+        try:
+            value = await fetch()
+            fetched_at = time.time()
+            self._entries[key] = (value, fetched_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return value, fetched_at
+        finally:
+            self._flights.pop(key, None)
@@ -0,0 +1,131 @@
+"""
+Pooled HTTP client for the RAN simulator
+Shares one keep-alive connection pool across all proxy handlers, with
+per-endpoint timeouts and retry/backoff for transient upstream failures
+An asyncio variant backed by httpx serves the ASGI mode
+"""
+import asyncio
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import httpx
+except ImportError:  # only needed for the ASGI serving mode
+    httpx = None
+
+# (connect, read) timeouts in seconds per simulator endpoint
+DEFAULT_TIMEOUTS = {
+    'health': (1.0, 2.0),
+    'status': (1.0, 3.0),
+    'metrics': (1.0, 3.0),
+    'sites': (1.0, 5.0),
+    'site': (1.0, 5.0),
+    'cells': (1.0, 10.0),
+    'cell': (1.0, 5.0),
+    'ues': (1.0, 10.0)
+}
+
+# Upstream statuses worth retrying (simulator restarting or overloaded)
+RETRY_STATUSES = (502, 503, 504)
+
+
+class SimulatorClient:
+    """Keep-alive client for the RAN simulator REST API"""
+
+    def __init__(self, base_url, pool_size=20, retries=2, backoff_factor=0.2, timeouts=None):
+        self.base_url = base_url.rstrip('/')
+        self.pool_size = pool_size
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(['GET']),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get(self, endpoint, path, params=None):
+        """GET `path` with the timeouts of `endpoint`; returns the raw response"""
+        return self.session.get(
+            f'{self.base_url}{path}',
+            params=params,
+            timeout=self.timeouts.get(endpoint, DEFAULT_TIMEOUTS['site'])
+        )
+
+    def get_json(self, endpoint, path, params=None):
+        """GET `path` and decode JSON, raising requests.RequestException on HTTP errors"""
+        response = self.get(endpoint, path, params=params)
+        response.raise_for_status()
+        return response.json()
+
+
+class AsyncSimulatorClient:
+    """Non-blocking keep-alive client for the RAN simulator (httpx)"""
+
+    def __init__(self, base_url, pool_size=100, retries=2, backoff_factor=0.2, timeouts=None):
+        if httpx is None:
+            raise RuntimeError("The ASGI serving mode needs httpx (pip install httpx)")
+        self.base_url = base_url.rstrip('/')
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        )
+
+    async def get(self, endpoint, path, params=None):
+        """GET `path`, retrying transport errors and 502/503/504 with exponential backoff"""
+        connect, read = self.timeouts.get(endpoint, DEFAULT_TIMEOUTS['site'])
+        timeout = httpx.Timeout(read, connect=connect)
+        for attempt in range(self.retries + 1):
+            try:
+                response = await self.client.get(path, params=params, timeout=timeout)
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    return response
+            except httpx.TransportError:
+                if attempt == self.retries:
+                    raise
+            await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+
+    async def get_json(self, endpoint, path, params=None):
+        """GET `path` and decode JSON, raising httpx.HTTPError on HTTP errors"""
+        response = await self.get(endpoint, path, params=params)
+        response.raise_for_status()
+        return response.json()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+def parse_timeouts(value):
+    """Parse 'ues=10,metrics=2.5' (read timeout) or 'ues=1:10' (connect:read) overrides"""
+    timeouts = {}
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        endpoint, _, seconds = item.partition('=')
+        connect, _, read = seconds.partition(':')
+        if read:
+            timeouts[endpoint] = (float(connect), float(read))
+        else:
+            timeouts[endpoint] = (DEFAULT_TIMEOUTS.get(endpoint, (1.0, 5.0))[0], float(connect))
+    return timeouts
+
+
+def client_from_env(base_url, client_class=SimulatorClient):
+    """Build the shared client from SIMULATOR_POOL_SIZE, SIMULATOR_RETRIES,
+    SIMULATOR_BACKOFF and SIMULATOR_TIMEOUTS"""
+    return client_class(
+        base_url,
+        pool_size=int(os.environ.get('SIMULATOR_POOL_SIZE', 20)),
+        retries=int(os.environ.get('SIMULATOR_RETRIES', 2)),
+        backoff_factor=float(os.environ.get('SIMULATOR_BACKOFF', 0.2)),
+        timeouts=parse_timeouts(os.environ.get('SIMULATOR_TIMEOUTS', ''))
+    )
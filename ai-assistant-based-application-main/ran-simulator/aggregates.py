@@ -0,0 +1,133 @@
+# Incrementally maintained KPI aggregates for the gNodeB simulator
+# Per-site and global sums are adjusted by the per-cell deltas of each state
+# change, so /gnb/metrics and the site metrics of /gnb/sites/<site_id> are
+# answered in O(1) instead of being recomputed over every cell per request.
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Floating-point sums are rebuilt from scratch this often to bound drift
+RESYNC_INTERVAL = 1000
+
+
+class KpiAggregates:
+    """Running per-site and global sums over per-cell KPIs"""
+
+    def __init__(self, site_ids: List[str], cell_site_ids: List[str], site_statuses: Dict[str, str]):
+        self.site_index = {site_id: idx for idx, site_id in enumerate(site_ids)}
+        self.cell_site = np.array([self.site_index[s] for s in cell_site_ids], dtype=np.int64)
+        num_sites, num_cells = len(site_ids), len(cell_site_ids)
+
+        self.site_total_cells = np.bincount(self.cell_site, minlength=num_sites)
+        self.site_ues = np.zeros(num_sites, dtype=np.int64)
+        self.site_load = np.zeros(num_sites, dtype=np.int64)
+        self.site_active_cells = np.zeros(num_sites, dtype=np.int64)
+
+        self.total_ues = 0
+        self.active_cells = 0
+        self.active_sinr_sum = 0.0
+        self.active_rsrp_sum = 0.0
+        self.operational_sites = sum(1 for status in site_statuses.values() if status == "OPERATIONAL")
+
+        # Per-cell values already accounted for in the sums
+        self._counts = np.zeros(num_cells, dtype=np.int64)
+        self._load = np.zeros(num_cells, dtype=np.int64)
+        self._sinr = np.zeros(num_cells, dtype=np.float64)
+        self._rsrp = np.zeros(num_cells, dtype=np.float64)
+        self._active = np.zeros(num_cells, dtype=bool)
+        self._syncs = 0
+
+    def sync(self, counts: np.ndarray, load: np.ndarray, sinr: np.ndarray, rsrp: np.ndarray,
+             active: np.ndarray, cells: Optional[np.ndarray] = None):
+        """Fold the current per-cell values of `cells` (default: any that changed) into the sums"""
+        self._syncs += 1
+        if self._syncs % RESYNC_INTERVAL == 0:
+            self.rebuild(counts, load, sinr, rsrp, active)
+            return
+
+        if cells is None:
+            cells = np.flatnonzero((counts != self._counts) | (load != self._load) |
+                                   (sinr != self._sinr) | (rsrp != self._rsrp) |
+                                   (active != self._active))
+        if len(cells) == 0:
+            return
+
+        new_active = active[cells]
+        old_active = self._active[cells]
+        d_counts = counts[cells] - self._counts[cells]
+        d_load = load[cells] - self._load[cells]
+        d_active = new_active.astype(np.int64) - old_active
+        d_sinr = np.where(new_active, sinr[cells], 0.0) - np.where(old_active, self._sinr[cells], 0.0)
+        d_rsrp = np.where(new_active, rsrp[cells], 0.0) - np.where(old_active, self._rsrp[cells], 0.0)
+
+        sites = self.cell_site[cells]
+        np.add.at(self.site_ues, sites, d_counts)
+        np.add.at(self.site_load, sites, d_load)
+        np.add.at(self.site_active_cells, sites, d_active)
+
+        self.total_ues += int(d_counts.sum())
+        self.active_cells += int(d_active.sum())
+        self.active_sinr_sum += float(d_sinr.sum())
+        self.active_rsrp_sum += float(d_rsrp.sum())
+
+        self._counts[cells] = counts[cells]
+        self._load[cells] = load[cells]
+        self._sinr[cells] = sinr[cells]
+        self._rsrp[cells] = rsrp[cells]
+        self._active[cells] = new_active
+
+    def rebuild(self, counts: np.ndarray, load: np.ndarray, sinr: np.ndarray, rsrp: np.ndarray,
+                 active: np.ndarray):
+        """Recompute every sum from the per-cell values"""
+        num_sites = len(self.site_total_cells)
+        self.site_ues = np.bincount(self.cell_site, weights=counts, minlength=num_sites).astype(np.int64)
+        self.site_load = np.bincount(self.cell_site, weights=load, minlength=num_sites).astype(np.int64)
+        self.site_active_cells = np.bincount(self.cell_site, weights=active, minlength=num_sites).astype(np.int64)
+        self.total_ues = int(counts.sum())
+        self.active_cells = int(active.sum())
+        self.active_sinr_sum = float(sinr[active].sum())
+        self.active_rsrp_sum = float(rsrp[active].sum())
+
+        self._counts = counts.astype(np.int64)
+        self._load = load.astype(np.int64)
+        self._sinr = sinr.astype(np.float64)
+        self._rsrp = rsrp.astype(np.float64)
+        self._active = active.astype(bool)
+
+    def site_status_changed(self, old_status: str, new_status: str):
+        """Account for a site moving in or out of OPERATIONAL"""
+        self.operational_sites += (new_status == "OPERATIONAL") - (old_status == "OPERATIONAL")
+
+    def freeze(self) -> "FrozenAggregates":
+        return FrozenAggregates(self)
+
+
+class FrozenAggregates:
+    """Read-only copy of the aggregates, published with each snapshot"""
+
+    def __init__(self, aggregates: KpiAggregates):
+        self._site_index = aggregates.site_index
+        self._site_total_cells = aggregates.site_total_cells
+        self._site_ues = aggregates.site_ues.copy()
+        self._site_load = aggregates.site_load.copy()
+        self._site_active_cells = aggregates.site_active_cells.copy()
+
+        self.total_ues = aggregates.total_ues
+        self.active_cells = aggregates.active_cells
+        self.operational_sites = aggregates.operational_sites
+        self.average_sinr = aggregates.active_sinr_sum / aggregates.active_cells if aggregates.active_cells else 0
+        self.average_rsrp = aggregates.active_rsrp_sum / aggregates.active_cells if aggregates.active_cells else 0
+
+    def site_metrics(self, site_id: str) -> Optional[Dict]:
+        """Site-level metrics in the shape served by /gnb/sites/<site_id>"""
+        idx = self._site_index.get(site_id)
+        if idx is None:
+            return None
+        total_cells = int(self._site_total_cells[idx])
+        return {
+            "total_connected_ues": int(self._site_ues[idx]),
+            "average_cell_load": round(self._site_load[idx] / total_cells, 2) if total_cells else 0,
+            "active_cells": int(self._site_active_cells[idx]),
+            "total_cells": total_cells
+        }
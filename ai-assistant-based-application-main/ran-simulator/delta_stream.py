@@ -0,0 +1,199 @@
+# Delta stream of simulator state
+# Computes what changed between two published snapshots (once per pair,
+# vectorized over all cells) and fans it out to Server-Sent-Events
+# subscribers, each filtered to the sites/cells it subscribed to.
+
+from collections import deque
+from typing import Deque, Dict, Iterable, Optional, Set
+import json
+import threading
+
+import numpy as np
+
+from snapshot import SimulatorSnapshot
+
+# RF values are compared and sent at this precision, so sub-noise jitter
+# does not produce a delta
+RF_DECIMALS = 2
+
+
+class SnapshotBroker:
+    """Hands the latest snapshot to stream subscribers as soon as it is published
+
+    Subscribers hold only the version they last sent; the broker keeps the
+    last `max_lag` snapshots to diff against. A subscriber that falls further
+    behind (a stalled client) resyncs from a full snapshot, so it never keeps
+    an old snapshot, and the UE slots it references, alive.
+    """
+
+    def __init__(self, max_lag: int = 8):
+        self._condition = threading.Condition()
+        self._recent: Deque[SimulatorSnapshot] = deque(maxlen=max(1, max_lag) + 1)
+        self._deltas: Dict = {}
+
+    def publish(self, snapshot: SimulatorSnapshot):
+        with self._condition:
+            self._recent.append(snapshot)
+            # Deltas are only reused between the two most recent snapshots
+            self._deltas = {key: delta for key, delta in self._deltas.items()
+                            if key[1] >= snapshot.version - 1}
+            self._condition.notify_all()
+
+    def wait_for_newer(self, version: int, timeout: float) -> Optional[SimulatorSnapshot]:
+        """Block until a snapshot newer than `version` exists, or return None on timeout"""
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._recent and self._recent[-1].version > version, timeout
+            )
+            latest = self._recent[-1] if self._recent else None
+        return latest if latest is not None and latest.version > version else None
+
+    def retained(self, version: int) -> Optional[SimulatorSnapshot]:
+        """The snapshot with `version`, or None once it is more than max_lag versions old"""
+        with self._condition:
+            for snapshot in self._recent:
+                if snapshot.version == version:
+                    return snapshot
+        return None
+
+    def delta(self, previous: SimulatorSnapshot, current: SimulatorSnapshot) -> "SnapshotDelta":
+        """Shared, memoized delta between two snapshots"""
+        key = (previous.version, current.version)
+        delta = self._deltas.get(key)
+        if delta is None:
+            delta = SnapshotDelta(previous, current)
+            self._deltas[key] = delta
+        return delta
+
+
+class SnapshotDelta:
+    """Cell, site and metric changes between two snapshots"""
+
+    def __init__(self, previous: SimulatorSnapshot, current: SimulatorSnapshot):
+        self.previous = previous
+        self.current = current
+
+        prev_ues, cur_ues = previous.ues, current.ues
+        self.changed_load = previous.load != current.load
+        self.changed_sinr = np.round(previous.sinr, RF_DECIMALS) != np.round(current.sinr, RF_DECIMALS)
+        self.changed_rsrp = np.round(previous.rsrp, RF_DECIMALS) != np.round(current.rsrp, RF_DECIMALS)
+        self.changed_ues = prev_ues.cell_counts != cur_ues.cell_counts
+
+        # Cell and site contexts are replaced, never modified, when their static fields change
+        self.changed_contexts = {
+            cell_id for cell_id in current.cell_ids()
+            if previous.cell_context(cell_id) is not current.cell_context(cell_id)
+        }
+        self.changed_sites = {
+            site_id for site_id, site in current.sites.items()
+            if previous.sites.get(site_id) is not site
+        }
+        self.changed_cells = (self.changed_load | self.changed_sinr | self.changed_rsrp |
+                              self.changed_ues)
+
+    def cell_changes(self, cell_indexes: Optional[np.ndarray], include_ues: bool) -> Dict[str, Dict]:
+        """Changed fields per cell, restricted to `cell_indexes` (all cells if None)"""
+        current = self.current
+        changed = self.changed_cells
+        if cell_indexes is not None:
+            mask = np.zeros(len(changed), dtype=bool)
+            mask[cell_indexes] = True
+            changed = changed & mask
+
+        cell_ids = current.ues.cell_ids
+        changes: Dict[str, Dict] = {}
+        for idx in np.flatnonzero(changed).tolist():
+            fields = {}
+            if self.changed_load[idx]:
+                fields["load"] = current.load[idx].item()
+            if self.changed_sinr[idx]:
+                fields["averageSINR_dB"] = round(current.sinr[idx].item(), RF_DECIMALS)
+            if self.changed_rsrp[idx]:
+                fields["averageRSRP_dBm"] = round(current.rsrp[idx].item(), RF_DECIMALS)
+            if self.changed_ues[idx]:
+                fields["connectedUeCount"] = int(current.ues.cell_counts[idx])
+                if include_ues:
+                    fields.update(self._ue_changes(idx))
+            changes[cell_ids[idx]] = fields
+
+        subscribed = None if cell_indexes is None else set(np.asarray(cell_indexes).tolist())
+        for cell_id in self.changed_contexts:
+            if subscribed is None or current.ues.cell_index(cell_id) in subscribed:
+                context = current.cell_context(cell_id)
+                changes.setdefault(cell_id, {})["cellState"] = context["cellState"]
+        return changes
+
+    def _ue_changes(self, idx: int) -> Dict:
+        """UEs attached to / detached from a cell between the two snapshots"""
+        previous_slots = self.previous.ues.cell_slot_tuple(idx)
+        current_slots = self.current.ues.cell_slot_tuple(idx)
+
+        # A slot is never reused while a snapshot showing it is alive, so slots
+        # present in both snapshots hold the same UE
+
+        previous_set, current_set = set(previous_slots), set(current_slots)
+        return {
+            "uesAttached": self.current.ues.ue_ids([s for s in current_slots if s not in previous_set]),
+            "uesDetached": self.previous.ues.ue_ids([s for s in previous_slots if s not in current_set])
+        }
+
+    def site_changes(self, site_ids: Optional[Set[str]]) -> Dict[str, Dict]:
+        changes = {}
+        for site_id in self.changed_sites:
+            if site_ids is None or site_id in site_ids:
+                previous = self.previous.sites.get(site_id, {})
+                site = self.current.sites[site_id]
+                changes[site_id] = {k: v for k, v in site.items() if previous.get(k) != v}
+        return changes
+
+    def metrics(self) -> Dict:
+        return {
+            "total_ues": len(self.current.ues),
+            "active_cells": self.current.aggregates.active_cells
+        }
+
+
+def resolve_subscription(snapshot: SimulatorSnapshot, site_ids: Iterable[str],
+                         cell_ids: Iterable[str]):
+    """Turn site/cell filters into (site id set, cell index array); None means everything"""
+    site_ids = {s for s in site_ids if s}
+    cell_ids = {c for c in cell_ids if c}
+    if not site_ids and not cell_ids:
+        return None, None
+
+    cells = set(cell_ids)
+    for site_id in site_ids:
+        site = snapshot.sites.get(site_id)
+        if site:
+            cells.update(site["cells"])
+    indexes = [snapshot.ues.cell_index(cell_id) for cell_id in cells]
+    cell_indexes = np.array(sorted(i for i in indexes if i is not None), dtype=np.int64)
+    subscribed_sites = site_ids | {snapshot.cell_site(c) for c in cell_ids if snapshot.has_cell(c)}
+    return subscribed_sites, cell_indexes
+
+
+def build_delta(delta: SnapshotDelta, site_ids: Optional[Set[str]],
+                cell_indexes: Optional[np.ndarray], include_ues: bool) -> Optional[Dict]:
+    """Delta payload for one subscriber, or None when nothing it watches changed"""
+    cells = delta.cell_changes(cell_indexes, include_ues)
+    sites = delta.site_changes(site_ids)
+    if not cells and not sites:
+        return None
+    return {
+        "version": delta.current.version,
+        "baseVersion": delta.previous.version,
+        "timestamp": delta.current.created_at,
+        "cells": cells,
+        "sites": sites,
+        "metrics": delta.metrics()
+    }
+
+
+def sse_event(event: str, data: Dict, event_id: Optional[int] = None) -> str:
+    """Format one Server-Sent-Events message"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
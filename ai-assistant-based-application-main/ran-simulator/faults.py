@@ -0,0 +1,288 @@
+# Runtime fault injection and scenario scheduling for the gNodeB simulator
+# Faults (cell down, transport failure, VSWR rise, interference storm, UE
+# surge) are applied to many cells at once through the tick engine. A
+# scenario is a timeline of inject/clear events relative to its start tick;
+# target sampling is seeded, so replaying a scenario reproduces its incidents.
+
+from typing import Callable, Dict, List, Optional
+import itertools
+import logging
+
+import numpy as np
+
+from tick_engine import TickEngine
+
+logger = logging.getLogger(__name__)
+
+# Parameter defaults per fault type
+FAULT_TYPES = {
+    "cell_down": {},
+    "transport_failure": {"down_cells": 1},
+    "vswr_rise": {"vswr": 2.8, "rsrp_drop_db": 6.0},
+    "interference_storm": {"sinr_drop_db": 10.0},
+    "ue_surge": {"ues_per_cell": 40}
+}
+
+# Faults that apply once and have nothing to clear
+ONE_SHOT_FAULTS = {"ue_surge"}
+
+
+def validate_fault(spec: Dict) -> Dict:
+    """Check a fault spec and fill in parameter defaults, raising ValueError if invalid"""
+    if not isinstance(spec, dict):
+        raise ValueError("Fault must be an object")
+    fault_type = spec.get("type")
+    if fault_type not in FAULT_TYPES:
+        raise ValueError(f"Unknown fault type {fault_type!r}; expected one of {', '.join(FAULT_TYPES)}")
+
+    targets = spec.get("targets") or {}
+    if not isinstance(targets, dict):
+        raise ValueError("targets must be an object")
+    if not any(targets.get(key) for key in ("sites", "cells", "site_share", "cell_share")):
+        raise ValueError("Fault needs targets: sites, cells, site_share or cell_share")
+    for key in ("site_share", "cell_share"):
+        if key in targets and not 0.0 < float(targets[key]) <= 1.0:
+            raise ValueError(f"{key} must be between 0 and 1")
+
+    unknown = set(spec.get("params") or {}) - set(FAULT_TYPES[fault_type])
+    if unknown:
+        raise ValueError(f"Unknown params for {fault_type}: {', '.join(sorted(unknown))}")
+    params = {**FAULT_TYPES[fault_type], **(spec.get("params") or {})}
+
+    duration = spec.get("duration_ticks")
+    if duration is not None and int(duration) < 1:
+        raise ValueError("duration_ticks must be positive")
+    return {"type": fault_type, "targets": targets, "params": params,
+            "duration_ticks": int(duration) if duration is not None else None}
+
+
+def validate_scenario(spec: Dict) -> Dict:
+    """Check a scenario timeline, raising ValueError if invalid"""
+    events = spec.get("events") if isinstance(spec, dict) else None
+    if not events or not isinstance(events, list):
+        raise ValueError("Scenario needs a non-empty events list")
+    if not all(isinstance(event, dict) for event in events):
+        raise ValueError("Each scenario event must be an object")
+
+    checked, refs = [], set()
+    for event in sorted(events, key=lambda e: int(e.get("at_tick", 0))):
+        at_tick = int(event.get("at_tick", 0))
+        if at_tick < 0:
+            raise ValueError("at_tick must not be negative")
+        action = event.get("action", "inject")
+        if action == "inject":
+            fault = validate_fault(event.get("fault"))
+            if event.get("ref"):
+                refs.add(event["ref"])
+            checked.append({"at_tick": at_tick, "action": action, "ref": event.get("ref"), "fault": fault})
+        elif action == "clear":
+            if event.get("ref") not in refs:
+                raise ValueError(f"clear event at tick {at_tick} refers to unknown ref {event.get('ref')!r}")
+            checked.append({"at_tick": at_tick, "action": action, "ref": event["ref"]})
+        else:
+            raise ValueError(f"Unknown event action {action!r}")
+    seed = spec.get("seed")
+    return {"name": spec.get("name", "scenario"), "seed": int(seed) if seed is not None else None,
+            "events": checked}
+
+
+class Scenario:
+    """A running timeline of fault events, relative to its start tick"""
+
+    def __init__(self, scenario_id: str, spec: Dict, start_tick: int):
+        self.scenario_id = scenario_id
+        self.spec = spec
+        self.start_tick = start_tick
+        self.rng = np.random.default_rng(spec["seed"])
+        self.next_event = 0
+        self.cancelled = False
+        self.fault_ids: Dict[str, str] = {}
+
+    @property
+    def finished(self) -> bool:
+        return self.cancelled or self.next_event >= len(self.spec["events"])
+
+    def to_dict(self) -> Dict:
+        return {
+            "scenarioId": self.scenario_id,
+            "name": self.spec["name"],
+            "seed": self.spec["seed"],
+            "startTick": self.start_tick,
+            "eventsApplied": self.next_event,
+            "eventsTotal": len(self.spec["events"]),
+            "status": "CANCELLED" if self.cancelled else "FINISHED" if self.finished else "RUNNING",
+            "faults": dict(self.fault_ids)
+        }
+
+
+class FaultInjector:
+    """Applies and clears faults on a tick engine; every method needs the engine lock held"""
+
+    def __init__(self, engine: TickEngine, seed: Optional[int] = None):
+        self.engine = engine
+        self.rng = np.random.default_rng(seed)
+        self.faults: Dict[str, Dict] = {}
+        self.scenarios: Dict[str, Scenario] = {}
+        self._undo: Dict[str, Callable[[], None]] = {}
+        self._fault_ids = itertools.count(1)
+        self._scenario_ids = itertools.count(1)
+
+    def _resolve_targets(self, targets: Dict, rng: np.random.Generator):
+        """Resolve a target spec to (sorted site ids, sorted cell indexes)"""
+        engine = self.engine
+        sites = set(s for s in targets.get("sites", []) if s in engine.site_contexts)
+        if targets.get("site_share"):
+            all_sites = sorted(engine.site_contexts)
+            count = max(1, int(round(len(all_sites) * float(targets["site_share"]))))
+            sites.update(rng.choice(all_sites, size=count, replace=False).tolist())
+
+        cells = set(engine.ue_store.cell_index(c) for c in targets.get("cells", []))
+        cells.discard(None)
+        if targets.get("cell_share"):
+            count = max(1, int(round(len(engine.cell_ids) * float(targets["cell_share"]))))
+            cells.update(rng.choice(len(engine.cell_ids), size=count, replace=False).tolist())
+        return sorted(sites), sorted(cells)
+
+    def inject(self, spec: Dict, tick: int, rng: Optional[np.random.Generator] = None) -> Dict:
+        """Apply a validated fault spec now and return its record"""
+        rng = rng or self.rng
+        sites, cells = self._resolve_targets(spec["targets"], rng)
+        fault_type, params = spec["type"], spec["params"]
+        apply = getattr(self, f"_inject_{fault_type}")
+        affected_cells, undo = apply(sites, cells, params, rng)
+
+        fault_id = f"FAULT-{next(self._fault_ids):05d}"
+        duration = spec["duration_ticks"]
+        fault = {
+            "faultId": fault_id,
+            "type": fault_type,
+            "params": params,
+            "sites": sites,
+            "cells": [self.engine.cell_ids[idx] for idx in affected_cells],
+            "injectedAtTick": tick,
+            "clearAtTick": tick + duration if duration and fault_type not in ONE_SHOT_FAULTS else None
+        }
+        if fault_type not in ONE_SHOT_FAULTS:
+            self.faults[fault_id] = fault
+            self._undo[fault_id] = undo
+        logger.info(f"Injected {fault_type} {fault_id}: {len(sites)} sites, {len(affected_cells)} cells")
+        return fault
+
+    def clear(self, fault_id: str) -> Optional[Dict]:
+        """Undo an active fault; returns its record, or None if it is not active"""
+        fault = self.faults.pop(fault_id, None)
+        if fault is None:
+            return None
+        self._undo.pop(fault_id)()
+        logger.info(f"Cleared {fault['type']} {fault_id}")
+        return fault
+
+    def _site_cell_indexes(self, site_id: str) -> List[int]:
+        return [self.engine.ue_store.cell_index(c) for c in self.engine.site_contexts[site_id]["cells"]]
+
+    def _set_cells_down(self, cells: List[int]) -> List[int]:
+        """Take the active cells among `cells` down and return those that changed"""
+        engine = self.engine
+        downed = [idx for idx in cells if engine.active[idx]]
+        for idx in downed:
+            engine.set_cell_state(engine.cell_ids[idx], "DOWN")
+        return downed
+
+    def _restore_cells(self, cells: List[int]):
+        engine = self.engine
+        for idx in cells:
+            engine.set_cell_state(engine.cell_ids[idx], "ACTIVE")
+
+    def _all_cells(self, sites: List[str], cells: List[int]) -> List[int]:
+        """Explicit cells plus every cell of the targeted sites"""
+        return sorted(set(cells).union(*(self._site_cell_indexes(s) for s in sites)))
+
+    def _inject_cell_down(self, sites, cells, params, rng):
+        downed = self._set_cells_down(self._all_cells(sites, cells))
+        return downed, lambda: self._restore_cells(downed)
+
+    def _inject_transport_failure(self, sites, cells, params, rng):
+        # Explicit cells stand for their sites; each site loses `down_cells` cells
+        engine = self.engine
+        sites = sorted(set(sites) | {engine.cell_contexts[engine.cell_ids[idx]]["siteId"] for idx in cells})
+        previous_status = {site_id: engine.site_contexts[site_id]["status"] for site_id in sites}
+        downed = []
+        for site_id in sites:
+            active = [idx for idx in self._site_cell_indexes(site_id) if engine.active[idx]]
+            count = min(int(params["down_cells"]), len(active))
+            chosen = sorted(rng.choice(active, size=count, replace=False).tolist()) if count else []
+            downed.extend(self._set_cells_down(chosen))
+            engine.set_site_status(site_id, "DEGRADED")
+
+        def undo():
+            self._restore_cells(downed)
+            for site_id, status in previous_status.items():
+                engine.set_site_status(site_id, status)
+        return self._all_cells(sites, []), undo
+
+    def _inject_vswr_rise(self, sites, cells, params, rng):
+        engine = self.engine
+        affected = self._all_cells(sites, cells)
+        previous_vswr = {idx: engine.cell_contexts[engine.cell_ids[idx]].get("vswr") for idx in affected}
+        previous_status = {site_id: engine.site_contexts[site_id]["status"] for site_id in sites}
+        for idx in affected:
+            engine.update_cell_context(engine.cell_ids[idx], vswr=float(params["vswr"]))
+        engine.shift_rsrp(affected, -float(params["rsrp_drop_db"]))
+        for site_id, status in previous_status.items():
+            if status == "OPERATIONAL":
+                engine.set_site_status(site_id, "WARNING")
+
+        def undo():
+            engine.shift_rsrp(affected, float(params["rsrp_drop_db"]))
+            for idx, vswr in previous_vswr.items():
+                cell_id = engine.cell_ids[idx]
+                if vswr is None:
+                    engine.cell_contexts[cell_id] = {k: v for k, v in engine.cell_contexts[cell_id].items()
+                                                     if k != "vswr"}
+                else:
+                    engine.update_cell_context(cell_id, vswr=vswr)
+            for site_id, status in previous_status.items():
+                engine.set_site_status(site_id, status)
+        return affected, undo
+
+    def _inject_interference_storm(self, sites, cells, params, rng):
+        engine = self.engine
+        affected = self._all_cells(sites, cells)
+        engine.shift_sinr(affected, -float(params["sinr_drop_db"]))
+        return affected, lambda: engine.shift_sinr(affected, float(params["sinr_drop_db"]))
+
+    def _inject_ue_surge(self, sites, cells, params, rng):
+        affected = self._all_cells(sites, cells)
+        self.engine.surge_ues(affected, int(params["ues_per_cell"]))
+        return affected, None
+
+    def start_scenario(self, spec: Dict, start_tick: int) -> Scenario:
+        """Schedule a validated scenario; event `at_tick` N fires on tick start_tick + N"""
+        scenario_id = f"SCENARIO-{next(self._scenario_ids):04d}"
+        scenario = Scenario(scenario_id, spec, start_tick)
+        self.scenarios[scenario_id] = scenario
+        return scenario
+
+    def replay(self, scenario_id: str, start_tick: int) -> Optional[Scenario]:
+        """Run a scenario's timeline again from the start, with the same seed"""
+        scenario = self.scenarios.get(scenario_id)
+        return self.start_scenario(scenario.spec, start_tick) if scenario else None
+
+    def run_due(self, tick: int):
+        """Fire scenario events and expire timed faults due at `tick` (engine before_tick hook)"""
+        for scenario in self.scenarios.values():
+            events = scenario.spec["events"]
+            while not scenario.finished and scenario.start_tick + events[scenario.next_event]["at_tick"] <= tick:
+                event = events[scenario.next_event]
+                scenario.next_event += 1
+                if event["action"] == "inject":
+                    fault = self.inject(event["fault"], tick, rng=scenario.rng)
+                    if event["ref"]:
+                        scenario.fault_ids[event["ref"]] = fault["faultId"]
+                elif event["ref"] in scenario.fault_ids:
+                    self.clear(scenario.fault_ids[event["ref"]])
+
+        expired = [fault_id for fault_id, fault in self.faults.items()
+                   if fault["clearAtTick"] is not None and fault["clearAtTick"] <= tick]
+        for fault_id in expired:
+            self.clear(fault_id)
@@ -1,15 +1,27 @@
 # Simplified gNodeB Simulator for RAN Agentic Workflow Demo
 # Based on 3GPP concepts, simplified for demo purposes
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request, stream_with_context
 from flask_cors import CORS
-from datetime import datetime
-from typing import Dict, List
+from collections import deque
+from typing import Dict, List, Optional
 import logging
+import os
 import random
 import threading
 import time
 
+import numpy as np
+
+from delta_stream import SnapshotBroker, build_delta, resolve_subscription, sse_event
+from faults import FAULT_TYPES, FaultInjector, validate_fault, validate_scenario
+from history import KpiHistory, downsample
+from sim_clock import clock_from_env, seed_from_env
+from snapshot import SimulatorSnapshot
+from tick_engine import TickEngine
+from topology import Topology, topology_from_env
+from ue_store import UE_FIELDS, UE_FILTERS, UEStore
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,17 +30,46 @@ app = Flask(__name__)
 CORS(app)
 
 # Global state storage
-ue_contexts: Dict[int, Dict] = {}
+ue_store = UEStore()
 cell_contexts: Dict[str, Dict] = {}
 site_contexts: Dict[str, Dict] = {}
-ran_ue_ngap_id_counter = 1
+
+# Tick period (5 seconds by default for dynamic demos) and simulation seed.
+# With SIM_SEED set, every random draw and timestamp derives from the seed and
+# the tick number, so the same seed always produces the same state.
+TICK_PERIOD_SECONDS = float(os.environ.get('SIM_TICK_SECONDS', '5'))
+SIM_SEED = seed_from_env()
+init_seed, engine_seed, fault_seed = np.random.SeedSequence(SIM_SEED).spawn(3)
+simulation_clock = clock_from_env(TICK_PERIOD_SECONDS, SIM_SEED)
 
 class GNodeBSimulator:
-    def __init__(self):
+    def __init__(self, topology: Optional[Topology] = None, seed: Optional[int] = None,
+                 rng: Optional[np.random.Generator] = None):
         self.name = "gNB-Simulator"
         self.gnb_id = "gnb001"
         self.operational = True
-        self._initialize_sites_and_cells()
+        self.random = random.Random(seed)
+        self.rng = rng or np.random.default_rng(seed)
+
+        if topology is None:
+            self._initialize_sites_and_cells()
+        else:
+            self._initialize_from_topology(topology)
+
+        # Register cells with the UE store, which owns each cell's connected UE index
+        for cell_id, cell in cell_contexts.items():
+            ue_store.register_cell(cell_id, cell["siteId"])
+
+        logger.info(f"Initialized {len(site_contexts)} sites and {len(cell_contexts)} cells")
+
+        # Start UE simulation
+        self._populate_initial_ues()
+
+    def _initialize_from_topology(self, topology: Topology):
+        """Initialize sites and cells from a loaded or generated topology"""
+        sites, cells = topology
+        site_contexts.update((site["siteId"], site) for site in sites)
+        cell_contexts.update((cell["cellId"], cell) for cell in cells)
 
     def _initialize_sites_and_cells(self):
         """Initialize sites and cells for simulation"""
@@ -49,11 +90,11 @@ class GNodeBSimulator:
                 "sector": f"Sector {cell_id[-1]}",
                 "cellState": "ACTIVE",
                 "connectedUes": [],
-                "load": random.randint(60, 80),
-                "averageSINR_dB": random.uniform(15.0, 22.0),
-                "averageRSRP_dBm": random.uniform(-85.0, -75.0),
-                "averageRSRQ_dB": random.uniform(-10.0, -8.0),
-                "pci": random.randint(0, 503),
+                "load": self.random.randint(60, 80),
+                "averageSINR_dB": self.random.uniform(15.0, 22.0),
+                "averageRSRP_dBm": self.random.uniform(-85.0, -75.0),
+                "averageRSRQ_dB": self.random.uniform(-10.0, -8.0),
+                "pci": self.random.randint(0, 503),
                 "bandwidth_MHz": 100,
                 "frequency_MHz": 3500
             }
@@ -91,10 +132,10 @@ class GNodeBSimulator:
                 "sector": f"Sector {cell_id[-1]}",
                 "cellState": "ACTIVE",
                 "connectedUes": [],
-                "load": random.randint(85, 95),  # High load due to CELL-2B failure
-                "averageSINR_dB": random.uniform(8.0, 12.0),  # Lower SINR
-                "averageRSRP_dBm": random.uniform(-95.0, -88.0),  # Weaker signal
-                "averageRSRQ_dB": random.uniform(-14.0, -11.0),
+                "load": self.random.randint(85, 95),  # High load due to CELL-2B failure
+                "averageSINR_dB": self.random.uniform(8.0, 12.0),  # Lower SINR
+                "averageRSRP_dBm": self.random.uniform(-95.0, -88.0),  # Weaker signal
+                "averageRSRQ_dB": self.random.uniform(-14.0, -11.0),
                 "pci": 150 + (1 if cell_id == "CELL-2A" else 2),
                 "bandwidth_MHz": 100,
                 "frequency_MHz": 3500
@@ -116,10 +157,10 @@ class GNodeBSimulator:
                 "sector": f"Sector {cell_id[-1]}",
                 "cellState": "ACTIVE",
                 "connectedUes": [],
-                "load": random.randint(40, 60),
-                "averageSINR_dB": random.uniform(16.0, 24.0),
-                "averageRSRP_dBm": random.uniform(-82.0, -72.0),
-                "averageRSRQ_dB": random.uniform(-9.0, -7.0),
+                "load": self.random.randint(40, 60),
+                "averageSINR_dB": self.random.uniform(16.0, 24.0),
+                "averageRSRP_dBm": self.random.uniform(-82.0, -72.0),
+                "averageRSRQ_dB": self.random.uniform(-9.0, -7.0),
                 "pci": 200 + (0 if cell_id == "CELL-3A" else 1),
                 "bandwidth_MHz": 100,
                 "frequency_MHz": 3500
@@ -141,263 +182,535 @@ class GNodeBSimulator:
                 "sector": f"Sector {cell_id[-1]}",
                 "cellState": "ACTIVE",
                 "connectedUes": [],
-                "load": random.randint(50, 70),
-                "averageSINR_dB": random.uniform(12.0, 18.0),
-                "averageRSRP_dBm": random.uniform(-90.0, -80.0),
-                "averageRSRQ_dB": random.uniform(-12.0, -9.0),
+                "load": self.random.randint(50, 70),
+                "averageSINR_dB": self.random.uniform(12.0, 18.0),
+                "averageRSRP_dBm": self.random.uniform(-90.0, -80.0),
+                "averageRSRQ_dB": self.random.uniform(-12.0, -9.0),
                 "pci": 300 + (0 if cell_id == "CELL-4A" else (1 if cell_id == "CELL-4B" else 2)),
                 "bandwidth_MHz": 100,
                 "frequency_MHz": 3500
             }
 
-        logger.info(f"Initialized {len(site_contexts)} sites and {len(cell_contexts)} cells")
-
-        # Start UE simulation
-        self._populate_initial_ues()
-
     def _populate_initial_ues(self):
-        """Populate initial UE connections"""
-        global ran_ue_ngap_id_counter
-
-        # Add UEs to healthy cells
-        for cell_id, cell in cell_contexts.items():
-            if cell["cellState"] == "ACTIVE" and cell["siteId"] != "SITE-002":
-                # Normal sites get normal UE count
-                num_ues = random.randint(40, 60)
-            elif cell["cellState"] == "ACTIVE" and cell["siteId"] == "SITE-002":
-                # SITE-002 cells are overloaded (taking load from CELL-2B)
-                num_ues = random.randint(70, 90)
-            else:
-                # DOWN cells have no UEs
-                num_ues = 0
-
-            for _ in range(num_ues):
-                ue_id = ran_ue_ngap_id_counter
-                ran_ue_ngap_id_counter += 1
-
-                ue_contexts[ue_id] = {
-                    "ranUeNgapId": ue_id,
-                    "ueState": "CONNECTED",
-                    "cellId": cell_id,
-                    "siteId": cell["siteId"],
-                    "pduSessions": 1,
-                    "lastActivity": datetime.utcnow().isoformat(),
-                    "throughput_Mbps": random.uniform(10.0, 50.0),
-                    "sinr_dB": cell["averageSINR_dB"] + random.uniform(-3.0, 3.0)
-                }
-
-                cell["connectedUes"].append(ue_id)
-
-        logger.info(f"Initialized {len(ue_contexts)} UEs across all cells")
+        """Populate initial UE connections for all cells in one bulk attach"""
+        cells = [cell_contexts[cell_id] for cell_id in ue_store.cell_ids]
+        active = np.array([cell["cellState"] == "ACTIVE" for cell in cells], dtype=bool)
+        # Cells of degraded sites are overloaded (taking load from their failed neighbours)
+        degraded = np.array([site_contexts[cell["siteId"]]["status"] == "DEGRADED" for cell in cells], dtype=bool)
+        sinr = np.array([cell["averageSINR_dB"] for cell in cells])
+
+        # Normal cells get 40-60 UEs, overloaded cells 70-90, DOWN cells none
+        rng = self.rng
+        num_ues = np.where(degraded, rng.integers(70, 91, len(cells)), rng.integers(40, 61, len(cells)))
+        num_ues = np.where(active, num_ues, 0)
+
+        ue_cells = np.repeat(np.arange(len(cells)), num_ues)
+        ue_store.attach_many(
+            ue_cells,
+            throughput=rng.uniform(10.0, 50.0, len(ue_cells)),
+            sinr=sinr[ue_cells] + rng.uniform(-3.0, 3.0, len(ue_cells)),
+            timestamp=simulation_clock.now()
+        )
+
+        logger.info(f"Initialized {len(ue_store)} UEs across all cells")
 
     def generate_ran_ue_ngap_id(self) -> int:
         """Generate unique RAN UE NGAP ID"""
-        global ran_ue_ngap_id_counter
-        ran_ue_ngap_id = ran_ue_ngap_id_counter
-        ran_ue_ngap_id_counter += 1
-        return ran_ue_ngap_id
-
-# Initialize simulator instance
-gnb_simulator = GNodeBSimulator()
+        return ue_store.next_id()
+
+# Initialize simulator instance (built-in demo topology unless SIM_TOPOLOGY_FILE / SIM_SITES are set)
+gnb_simulator = GNodeBSimulator(topology=topology_from_env(), seed=SIM_SEED,
+                                rng=np.random.default_rng(init_seed))
+
+# Writer lock: held by the tick engine and any other mutator of simulator state.
+# Readers never take it; they read the current snapshot instead.
+state_lock = threading.Lock()
+current_snapshot: Optional[SimulatorSnapshot] = None
+# Versions a stream subscriber may fall behind before it is resynced with a full snapshot
+snapshot_broker = SnapshotBroker(max_lag=int(os.environ.get('SIM_STREAM_MAX_LAG', '8')))
+snapshot_version = 0
+
+def publish_snapshot():
+    """Publish an immutable snapshot of the current state (call with state_lock held)"""
+    global current_snapshot, snapshot_version
+    snapshot_version += 1
+    current_snapshot = SimulatorSnapshot(
+        version=snapshot_version,
+        tick=tick_engine.tick_count,
+        sites=dict(site_contexts),
+        cells=dict(cell_contexts),
+        active=tick_engine.active.copy(),
+        load=tick_engine.load,
+        sinr=tick_engine.sinr,
+        rsrp=tick_engine.rsrp,
+        ues=ue_store.snapshot(),
+        aggregates=tick_engine.aggregates.freeze(),
+        timestamp=simulation_clock.now()
+    )
+    kpi_history.record(current_snapshot.tick, simulation_clock.now(),
+                       tick_engine.load, tick_engine.sinr, tick_engine.rsrp)
+    snapshot_broker.publish(current_snapshot)
+
+# Tick engine driving UE activity
+tick_engine = TickEngine(ue_store, cell_contexts, site_contexts, tick_period=TICK_PERIOD_SECONDS,
+                         rng=np.random.default_rng(engine_seed), lock=state_lock,
+                         on_tick=publish_snapshot, clock=simulation_clock)
+
+# Per-cell KPI history for every tick (720 ticks = 1 hour at the default period)
+HISTORY_TICKS = int(os.environ.get('SIM_HISTORY_TICKS', '720'))
+kpi_history = KpiHistory(len(tick_engine.cell_ids), HISTORY_TICKS)
+
+# Runtime fault injection; scheduled scenario events fire at the start of their tick
+fault_injector = FaultInjector(tick_engine, seed=fault_seed)
+tick_engine.before_tick = fault_injector.run_due
+with state_lock:
+    publish_snapshot()
+
+# Read latency samples for /gnb/engine, so p99 can be observed under polling load
+READ_LATENCY_SAMPLES = 4096
+read_latencies_ms = deque(maxlen=READ_LATENCY_SAMPLES)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_latency(response):
+    if request.method == 'GET' and hasattr(g, 'request_started'):
+        read_latencies_ms.append((time.perf_counter() - g.request_started) * 1000.0)
+    return response
+
+def read_latency_stats() -> Dict:
+    """Percentiles over the most recent read requests"""
+    samples = np.array(read_latencies_ms)
+    if len(samples) == 0:
+        return {"samples": 0}
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {
+        "samples": len(samples),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(samples.max()), 3)
+    }
+
+# Pagination limits for UE listings
+MAX_PAGE_LIMIT = 1000
+
+def parse_page_args(default_limit: int):
+    """Parse after/limit/fields/filter query parameters, raising ValueError on bad input"""
+    args = request.args
+    try:
+        after = int(args['after']) if args.get('after') else None
+        limit = int(args.get('limit', default_limit))
+        filters = {name: float(args[name]) for name in UE_FILTERS if args.get(name)}
+    except ValueError:
+        raise ValueError("after and limit must be integers and filter thresholds numbers")
+    if not 1 <= limit <= MAX_PAGE_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_LIMIT}")
+
+    fields = [f for f in args.get('fields', '').split(',') if f]
+    unknown = [f for f in fields if f not in UE_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return after, limit, filters, fields
 
 # REST API Endpoints
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
+    snapshot = current_snapshot
     return jsonify({
         "status": "healthy",
         "service": "RAN-Simulator",
         "operational": gnb_simulator.operational,
-        "active_sites": len(site_contexts),
-        "active_cells": len(cell_contexts),
-        "connected_ues": len(ue_contexts)
+        "active_sites": len(snapshot.sites),
+        "active_cells": snapshot.num_cells,
+        "connected_ues": len(snapshot.ues),
+        "snapshot_version": snapshot.version
     })
 
 @app.route('/gnb/status', methods=['GET'])
 def get_gnb_status():
     """Get overall gNodeB status"""
+    snapshot = current_snapshot
     return jsonify({
         "status": "operational",
         "gnbId": gnb_simulator.gnb_id,
-        "connected_ues": len(ue_contexts),
-        "served_cells": len(cell_contexts),
-        "served_sites": len(site_contexts)
+        "connected_ues": len(snapshot.ues),
+        "served_cells": snapshot.num_cells,
+        "served_sites": len(snapshot.sites)
     })
 
 @app.route('/gnb/sites', methods=['GET'])
 def get_sites():
     """Get all site contexts"""
+    snapshot = current_snapshot
     return jsonify({
-        "total_sites": len(site_contexts),
-        "sites": list(site_contexts.values())
+        "total_sites": len(snapshot.sites),
+        "sites": list(snapshot.sites.values())
     })
 
 @app.route('/gnb/sites/<site_id>', methods=['GET'])
 def get_site(site_id):
     """Get specific site context"""
-    site = site_contexts.get(site_id)
+    snapshot = current_snapshot
+    site = snapshot.sites.get(site_id)
     if not site:
         return jsonify({"error": f"Site {site_id} not found"}), 404
 
     # Include cell details for the site
-    site_cells = [cell for cell in cell_contexts.values() if cell["siteId"] == site_id]
-
-    # Calculate site-level metrics
-    total_ues = sum(len(cell["connectedUes"]) for cell in site_cells)
-    avg_load = sum(cell["load"] for cell in site_cells) / len(site_cells) if site_cells else 0
+    site_cells = snapshot.site_cells(site_id)
 
     return jsonify({
         "site": site,
         "cells": site_cells,
-        "metrics": {
-            "total_connected_ues": total_ues,
-            "average_cell_load": round(avg_load, 2),
-            "active_cells": len([c for c in site_cells if c["cellState"] == "ACTIVE"]),
-            "total_cells": len(site_cells)
-        }
+        # Site-level metrics come from the running aggregates
+        "metrics": snapshot.aggregates.site_metrics(site_id)
     })
 
 @app.route('/gnb/cells', methods=['GET'])
 def get_cells():
     """Get all cell contexts"""
+    snapshot = current_snapshot
     site_id = request.args.get('site_id')
 
     if site_id:
-        filtered_cells = {
-            cell_id: cell for cell_id, cell in cell_contexts.items()
-            if cell["siteId"] == site_id
-        }
+        filtered_cells = snapshot.site_cells(site_id)
         return jsonify({
             "total_cells": len(filtered_cells),
             "site_id": site_id,
-            "cells": list(filtered_cells.values())
+            "cells": filtered_cells
         })
 
     return jsonify({
-        "total_cells": len(cell_contexts),
-        "cells": list(cell_contexts.values())
+        "total_cells": snapshot.num_cells,
+        "cells": snapshot.cells()
     })
 
 @app.route('/gnb/cells/<cell_id>', methods=['GET'])
 def get_cell(cell_id):
     """Get specific cell context"""
-    cell = cell_contexts.get(cell_id)
+    snapshot = current_snapshot
+    cell = snapshot.cell(cell_id)
     if not cell:
         return jsonify({"error": f"Cell {cell_id} not found"}), 404
 
-    # Include UE details for the cell
-    cell_ues = [ue for ue in ue_contexts.values() if ue["cellId"] == cell_id]
+    try:
+        after, limit, filters, fields = parse_page_args(default_limit=10)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Include one page of UE details for the cell (served from the per-cell index)
+    slots, matched, has_more = snapshot.ues.page(snapshot.ues.cell_slots(cell_id), after, limit, filters)
 
     return jsonify({
         "cell": cell,
-        "connected_ues": len(cell_ues),
-        "ue_details": cell_ues[:10]  # Limit to first 10 UEs for performance
+        "connected_ues": len(cell["connectedUes"]),
+        "ue_details": snapshot.ues.to_dicts(slots, fields),
+        "matched_ues": matched,
+        "next_after": snapshot.ues.ue_ids(slots[-1:])[0] if has_more else None
+    })
+
+@app.route('/gnb/cells/<cell_id>/history', methods=['GET'])
+def get_cell_history(cell_id):
+    """Get a cell's KPI history, downsampled to at most `points` min/max/avg buckets"""
+    snapshot = current_snapshot
+    idx = snapshot.ues.cell_index(cell_id)
+    if idx is None:
+        return jsonify({"error": f"Cell {cell_id} not found"}), 404
+
+    try:
+        points = int(request.args.get('points', 60))
+        last_ticks = int(request.args['ticks']) if request.args.get('ticks') else None
+    except ValueError:
+        return jsonify({"error": "points and ticks must be integers"}), 400
+    if points < 1 or (last_ticks is not None and last_ticks < 1):
+        return jsonify({"error": "points and ticks must be positive"}), 400
+
+    series = kpi_history.cell_series(idx, snapshot.tick, last_ticks)
+    return jsonify({
+        "cell_id": cell_id,
+        "tick_period_s": tick_engine.tick_period,
+        "samples": len(series["tick"]),
+        "capacity": kpi_history.capacity,
+        "buckets": downsample(series, points)
     })
 
 @app.route('/gnb/ues', methods=['GET'])
 def get_ues():
-    """Get all UE contexts"""
+    """Get UE contexts, one page at a time
+
+    Pages follow ranUeNgapId order: pass the previous response's `next_after`
+    as `after` to fetch the next page. Supports `limit`, `fields=` projection
+    and the sinr_lt/sinr_gt/throughput_lt/throughput_gt filters.
+    """
+    snapshot = current_snapshot
+    ues = snapshot.ues
     site_id = request.args.get('site_id')
     cell_id = request.args.get('cell_id')
 
-    filtered_ues = ue_contexts
-
-    if site_id:
-        filtered_ues = {
-            ue_id: ue for ue_id, ue in ue_contexts.items()
-            if ue["siteId"] == site_id
-        }
+    try:
+        after, limit, filters, fields = parse_page_args(default_limit=100)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
+    # Resolve the narrowest index for the filters; a cell filter implies its site
     if cell_id:
-        filtered_ues = {
-            ue_id: ue for ue_id, ue in filtered_ues.items()
-            if ue["cellId"] == cell_id
-        }
+        if snapshot.has_cell(cell_id) and (not site_id or snapshot.cell_site(cell_id) == site_id):
+            candidates = ues.cell_slots(cell_id)
+        else:
+            candidates = np.empty(0, dtype=np.int64)
+    elif site_id:
+        candidates = ues.site_slots(site_id)
+    else:
+        candidates = None
+
+    slots, total_ues, has_more = ues.page(candidates, after, limit, filters)
 
     return jsonify({
-        "total_ues": len(filtered_ues),
-        "ues": list(filtered_ues.values())[:100]  # Limit for performance
+        "total_ues": total_ues,
+        "limit": limit,
+        "next_after": ues.ue_ids(slots[-1:])[0] if has_more else None,
+        "ues": ues.to_dicts(slots, fields)
+    })
+
+@app.route('/gnb/faults', methods=['GET'])
+def get_faults():
+    """Get active faults and scenarios"""
+    with state_lock:
+        return jsonify({
+            "current_tick": tick_engine.tick_count,
+            "fault_types": list(FAULT_TYPES),
+            "active_faults": list(fault_injector.faults.values()),
+            "scenarios": [scenario.to_dict() for scenario in fault_injector.scenarios.values()]
+        })
+
+@app.route('/gnb/faults', methods=['POST'])
+def inject_fault():
+    """Inject a fault now, e.g. {"type": "cell_down", "targets": {"cell_share": 0.05}}"""
+    try:
+        spec = validate_fault(request.get_json(silent=True))
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    with state_lock:
+        fault = fault_injector.inject(spec, tick_engine.tick_count)
+        publish_snapshot()
+    return jsonify(fault), 201
+
+@app.route('/gnb/faults/<fault_id>', methods=['DELETE'])
+def clear_fault(fault_id):
+    """Clear an active fault"""
+    with state_lock:
+        fault = fault_injector.clear(fault_id)
+        if fault:
+            publish_snapshot()
+    if not fault:
+        return jsonify({"error": f"Fault {fault_id} not active"}), 404
+    return jsonify(fault)
+
+@app.route('/gnb/scenarios', methods=['POST'])
+def start_scenario():
+    """Schedule a fault timeline; event at_tick N fires N ticks after the next tick"""
+    try:
+        spec = validate_scenario(request.get_json(silent=True))
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    with state_lock:
+        scenario = fault_injector.start_scenario(spec, tick_engine.tick_count + 1)
+        return jsonify(scenario.to_dict()), 201
+
+@app.route('/gnb/scenarios/<scenario_id>', methods=['GET'])
+def get_scenario(scenario_id):
+    """Get a scenario's progress and timeline"""
+    with state_lock:
+        scenario = fault_injector.scenarios.get(scenario_id)
+        if not scenario:
+            return jsonify({"error": f"Scenario {scenario_id} not found"}), 404
+        return jsonify({**scenario.to_dict(), "events": scenario.spec["events"]})
+
+@app.route('/gnb/scenarios/<scenario_id>/replay', methods=['POST'])
+def replay_scenario(scenario_id):
+    """Run a scenario's timeline again from the next tick, with the same seed"""
+    with state_lock:
+        scenario = fault_injector.replay(scenario_id, tick_engine.tick_count + 1)
+        if not scenario:
+            return jsonify({"error": f"Scenario {scenario_id} not found"}), 404
+        return jsonify(scenario.to_dict()), 201
+
+@app.route('/gnb/scenarios/<scenario_id>', methods=['DELETE'])
+def cancel_scenario(scenario_id):
+    """Stop a scenario's remaining events; faults it already injected stay active"""
+    with state_lock:
+        scenario = fault_injector.scenarios.get(scenario_id)
+        if not scenario:
+            return jsonify({"error": f"Scenario {scenario_id} not found"}), 404
+        scenario.cancelled = True
+        return jsonify(scenario.to_dict())
+
+# Upper bound for one fast-forward request, and the wall time it may run before
+# returning partial progress (well under gunicorn's 120 s worker timeout)
+MAX_FAST_FORWARD_TICKS = 100000
+FAST_FORWARD_BUDGET_SECONDS = float(os.environ.get('SIM_FAST_FORWARD_SECONDS', '30'))
+
+# Real-time ticking; with SIM_REALTIME=false the simulation only advances via fast-forward
+REALTIME = os.environ.get('SIM_REALTIME', 'true').lower() != 'false'
+
+def simulation_status(snapshot: SimulatorSnapshot) -> Dict:
+    return {
+        "seed": SIM_SEED,
+        "deterministic": SIM_SEED is not None,
+        "realtime": REALTIME,
+        "virtual_clock": simulation_clock.virtual,
+        "tick": snapshot.tick,
+        "sim_time": snapshot.created_at,
+        "digest": snapshot.digest()
+    }
+
+@app.route('/gnb/simulation', methods=['GET'])
+def get_simulation():
+    """Get simulation mode, current tick and a digest of the full state"""
+    return jsonify(simulation_status(current_snapshot))
+
+@app.route('/gnb/simulation/fast-forward', methods=['POST'])
+def fast_forward():
+    """Advance N ticks as fast as possible, e.g. {"ticks": 1000}
+
+    Stops after SIM_FAST_FORWARD_SECONDS of ticking; the response then has
+    "complete": false and the number of ticks still to run in "ticks_remaining".
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        ticks = int(data.get('ticks', 1))
+    except (TypeError, ValueError):
+        return jsonify({"error": "ticks must be an integer"}), 400
+    if not 1 <= ticks <= MAX_FAST_FORWARD_TICKS:
+        return jsonify({"error": f"ticks must be between 1 and {MAX_FAST_FORWARD_TICKS}"}), 400
+
+    ticks_run, elapsed_ms = tick_engine.fast_forward(ticks, budget_s=FAST_FORWARD_BUDGET_SECONDS)
+    return jsonify({
+        "ticks_run": ticks_run,
+        "ticks_remaining": ticks - ticks_run,
+        "complete": ticks_run == ticks,
+        "elapsed_ms": round(elapsed_ms, 3),
+        "ticks_per_second": round(ticks_run / (elapsed_ms / 1000.0), 1) if elapsed_ms else None,
+        **simulation_status(current_snapshot)
     })
 
 @app.route('/gnb/metrics', methods=['GET'])
 def get_metrics():
     """Get overall metrics"""
-    connected_ues = len([ue for ue in ue_contexts.values() if ue["ueState"] == "CONNECTED"])
-    active_cells = len([cell for cell in cell_contexts.values() if cell["cellState"] == "ACTIVE"])
+    snapshot = current_snapshot
+    aggregates = snapshot.aggregates
 
-    # Calculate average RF metrics across active cells
-    active_cell_list = [cell for cell in cell_contexts.values() if cell["cellState"] == "ACTIVE"]
-    avg_sinr = sum(cell["averageSINR_dB"] for cell in active_cell_list) / len(active_cell_list) if active_cell_list else 0
-    avg_rsrp = sum(cell["averageRSRP_dBm"] for cell in active_cell_list) / len(active_cell_list) if active_cell_list else 0
+    # Averages over active cells are maintained incrementally by the tick engine
+    return jsonify({
+        "total_ues": len(snapshot.ues),
+        "connected_ues": snapshot.ues.count_by_state("CONNECTED"),
+        "active_cells": aggregates.active_cells,
+        "total_cells": snapshot.num_cells,
+        "active_sites": aggregates.operational_sites,
+        "total_sites": len(snapshot.sites),
+        "average_sinr_dB": round(aggregates.average_sinr, 2),
+        "average_rsrp_dBm": round(aggregates.average_rsrp, 2)
+    })
 
+@app.route('/gnb/engine', methods=['GET'])
+def get_engine_stats():
+    """Get tick engine timing and read latency statistics"""
+    snapshot = current_snapshot
     return jsonify({
-        "total_ues": len(ue_contexts),
-        "connected_ues": connected_ues,
-        "active_cells": active_cells,
-        "total_cells": len(cell_contexts),
-        "active_sites": len([s for s in site_contexts.values() if s["status"] == "OPERATIONAL"]),
-        "total_sites": len(site_contexts),
-        "average_sinr_dB": round(avg_sinr, 2),
-        "average_rsrp_dBm": round(avg_rsrp, 2)
+        **tick_engine.stats(),
+        "snapshot_version": snapshot.version,
+        "snapshot_created_at": snapshot.created_at,
+        "read_latency": read_latency_stats()
     })
 
+# Seconds between SSE keep-alive comments when no tick happens
+STREAM_KEEPALIVE_SECONDS = 15
+
+# Each stream subscriber holds a server thread for as long as it is connected; keep
+# this below gunicorn's --threads so REST reads always have threads left
+MAX_STREAMS = int(os.environ.get('SIM_MAX_STREAMS', '24'))
+stream_slots = threading.BoundedSemaphore(MAX_STREAMS)
+
+@app.route('/gnb/stream', methods=['GET'])
+def stream_state():
+    """Stream state changes as Server-Sent Events
+
+    The first event ("snapshot") carries the full state of the subscribed
+    sites/cells; each following event ("delta") carries only the cell, site
+    and UE fields that changed in a tick. A subscriber that falls more than
+    SIM_STREAM_MAX_LAG versions behind gets a fresh "snapshot" event instead.
+    Optional filters: site_id and cell_id (comma-separated), ues=true for
+    per-UE attach/detach lists.
+    """
+    site_ids = request.args.get('site_id', '').split(',')
+    cell_ids = request.args.get('cell_id', '').split(',')
+    include_ues = request.args.get('ues', 'false').lower() in ('1', 'true', 'yes')
+    subscribed_sites, cell_indexes = resolve_subscription(current_snapshot, site_ids, cell_ids)
+    if not stream_slots.acquire(blocking=False):
+        return jsonify({"error": f"Too many stream subscribers (max {MAX_STREAMS})"}), 503
+
+    def snapshot_event(snapshot):
+        if cell_indexes is None:
+            cells = snapshot.cells()
+            sites = list(snapshot.sites.values())
+        else:
+            cells = snapshot.cells(snapshot.ues.cell_ids[i] for i in cell_indexes.tolist())
+            sites = [snapshot.sites[s] for s in sorted(subscribed_sites) if s in snapshot.sites]
+        return sse_event("snapshot", {
+            "version": snapshot.version,
+            "timestamp": snapshot.created_at,
+            "sites": sites,
+            "cells": cells
+        }, event_id=snapshot.version)
+
+    def generate():
+        # Only the sent version is kept across yields, so a client that stops
+        # reading does not keep any snapshot alive while its write blocks
+        snapshot = current_snapshot
+        event, version = snapshot_event(snapshot), snapshot.version
+        snapshot = None
+        yield event
+
+        while True:
+            newer = snapshot_broker.wait_for_newer(version, timeout=STREAM_KEEPALIVE_SECONDS)
+            if newer is None:
+                yield ": keep-alive\n\n"
+                continue
+
+            previous = snapshot_broker.retained(version)
+            if previous is None:
+                # More than SIM_STREAM_MAX_LAG versions behind: resync with the full state
+                event = snapshot_event(newer)
+            else:
+                delta = build_delta(snapshot_broker.delta(previous, newer),
+                                    subscribed_sites, cell_indexes, include_ues)
+                event = sse_event("delta", delta, event_id=newer.version) if delta is not None else None
+            version = newer.version
+            previous = newer = None
+            if event is not None:
+                yield event
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # The server closes the response when the client disconnects, even before streaming started
+    response.call_on_close(stream_slots.release)
+    return response
+
 # Background task to simulate UE activity
 def simulate_ue_activity():
     """Background task to simulate UE connections/disconnections"""
-    while True:
-        time.sleep(5)  # Run every 5 seconds for more dynamic demos
-
-        # Simulate UE activity in active cells
-        for cell_id, cell in cell_contexts.items():
-            if cell["cellState"] == "ACTIVE":
-                # 70% chance to modify UE count (more frequent changes)
-                if random.random() < 0.7:
-                    # Randomly add or remove UEs (1-5 UEs at a time for more visible changes)
-                    num_changes = random.randint(1, 5)
-
-                    if random.random() < 0.5 and len(cell["connectedUes"]) > 20:
-                        # Remove UEs
-                        for _ in range(min(num_changes, len(cell["connectedUes"]) - 20)):
-                            if cell["connectedUes"]:
-                                ue_id = cell["connectedUes"].pop()
-                                if ue_id in ue_contexts:
-                                    del ue_contexts[ue_id]
-                    else:
-                        # Add UEs (cap based on site health)
-                        max_ues = 100 if cell["siteId"] != "SITE-002" else 95
-                        for _ in range(num_changes):
-                            if len(cell["connectedUes"]) < max_ues:
-                                ue_id = gnb_simulator.generate_ran_ue_ngap_id()
-                                ue_contexts[ue_id] = {
-                                    "ranUeNgapId": ue_id,
-                                    "ueState": "CONNECTED",
-                                    "cellId": cell_id,
-                                    "siteId": cell["siteId"],
-                                    "pduSessions": 1,
-                                    "lastActivity": datetime.utcnow().isoformat(),
-                                    "throughput_Mbps": random.uniform(10.0, 50.0),
-                                    "sinr_dB": cell["averageSINR_dB"] + random.uniform(-3.0, 3.0)
-                                }
-                                cell["connectedUes"].append(ue_id)
-
-                # Update cell load and RF metrics dynamically
-                ue_count = len(cell["connectedUes"])
-                cell["load"] = min(100, int((ue_count / 100.0) * 100))
-
-                # Slightly vary SINR/RSRP for realism (small fluctuations)
-                if cell["siteId"] == "SITE-002" and cell_id in ["CELL-2A", "CELL-2C"]:
-                    # SITE-002 cells fluctuate more due to stress
-                    cell["averageSINR_dB"] = max(6.0, min(14.0, cell["averageSINR_dB"] + random.uniform(-1.5, 1.5)))
-                    cell["load"] = min(100, max(80, cell["load"] + random.randint(-5, 5)))
-                else:
-                    # Normal fluctuations
-                    base_sinr = 18.0
-                    cell["averageSINR_dB"] = max(12.0, min(25.0, base_sinr + random.uniform(-3.0, 3.0)))
+    tick_engine.run()
 
-if __name__ == "__main__":
-    # Start background simulation thread
+# Start background simulation thread; at import time, since gunicorn never runs __main__
+if REALTIME:
     simulation_thread = threading.Thread(target=simulate_ue_activity, daemon=True)
     simulation_thread.start()
 
+if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5001, debug=False)
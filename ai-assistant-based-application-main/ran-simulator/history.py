@@ -0,0 +1,93 @@
+# Per-cell KPI history for the gNodeB simulator
+# A fixed-size ring buffer of (tick x cell) arrays holding load, SINR and RSRP
+# for every tick, so trends can be served without clients polling and storing
+# history themselves. Memory is capacity * cells * 9 bytes and never grows.
+
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+KPI_COLUMNS = ["load", "averageSINR_dB", "averageRSRP_dBm"]
+
+
+class KpiHistory:
+    """Ring buffer of per-cell KPIs, one row per tick"""
+
+    def __init__(self, num_cells: int, capacity: int):
+        self.capacity = capacity
+        self._ticks = np.full(capacity, -1, dtype=np.int64)
+        self._timestamps = np.zeros(capacity, dtype=np.float64)
+        self._load = np.zeros((capacity, num_cells), dtype=np.uint8)
+        self._sinr = np.zeros((capacity, num_cells), dtype=np.float32)
+        self._rsrp = np.zeros((capacity, num_cells), dtype=np.float32)
+        self._row = -1
+
+    def record(self, tick: int, timestamp: float, load: np.ndarray, sinr: np.ndarray, rsrp: np.ndarray):
+        """Store one tick of KPIs for all cells (single writer, under the state lock)
+
+        Re-recording the latest tick overwrites it, so out-of-tick publishes
+        (e.g. a cell state change) do not take an extra row.
+        """
+        if self._row < 0 or self._ticks[self._row] != tick:
+            self._row = (self._row + 1) % self.capacity
+        row = self._row
+
+        # Invalidate the row while it is rewritten; readers drop rows whose tick changed
+        self._ticks[row] = -1
+        self._timestamps[row] = timestamp
+        self._load[row] = load
+        self._sinr[row] = sinr
+        self._rsrp[row] = rsrp
+        self._ticks[row] = tick
+
+    def cell_series(self, cell_index: int, up_to_tick: int, last_ticks: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Consistent copy of one cell's history up to `up_to_tick`, oldest first"""
+        ticks = self._ticks.copy()
+        series = {
+            "timestamp": self._timestamps.copy(),
+            "load": self._load[:, cell_index].astype(np.float64),
+            "averageSINR_dB": self._sinr[:, cell_index].astype(np.float64),
+            "averageRSRP_dBm": self._rsrp[:, cell_index].astype(np.float64)
+        }
+        stable = (ticks == self._ticks) & (ticks >= 0) & (ticks <= up_to_tick)
+        if last_ticks is not None:
+            stable &= ticks > up_to_tick - last_ticks
+
+        rows = np.flatnonzero(stable)
+        rows = rows[np.argsort(ticks[rows], kind="stable")]
+        series = {name: values[rows] for name, values in series.items()}
+        series["tick"] = ticks[rows]
+        return series
+
+
+def downsample(series: Dict[str, np.ndarray], points: int) -> List[Dict]:
+    """Collapse a series into at most `points` buckets with min/max/avg per KPI"""
+    samples = len(series["tick"])
+    if samples == 0:
+        return []
+
+    starts = np.unique(np.linspace(0, samples, min(points, samples), endpoint=False).astype(np.int64))
+    ends = np.append(starts[1:], samples) - 1
+    sizes = ends - starts + 1
+
+    stats = {}
+    for name in KPI_COLUMNS:
+        values = series[name]
+        stats[name] = (np.minimum.reduceat(values, starts).tolist(),
+                       np.maximum.reduceat(values, starts).tolist(),
+                       (np.add.reduceat(values, starts) / sizes).tolist())
+
+    buckets = []
+    for i, (start, end) in enumerate(zip(starts.tolist(), ends.tolist())):
+        bucket = {
+            "tickStart": int(series["tick"][start]),
+            "tickEnd": int(series["tick"][end]),
+            "start": datetime.utcfromtimestamp(series["timestamp"][start]).isoformat(),
+            "end": datetime.utcfromtimestamp(series["timestamp"][end]).isoformat(),
+            "samples": int(sizes[i])
+        }
+        for name, (mins, maxs, avgs) in stats.items():
+            bucket[name] = {"min": round(mins[i], 2), "max": round(maxs[i], 2), "avg": round(avgs[i], 2)}
+        buckets.append(bucket)
+    return buckets
@@ -0,0 +1,54 @@
+# Simulation clock for the gNodeB simulator
+# In real-time mode timestamps follow the wall clock. In deterministic mode
+# (a seed or start time is configured) time is derived from the tick number,
+# so a seeded run stamps identical timestamps whether it runs in real time or
+# is fast-forwarded as quickly as the CPU allows.
+
+from datetime import datetime, timezone
+from typing import Optional
+import os
+import time
+
+# Start of simulated time for seeded runs without SIM_START_TIME
+DEFAULT_START_TIME = "2025-01-01T00:00:00"
+
+
+class SimulationClock:
+    """Source of simulated time; virtual (tick-based) when `start` is given"""
+
+    def __init__(self, tick_period: float, start: Optional[float] = None):
+        self.tick_period = tick_period
+        self.start = start
+        self.tick = 0
+
+    @property
+    def virtual(self) -> bool:
+        return self.start is not None
+
+    def set_tick(self, tick: int):
+        """Move simulated time to `tick` (called by the tick engine)"""
+        self.tick = tick
+
+    def now(self) -> float:
+        """Current simulated time as a UTC epoch timestamp"""
+        if self.start is None:
+            return time.time()
+        return self.start + self.tick * self.tick_period
+
+    def isoformat(self) -> str:
+        return datetime.utcfromtimestamp(self.now()).isoformat()
+
+
+def seed_from_env() -> Optional[int]:
+    """SIM_SEED as an int, or None for a non-reproducible run"""
+    seed = os.environ.get('SIM_SEED')
+    return int(seed) if seed else None
+
+
+def clock_from_env(tick_period: float, seed: Optional[int]) -> SimulationClock:
+    """Virtual clock when SIM_START_TIME or a seed is set, wall clock otherwise"""
+    start_time = os.environ.get('SIM_START_TIME') or (DEFAULT_START_TIME if seed is not None else None)
+    if start_time is None:
+        return SimulationClock(tick_period)
+    start = datetime.fromisoformat(start_time).replace(tzinfo=timezone.utc).timestamp()
+    return SimulationClock(tick_period, start=start)
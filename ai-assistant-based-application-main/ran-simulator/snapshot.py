@@ -0,0 +1,91 @@
+# Copy-on-write snapshots of simulator state
+# The tick engine publishes one immutable SimulatorSnapshot per tick; REST
+# handlers read whichever snapshot is current when they start, so they never
+# block the tick and never observe a half-applied tick.
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+import hashlib
+
+import numpy as np
+
+from aggregates import FrozenAggregates
+from ue_store import UESnapshot
+
+
+class SimulatorSnapshot:
+    """Immutable view of sites, cells and UEs as of one tick"""
+
+    def __init__(self, version: int, tick: int, sites: Dict[str, Dict], cells: Dict[str, Dict],
+                 active: np.ndarray, load: np.ndarray, sinr: np.ndarray, rsrp: np.ndarray,
+                 ues: UESnapshot, aggregates: FrozenAggregates, timestamp: float):
+        # Publish sequence number; bumps on every publish, including out-of-tick changes
+        self.version = version
+        self.tick = tick
+        # Simulated time of the snapshot (wall clock unless the simulation clock is virtual)
+        self.created_at = datetime.utcfromtimestamp(timestamp).isoformat()
+        self.sites = sites
+        self.ues = ues
+        self._cells = cells
+        # Per-cell arrays in UE store index order
+        self.active = active
+        self.load = load
+        self.sinr = sinr
+        self.rsrp = rsrp
+        # Running per-site and global KPI sums as of this tick
+        self.aggregates = aggregates
+
+    @property
+    def num_cells(self) -> int:
+        return len(self._cells)
+
+    def has_cell(self, cell_id: str) -> bool:
+        return cell_id in self._cells
+
+    def cell_site(self, cell_id: str) -> Optional[str]:
+        cell = self._cells.get(cell_id)
+        return cell["siteId"] if cell else None
+
+    def cell_ids(self) -> Iterable[str]:
+        return self._cells.keys()
+
+    def cell_context(self, cell_id: str) -> Optional[Dict]:
+        """The cell's static context (state, identity, radio config) without live values"""
+        return self._cells.get(cell_id)
+
+    def cell(self, cell_id: str) -> Optional[Dict]:
+        """Render a cell context with its values as of this snapshot"""
+        static = self._cells.get(cell_id)
+        if static is None:
+            return None
+        idx = self.ues.cell_index(cell_id)
+        return {
+            **static,
+            "load": self.load[idx].item(),
+            "averageSINR_dB": self.sinr[idx].item(),
+            "averageRSRP_dBm": self.rsrp[idx].item(),
+            "connectedUes": self.ues.cell_ue_ids(cell_id)
+        }
+
+    def cells(self, cell_ids: Optional[Iterable[str]] = None) -> List[Dict]:
+        """Render several cells (all cells by default)"""
+        if cell_ids is None:
+            cell_ids = self._cells.keys()
+        return [cell for cell in (self.cell(cell_id) for cell_id in cell_ids) if cell is not None]
+
+    def site_cells(self, site_id: str) -> List[Dict]:
+        site = self.sites.get(site_id)
+        return self.cells(site["cells"]) if site else []
+
+    def digest(self) -> str:
+        """SHA-256 over the full simulated state; equal for runs with the same seed and ticks"""
+        hasher = hashlib.sha256()
+        hasher.update(str(self.tick).encode())
+        for cell_id in self._cells:
+            hasher.update(repr(sorted(self._cells[cell_id].items())).encode())
+        for site_id in self.sites:
+            hasher.update(repr(sorted(self.sites[site_id].items())).encode())
+        for values in (self.active, self.load, self.sinr, self.rsrp):
+            hasher.update(np.ascontiguousarray(values).tobytes())
+        self.ues.digest_into(hasher)
+        return hasher.hexdigest()
@@ -0,0 +1,284 @@
+# Vectorized tick engine for the gNodeB simulator
+# Runs attach/detach decisions, load recomputation and RF jitter for all
+# cells at once with NumPy array operations instead of a per-cell Python loop
+
+from typing import Callable, Dict, Iterable, Optional, Tuple
+import logging
+import threading
+import time
+
+import numpy as np
+
+from aggregates import KpiAggregates
+from sim_clock import SimulationClock
+from topology import DOWN_CELL_VALUES, NORMAL_SINR_DB
+from ue_store import UEStore
+
+logger = logging.getLogger(__name__)
+
+# Per-profile behaviour, matching the original per-cell simulation rules
+NORMAL_MAX_UES = 100
+STRESSED_MAX_UES = 95
+MIN_UES_FOR_DETACH = 20
+CHANGE_PROBABILITY = 0.7
+MAX_CHANGES_PER_TICK = 5
+RSRP_JITTER_DB = 0.5
+RSRP_MAX_DRIFT_DB = 3.0
+STRESSED_SINR_DB = 10.0
+
+
+class TickEngine:
+    """Advances every cell of the simulator by one tick using array operations"""
+
+    def __init__(self, ue_store: UEStore, cell_contexts: Dict[str, Dict],
+                 site_contexts: Dict[str, Dict], tick_period: float = 5.0,
+                 rng: Optional[np.random.Generator] = None,
+                 lock: Optional[threading.Lock] = None,
+                 on_tick: Optional[Callable[[], None]] = None,
+                 clock: Optional[SimulationClock] = None):
+        self.ue_store = ue_store
+        self.cell_contexts = cell_contexts
+        self.site_contexts = site_contexts
+        self.tick_period = tick_period
+        self.rng = rng or np.random.default_rng()
+        # Simulated time; UE activity timestamps come from here
+        self.clock = clock or SimulationClock(tick_period)
+        # Writer lock shared with every other mutator of simulator state
+        self.lock = lock or threading.Lock()
+        # Called under the lock after each tick, e.g. to publish a snapshot
+        self.on_tick = on_tick
+        # Called under the lock with the upcoming tick number, e.g. to apply scheduled faults
+        self.before_tick: Optional[Callable[[int], None]] = None
+
+        self.tick_count = 0
+        self.last_tick_ms = 0.0
+        self.max_tick_ms = 0.0
+        self.total_tick_ms = 0.0
+        self.overruns = 0
+        self._stop = threading.Event()
+
+        self.load_cells()
+
+    def load_cells(self):
+        """(Re)build the per-cell arrays from the cell contexts, in UE store index order"""
+        self.cell_ids = list(self.ue_store.cell_ids)
+        cells = [self.cell_contexts[cell_id] for cell_id in self.cell_ids]
+
+        self.active = np.array([c["cellState"] == "ACTIVE" for c in cells], dtype=bool)
+        # Cells of degraded sites carry the load of their failed neighbours
+        self.stressed = np.array(
+            [self.site_contexts[c["siteId"]]["status"] == "DEGRADED" for c in cells], dtype=bool
+        )
+        self.max_ues = np.where(self.stressed, STRESSED_MAX_UES, NORMAL_MAX_UES)
+        self.load = np.array([c["load"] for c in cells], dtype=np.int64)
+        self.sinr = np.array([c["averageSINR_dB"] for c in cells], dtype=np.float64)
+        self.rsrp = np.array([c["averageRSRP_dBm"] for c in cells], dtype=np.float64)
+        self.base_rsrp = self.rsrp.copy()
+        # Interference added on top of the simulated SINR: persistent topology
+        # offsets (sinrOffset_dB) plus whatever faults inject
+        self.sinr_offset = np.array([c.get("sinrOffset_dB", 0.0) for c in cells], dtype=np.float64)
+
+        self.aggregates = KpiAggregates(
+            list(self.site_contexts.keys()), [c["siteId"] for c in cells],
+            {site_id: site["status"] for site_id, site in self.site_contexts.items()}
+        )
+        self.aggregates.rebuild(self.ue_store.cell_counts, self.load, self.sinr, self.rsrp, self.active)
+
+    def set_cell_state(self, cell_id: str, state: str):
+        """Change a cell's operational state in both the context and the arrays
+
+        Must be called with `lock` held. The context dict is replaced rather
+        than modified, so published snapshots keep the old state. A cell going
+        DOWN drops its UEs and reports the DOWN RF values; a cell coming back
+        starts empty from its baseline RF.
+        """
+        idx = self.ue_store.cell_index(cell_id)
+        context = {**self.cell_contexts[cell_id], "cellState": state}
+        active = state == "ACTIVE"
+        if not active:
+            context["averageRSRQ_dB"] = DOWN_CELL_VALUES["averageRSRQ_dB"]
+            self.ue_store.detach_cell(idx)
+            self._set_cell_values([idx], DOWN_CELL_VALUES["load"], DOWN_CELL_VALUES["averageSINR_dB"],
+                                  DOWN_CELL_VALUES["averageRSRP_dBm"])
+        elif not self.active[idx]:
+            baseline = STRESSED_SINR_DB if self.stressed[idx] else NORMAL_SINR_DB
+            self._set_cell_values([idx], 0, baseline + self.sinr_offset[idx], self.base_rsrp[idx])
+
+        self.cell_contexts[cell_id] = context
+        self.active[idx] = active
+        self.sync_aggregates(np.array([idx]))
+
+    def update_cell_context(self, cell_id: str, **fields):
+        """Replace a cell's static context with updated fields (call with `lock` held)"""
+        self.cell_contexts[cell_id] = {**self.cell_contexts[cell_id], **fields}
+
+    def set_site_status(self, site_id: str, status: str):
+        """Change a site's status; cells of DEGRADED sites run stressed (call with `lock` held)"""
+        site = self.site_contexts[site_id]
+        self.aggregates.site_status_changed(site["status"], status)
+        self.site_contexts[site_id] = {**site, "status": status}
+
+        cells = [self.ue_store.cell_index(cell_id) for cell_id in site["cells"]]
+        self.stressed[cells] = status == "DEGRADED"
+        self.max_ues = np.where(self.stressed, STRESSED_MAX_UES, NORMAL_MAX_UES)
+
+    def shift_rsrp(self, cell_indexes: Iterable[int], delta_db: float):
+        """Move the RSRP baseline (and current value) of cells, e.g. for a VSWR rise"""
+        cells = np.asarray(list(cell_indexes), dtype=np.int64)
+        self.base_rsrp = self.base_rsrp.copy()
+        self.base_rsrp[cells] += delta_db
+        active = cells[self.active[cells]]
+        self._set_cell_values(active, rsrp=self.rsrp[active] + delta_db)
+        self.sync_aggregates(cells)
+
+    def shift_sinr(self, cell_indexes: Iterable[int], delta_db: float):
+        """Add `delta_db` of injected SINR offset to cells, e.g. for an interference storm"""
+        cells = np.asarray(list(cell_indexes), dtype=np.int64)
+        self.sinr_offset = self.sinr_offset.copy()
+        self.sinr_offset[cells] += delta_db
+        active = cells[self.active[cells]]
+        self._set_cell_values(active, sinr=self.sinr[active] + delta_db)
+        self.sync_aggregates(cells)
+
+    def surge_ues(self, cell_indexes: Iterable[int], ues_per_cell: int) -> int:
+        """Attach `ues_per_cell` extra UEs to each active cell, ignoring the tick's UE cap"""
+        cells = np.asarray(list(cell_indexes), dtype=np.int64)
+        cells = cells[self.active[cells]]
+        new_cells = np.repeat(cells, ues_per_cell)
+        self.ue_store.attach_many(
+            new_cells,
+            throughput=self.rng.uniform(10.0, 50.0, len(new_cells)),
+            sinr=self.sinr[new_cells] + self.rng.uniform(-3.0, 3.0, len(new_cells)),
+            timestamp=self.clock.now()
+        )
+        counts = self.ue_store.cell_counts[cells]
+        self._set_cell_values(cells, load=np.maximum(self.load[cells], np.minimum(100, counts)))
+        self.sync_aggregates(cells)
+        return len(new_cells)
+
+    def _set_cell_values(self, cell_indexes, load=None, sinr=None, rsrp=None):
+        """Write per-cell values into fresh arrays; published snapshots share the old ones"""
+        if load is not None:
+            self.load = self.load.copy()
+            self.load[cell_indexes] = load
+        if sinr is not None:
+            self.sinr = self.sinr.copy()
+            self.sinr[cell_indexes] = sinr
+        if rsrp is not None:
+            self.rsrp = self.rsrp.copy()
+            self.rsrp[cell_indexes] = rsrp
+
+    def sync_aggregates(self, cells: Optional[np.ndarray] = None):
+        """Fold per-cell changes into the running aggregates (call with `lock` held)"""
+        self.aggregates.sync(self.ue_store.cell_counts, self.load, self.sinr, self.rsrp,
+                             self.active, cells)
+
+    def tick(self) -> float:
+        """Advance the simulation by one tick and return its duration in milliseconds"""
+        started = time.perf_counter()
+        with self.lock:
+            self.clock.set_tick(self.tick_count + 1)
+            if self.before_tick:
+                self.before_tick(self.tick_count + 1)
+            self._advance()
+            self.tick_count += 1
+            if self.on_tick:
+                self.on_tick()
+
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        self.last_tick_ms = elapsed_ms
+        self.max_tick_ms = max(self.max_tick_ms, elapsed_ms)
+        self.total_tick_ms += elapsed_ms
+        return elapsed_ms
+
+    def _advance(self):
+        """Apply one tick of UE activity and RF jitter to the arrays"""
+        rng = self.rng
+        n = len(self.cell_ids)
+        counts = self.ue_store.cell_counts.copy()
+
+        # Attach/detach decisions for all cells at once
+        change = self.active & (rng.random(n) < CHANGE_PROBABILITY)
+        num_changes = rng.integers(1, MAX_CHANGES_PER_TICK + 1, n)
+        detach = change & (rng.random(n) < 0.5) & (counts > MIN_UES_FOR_DETACH)
+        attach = change & ~detach
+
+        num_detach = np.where(detach, np.minimum(num_changes, counts - MIN_UES_FOR_DETACH), 0)
+        num_attach = np.where(attach, np.clip(self.max_ues - counts, 0, num_changes), 0)
+
+        detach_cells = np.flatnonzero(num_detach)
+        self.ue_store.detach_newest_many(detach_cells, num_detach[detach_cells])
+
+        new_cells = np.repeat(np.arange(n), num_attach)
+        self.ue_store.attach_many(
+            new_cells,
+            throughput=rng.uniform(10.0, 50.0, len(new_cells)),
+            sinr=self.sinr[new_cells] + rng.uniform(-3.0, 3.0, len(new_cells)),
+            timestamp=self.clock.now()
+        )
+
+        # Load recomputation and RF jitter
+        counts = self.ue_store.cell_counts
+        load = np.minimum(100, counts)
+        stressed_load = np.clip(load + rng.integers(-5, 6, n), 80, 100)
+        load = np.where(self.stressed, stressed_load, load)
+
+        # Stressed cells random-walk from their last value, without the injected offset
+        stressed_sinr = np.clip(self.sinr - self.sinr_offset + rng.uniform(-1.5, 1.5, n), 6.0, 14.0)
+        normal_sinr = np.clip(NORMAL_SINR_DB + rng.uniform(-3.0, 3.0, n), 12.0, 25.0)
+        sinr = np.where(self.stressed, stressed_sinr, normal_sinr) + self.sinr_offset
+
+        rsrp = np.clip(self.rsrp + rng.uniform(-RSRP_JITTER_DB, RSRP_JITTER_DB, n),
+                       self.base_rsrp - RSRP_MAX_DRIFT_DB, self.base_rsrp + RSRP_MAX_DRIFT_DB)
+
+        # Only active cells evolve; DOWN cells keep their last reported values
+        self.load = np.where(self.active, load, self.load)
+        self.sinr = np.where(self.active, sinr, self.sinr)
+        self.rsrp = np.where(self.active, rsrp, self.rsrp)
+
+        self.sync_aggregates()
+
+    def fast_forward(self, ticks: int, budget_s: Optional[float] = None) -> Tuple[int, float]:
+        """Run up to `ticks` ticks back to back, as fast as possible
+
+        Stops early once `budget_s` seconds have passed (always running at least
+        one tick). Returns (ticks run, elapsed milliseconds).
+        """
+        started = time.perf_counter()
+        deadline = started + budget_s if budget_s is not None else None
+        ticks_run = 0
+        while ticks_run < ticks:
+            self.tick()
+            ticks_run += 1
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+        return ticks_run, (time.perf_counter() - started) * 1000.0
+
+    def run(self):
+        """Tick every `tick_period` seconds until stopped"""
+        next_tick = time.monotonic() + self.tick_period
+        while not self._stop.wait(max(0.0, next_tick - time.monotonic())):
+            elapsed_ms = self.tick()
+            next_tick += self.tick_period
+
+            if elapsed_ms > self.tick_period * 1000.0:
+                self.overruns += 1
+                logger.warning(f"Tick {self.tick_count} took {elapsed_ms:.1f} ms, "
+                               f"longer than the {self.tick_period}s tick period")
+                next_tick = time.monotonic()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> Dict:
+        """Tick timing statistics"""
+        return {
+            "tick_period_s": self.tick_period,
+            "tick_count": self.tick_count,
+            "last_tick_ms": round(self.last_tick_ms, 3),
+            "avg_tick_ms": round(self.total_tick_ms / self.tick_count, 3) if self.tick_count else 0.0,
+            "max_tick_ms": round(self.max_tick_ms, 3),
+            "overruns": self.overruns,
+            "cells": len(self.cell_ids),
+            "ues": len(self.ue_store)
+        }
@@ -0,0 +1,303 @@
+# Topology generator and loader for large-scale simulator scenarios
+# A topology is a list of site contexts plus a list of cell contexts, in the
+# same shape the simulator serves on /gnb/sites and /gnb/cells. A cell may
+# carry sinrOffset_dB, a persistent SINR shift (e.g. external interference)
+# that the tick engine keeps applying on top of its simulated SINR.
+
+from typing import Dict, List, Optional, Tuple
+import json
+import logging
+import os
+import string
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+Topology = Tuple[List[Dict], List[Dict]]
+
+# Site status and per-cell RF ranges for each failure pattern
+FAILURE_PATTERNS = {
+    "healthy": {
+        "status": "OPERATIONAL",
+        "load": (40, 80),
+        "averageSINR_dB": (15.0, 24.0),
+        "averageRSRP_dBm": (-85.0, -72.0),
+        "averageRSRQ_dB": (-10.0, -7.0)
+    },
+    # One cell loses its transport link; the remaining cells absorb its load
+    "transport_link_failure": {
+        "status": "DEGRADED",
+        "load": (85, 95),
+        "averageSINR_dB": (8.0, 12.0),
+        "averageRSRP_dBm": (-95.0, -88.0),
+        "averageRSRQ_dB": (-14.0, -11.0),
+        "down_cells": 1
+    },
+    "high_vswr": {
+        "status": "WARNING",
+        "load": (50, 70),
+        "averageSINR_dB": (12.0, 18.0),
+        "averageRSRP_dBm": (-90.0, -80.0),
+        "averageRSRQ_dB": (-12.0, -9.0)
+    },
+    # SINR stays in this range: each cell gets a persistent sinrOffset_dB
+    "interference": {
+        "status": "WARNING",
+        "load": (60, 80),
+        "averageSINR_dB": (4.0, 9.0),
+        "averageRSRP_dBm": (-88.0, -78.0),
+        "averageRSRQ_dB": (-16.0, -12.0),
+        "persistent_sinr": True
+    }
+}
+
+# SINR a healthy cell's jitter centres on
+NORMAL_SINR_DB = 18.0
+
+# RF values reported by a cell that is DOWN
+DOWN_CELL_VALUES = {
+    "load": 0,
+    "averageSINR_dB": -2.1,
+    "averageRSRP_dBm": -115.8,
+    "averageRSRQ_dB": -18.5
+}
+
+DEFAULT_CELL_VALUES = {
+    "bandwidth_MHz": 100,
+    "frequency_MHz": 3500
+}
+
+
+def generate_topology(num_sites: int, cells_per_site: int = 3, degraded_share: float = 0.0,
+                      failure_patterns: Optional[List[str]] = None,
+                      seed: Optional[int] = None) -> Topology:
+    """Generate a synthetic topology of `num_sites` x `cells_per_site` cells
+
+    A `degraded_share` fraction of the sites gets one of `failure_patterns`
+    (round-robin); the rest are healthy. All RF values are drawn in bulk.
+    """
+    if not 1 <= cells_per_site <= len(string.ascii_uppercase):
+        raise ValueError(f"cells_per_site must be between 1 and {len(string.ascii_uppercase)}")
+    if not 0.0 <= degraded_share <= 1.0:
+        raise ValueError("degraded_share must be between 0 and 1")
+
+    failure_patterns = failure_patterns or ["transport_link_failure", "high_vswr"]
+    unknown = [p for p in failure_patterns if p not in FAILURE_PATTERNS]
+    if unknown:
+        raise ValueError(f"Unknown failure patterns: {unknown}")
+
+    rng = np.random.default_rng(seed)
+    num_cells = num_sites * cells_per_site
+
+    # Pick the degraded sites and assign their patterns
+    site_patterns = np.full(num_sites, "healthy", dtype=object)
+    num_degraded = int(round(num_sites * degraded_share))
+    degraded_sites = rng.choice(num_sites, size=num_degraded, replace=False)
+    site_patterns[np.sort(degraded_sites)] = [
+        failure_patterns[i % len(failure_patterns)] for i in range(num_degraded)
+    ]
+    cell_patterns = np.repeat(site_patterns, cells_per_site)
+    sector = np.tile(np.arange(cells_per_site), num_sites)
+
+    # Draw every RF column in bulk, pattern by pattern
+    columns = {
+        "load": np.zeros(num_cells, dtype=np.int64),
+        "averageSINR_dB": np.zeros(num_cells),
+        "averageRSRP_dBm": np.zeros(num_cells),
+        "averageRSRQ_dB": np.zeros(num_cells)
+    }
+    cell_states = np.full(num_cells, "ACTIVE", dtype=object)
+    sinr_offsets = np.zeros(num_cells)
+
+    for name, pattern in FAILURE_PATTERNS.items():
+        mask = cell_patterns == name
+        count = int(mask.sum())
+        if not count:
+            continue
+        low, high = pattern["load"]
+        columns["load"][mask] = rng.integers(low, high + 1, count)
+        for field in ("averageSINR_dB", "averageRSRP_dBm", "averageRSRQ_dB"):
+            columns[field][mask] = rng.uniform(*pattern[field], count)
+        if pattern.get("persistent_sinr"):
+            sinr_offsets[mask] = columns["averageSINR_dB"][mask] - NORMAL_SINR_DB
+
+        # The first `down_cells` sectors of affected sites are DOWN
+        down = mask & (sector < pattern.get("down_cells", 0))
+        cell_states[down] = "DOWN"
+        for field, value in DOWN_CELL_VALUES.items():
+            columns[field][down] = value
+
+    site_ids = [f"SITE-{n:03d}" for n in range(1, num_sites + 1)]
+    letters = string.ascii_uppercase[:cells_per_site]
+    cell_ids = [f"CELL-{n}{letter}" for n in range(1, num_sites + 1) for letter in letters]
+    cell_site_ids = np.repeat(site_ids, cells_per_site).tolist()
+    pci = ((np.arange(num_cells) + 1) % 504).tolist()
+
+    sites = [
+        {
+            "siteId": site_id,
+            "siteName": f"Synthetic Site {n}",
+            "status": FAILURE_PATTERNS[pattern]["status"],
+            "gnbId": f"gnb{n:03d}",
+            "cells": cell_ids[(n - 1) * cells_per_site:n * cells_per_site]
+        }
+        for n, (site_id, pattern) in enumerate(zip(site_ids, site_patterns.tolist()), start=1)
+    ]
+
+    cells = [
+        {
+            "cellId": cell_id,
+            "siteId": site_id,
+            "sector": f"Sector {cell_id[-1]}",
+            "cellState": state,
+            "connectedUes": [],
+            "load": load,
+            "averageSINR_dB": sinr,
+            "averageRSRP_dBm": rsrp,
+            "averageRSRQ_dB": rsrq,
+            "pci": cell_pci,
+            **DEFAULT_CELL_VALUES,
+            **({"sinrOffset_dB": offset} if offset else {})
+        }
+        for cell_id, site_id, state, load, sinr, rsrp, rsrq, cell_pci, offset in zip(
+            cell_ids, cell_site_ids, cell_states.tolist(),
+            columns["load"].tolist(), columns["averageSINR_dB"].tolist(),
+            columns["averageRSRP_dBm"].tolist(), columns["averageRSRQ_dB"].tolist(), pci,
+            sinr_offsets.tolist()
+        )
+    ]
+
+    logger.info(f"Generated topology: {num_sites} sites, {num_cells} cells, "
+                f"{num_degraded} degraded sites ({', '.join(failure_patterns)})")
+    return sites, cells
+
+
+def _complete_cell(cell: Dict) -> Dict:
+    """Fill in fields a topology file may omit"""
+    completed = {
+        "sector": f"Sector {cell['cellId'][-1]}",
+        "cellState": "ACTIVE",
+        **DEFAULT_CELL_VALUES,
+        **cell,
+        "connectedUes": []
+    }
+    if completed["cellState"] == "DOWN":
+        for field, value in DOWN_CELL_VALUES.items():
+            completed.setdefault(field, value)
+    else:
+        healthy = FAILURE_PATTERNS["healthy"]
+        completed.setdefault("load", int(np.mean(healthy["load"])))
+        for field in ("averageSINR_dB", "averageRSRP_dBm", "averageRSRQ_dB"):
+            completed.setdefault(field, float(np.mean(healthy[field])))
+    completed.setdefault("pci", 0)
+    return completed
+
+
+def _topology_from_rows(rows: List[Dict]) -> Topology:
+    """Build a topology from flat per-cell rows (siteId, cellId, optional site fields)"""
+    sites: Dict[str, Dict] = {}
+    cells = []
+    for row in rows:
+        # Drop missing values (None, or NaN from Parquet) so defaults apply
+        row = {k: v for k, v in row.items() if v is not None and v == v}
+        site_id = row["siteId"]
+        site = sites.get(site_id)
+        if site is None:
+            site = sites[site_id] = {
+                "siteId": site_id,
+                "siteName": row.pop("siteName", site_id),
+                "status": row.pop("siteStatus", "OPERATIONAL"),
+                "gnbId": row.pop("gnbId", f"gnb-{site_id.lower()}"),
+                "cells": []
+            }
+        else:
+            for field in ("siteName", "siteStatus", "gnbId"):
+                row.pop(field, None)
+        site["cells"].append(row["cellId"])
+        cells.append(_complete_cell(row))
+    return list(sites.values()), cells
+
+
+def _topology_from_document(document: Dict) -> Topology:
+    """Build a topology from a parsed JSON/YAML scenario document
+
+    The document either describes the topology explicitly, as nested
+    `sites[].cells[]` objects, or asks for a synthetic one with a
+    `generate: {sites, cells_per_site, degraded_share, failure_patterns, seed}` block.
+    """
+    if "generate" in document:
+        spec = document["generate"]
+        return generate_topology(
+            num_sites=int(spec["sites"]),
+            cells_per_site=int(spec.get("cells_per_site", 3)),
+            degraded_share=float(spec.get("degraded_share", 0.0)),
+            failure_patterns=spec.get("failure_patterns"),
+            seed=spec.get("seed")
+        )
+
+    rows = []
+    for site in document.get("sites", []):
+        site_fields = {
+            "siteId": site["siteId"],
+            "siteName": site.get("siteName"),
+            "siteStatus": site.get("status"),
+            "gnbId": site.get("gnbId")
+        }
+        for cell in site.get("cells", []):
+            if isinstance(cell, str):
+                cell = {"cellId": cell}
+            rows.append({**cell, **site_fields})
+    return _topology_from_rows(rows)
+
+
+def load_topology(path: str) -> Topology:
+    """Load a topology from a JSON, YAML or Parquet scenario file"""
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == ".parquet":
+        try:
+            import pandas as pd
+        except ImportError as e:
+            raise RuntimeError("Loading Parquet topologies requires pandas and pyarrow") from e
+        frame = pd.read_parquet(path)
+        return _topology_from_rows(frame.to_dict(orient="records"))
+
+    with open(path, 'r') as f:
+        if extension in (".yaml", ".yml"):
+            try:
+                import yaml
+            except ImportError as e:
+                raise RuntimeError("Loading YAML topologies requires PyYAML") from e
+            document = yaml.safe_load(f)
+        else:
+            document = json.load(f)
+
+    return _topology_from_document(document)
+
+
+def topology_from_env() -> Optional[Topology]:
+    """Build the topology requested by environment variables, if any
+
+    SIM_TOPOLOGY_FILE loads a scenario file; otherwise SIM_SITES (with
+    SIM_CELLS_PER_SITE, SIM_DEGRADED_SHARE, SIM_FAILURE_PATTERNS and
+    SIM_TOPOLOGY_SEED, defaulting to SIM_SEED) generates a synthetic one. Returns None for the
+    built-in demo topology.
+    """
+    topology_file = os.environ.get('SIM_TOPOLOGY_FILE')
+    if topology_file:
+        return load_topology(topology_file)
+
+    num_sites = os.environ.get('SIM_SITES')
+    if num_sites:
+        patterns = os.environ.get('SIM_FAILURE_PATTERNS')
+        seed = os.environ.get('SIM_TOPOLOGY_SEED') or os.environ.get('SIM_SEED')
+        return generate_topology(
+            num_sites=int(num_sites),
+            cells_per_site=int(os.environ.get('SIM_CELLS_PER_SITE', '3')),
+            degraded_share=float(os.environ.get('SIM_DEGRADED_SHARE', '0.05')),
+            failure_patterns=patterns.split(',') if patterns else None,
+            seed=int(seed) if seed else None
+        )
+
+    return None
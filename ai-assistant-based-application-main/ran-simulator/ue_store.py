@@ -0,0 +1,429 @@
+# Columnar UE context store for the gNodeB simulator
+# Keeps UE attributes in NumPy arrays instead of one dict per UE, with
+# secondary indexes by cell and site so filtered lookups cost O(result)
+#
+# Concurrency model: a single writer (the tick engine, under the simulator's
+# state lock) mutates the store; readers only ever use a UESnapshot. Per-cell
+# indexes are immutable tuples that are replaced rather than modified, live
+# rows are never rewritten, and a freed slot is only reused once no snapshot
+# that could still read it is alive, so a snapshot stays consistent without
+# copying the UE columns.
+
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import time
+import weakref
+
+import numpy as np
+
+UE_STATES = ["CONNECTED", "IDLE"]
+UE_STATE_CODES = {state: code for code, state in enumerate(UE_STATES)}
+
+# Fields of a rendered UE context, selectable with `fields=` projection
+UE_FIELDS = ["ranUeNgapId", "ueState", "cellId", "siteId", "pduSessions",
+             "lastActivity", "throughput_Mbps", "sinr_dB"]
+
+# Server-side filters: query parameter -> (column attribute, comparison)
+UE_FILTERS = {
+    "sinr_lt": ("_sinr", np.less),
+    "sinr_gt": ("_sinr", np.greater),
+    "throughput_lt": ("_throughput", np.less),
+    "throughput_gt": ("_throughput", np.greater)
+}
+
+
+class UEStore:
+    """UE contexts stored column-wise, indexed by ranUeNgapId, cellId and siteId"""
+
+    def __init__(self, capacity: int = 4096):
+        self._capacity = capacity
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._cells = np.full(capacity, -1, dtype=np.int32)
+        self._states = np.zeros(capacity, dtype=np.int8)
+        self._pdu_sessions = np.zeros(capacity, dtype=np.int16)
+        self._last_activity = np.zeros(capacity, dtype=np.float64)
+        self._throughput = np.zeros(capacity, dtype=np.float32)
+        self._sinr = np.zeros(capacity, dtype=np.float32)
+
+        self._high_water = 0          # slots [0, high_water) have been used at least once
+        self._free_slots: List[int] = []
+        # Slots freed since each snapshot: (epoch of the last snapshot that shows them, slots)
+        self._retired: deque = deque([(0, [])])
+        # (epoch, weak reference) of every published snapshot that may still be alive
+        self._snapshots: deque = deque()
+        self._epoch = 0
+        self._slot_by_id: Dict[int, int] = {}
+        self._next_id = 1
+        self._state_counts = np.zeros(len(UE_STATES), dtype=np.int64)
+
+        # Secondary indexes: per-cell tuple of UE slots (in ranUeNgapId order,
+        # since ids are allocated monotonically) and per-site list of cell indexes
+        self._cell_ids: List[str] = []
+        self._cell_sites: List[str] = []
+        self._cell_index: Dict[str, int] = {}
+        self._slots_by_cell: List[Tuple[int, ...]] = []
+        self._cells_by_site: Dict[str, List[int]] = {}
+        self._cell_counts = np.zeros(64, dtype=np.int64)
+
+    # ------------------------------------------------------------------
+    # Topology registration
+    # ------------------------------------------------------------------
+
+    def register_cell(self, cell_id: str, site_id: str) -> int:
+        """Register a cell and return its index"""
+        if cell_id in self._cell_index:
+            return self._cell_index[cell_id]
+
+        idx = len(self._cell_ids)
+        self._cell_ids.append(cell_id)
+        self._cell_sites.append(site_id)
+        self._cell_index[cell_id] = idx
+        self._slots_by_cell.append(())
+        self._cells_by_site.setdefault(site_id, []).append(idx)
+        if idx >= len(self._cell_counts):
+            self._cell_counts = np.concatenate((self._cell_counts, np.zeros_like(self._cell_counts)))
+        return idx
+
+    def cell_index(self, cell_id: str) -> Optional[int]:
+        """Return the internal index of a registered cell"""
+        return self._cell_index.get(cell_id)
+
+    @property
+    def cell_ids(self) -> List[str]:
+        """Cell ids in index order"""
+        return self._cell_ids
+
+    @property
+    def num_cells(self) -> int:
+        return len(self._cell_ids)
+
+    @property
+    def cell_counts(self) -> np.ndarray:
+        """Connected UE count per cell index (read-only view)"""
+        view = self._cell_counts[:len(self._cell_ids)]
+        view.flags.writeable = False
+        return view
+
+    # ------------------------------------------------------------------
+    # Attach / detach
+    # ------------------------------------------------------------------
+
+    def next_id(self) -> int:
+        """Reserve and return the next RAN UE NGAP ID"""
+        ue_id = self._next_id
+        self._next_id += 1
+        return ue_id
+
+    def _allocate_slots(self, count: int) -> np.ndarray:
+        """Take `count` slots, reusing freed slots before growing the arrays"""
+        reused = self._free_slots[-count:] if count else []
+        if reused:
+            del self._free_slots[-len(reused):]
+        fresh = count - len(reused)
+
+        if self._high_water + fresh > self._capacity:
+            self._grow(self._high_water + fresh)
+
+        slots = np.empty(count, dtype=np.int64)
+        slots[:len(reused)] = reused
+        slots[len(reused):] = np.arange(self._high_water, self._high_water + fresh)
+        self._high_water += fresh
+        return slots
+
+    def _grow(self, minimum: int):
+        """Grow every column to hold at least `minimum` slots
+
+        New arrays are allocated rather than resized in place, so snapshots
+        keep reading the columns they were taken from.
+        """
+        capacity = self._capacity
+        while capacity < minimum:
+            capacity *= 2
+
+        def grown(column: np.ndarray, fill) -> np.ndarray:
+            new_column = np.full(capacity, fill, dtype=column.dtype)
+            new_column[:self._capacity] = column
+            return new_column
+
+        self._ids = grown(self._ids, 0)
+        self._cells = grown(self._cells, -1)
+        self._states = grown(self._states, 0)
+        self._pdu_sessions = grown(self._pdu_sessions, 0)
+        self._last_activity = grown(self._last_activity, 0.0)
+        self._throughput = grown(self._throughput, 0.0)
+        self._sinr = grown(self._sinr, 0.0)
+        self._capacity = capacity
+
+    def attach_many(self, cell_indexes: np.ndarray, throughput: np.ndarray,
+                    sinr: np.ndarray, pdu_sessions: int = 1,
+                    timestamp: Optional[float] = None) -> np.ndarray:
+        """Attach one UE per entry of `cell_indexes` and return the new UE ids"""
+        cell_indexes = np.asarray(cell_indexes, dtype=np.int32)
+        count = len(cell_indexes)
+        if count == 0:
+            return np.empty(0, dtype=np.int64)
+
+        ids = np.arange(self._next_id, self._next_id + count, dtype=np.int64)
+        self._next_id += count
+        slots = self._allocate_slots(count)
+
+        self._ids[slots] = ids
+        self._cells[slots] = cell_indexes
+        self._states[slots] = UE_STATE_CODES["CONNECTED"]
+        self._pdu_sessions[slots] = pdu_sessions
+        self._last_activity[slots] = timestamp if timestamp is not None else time.time()
+        self._throughput[slots] = throughput
+        self._sinr[slots] = sinr
+        self._state_counts[UE_STATE_CODES["CONNECTED"]] += count
+        self._cell_counts[:self.num_cells] += np.bincount(cell_indexes, minlength=self.num_cells)
+
+        self._slot_by_id.update(zip(ids.tolist(), slots.tolist()))
+
+        # Group the new slots by cell; a stable sort keeps them in id order per cell
+        order = np.argsort(cell_indexes, kind="stable")
+        sorted_cells = cell_indexes[order]
+        sorted_slots = slots[order].tolist()
+        boundaries = np.flatnonzero(np.diff(sorted_cells)) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [count]))
+        slots_by_cell = self._slots_by_cell
+        for cell, start, end in zip(sorted_cells[starts].tolist(), starts.tolist(), ends.tolist()):
+            slots_by_cell[cell] = slots_by_cell[cell] + tuple(sorted_slots[start:end])
+
+        return ids
+
+    def attach(self, cell_id: str, throughput: float, sinr: float, pdu_sessions: int = 1) -> int:
+        """Attach a single UE to a cell and return its RAN UE NGAP ID"""
+        ids = self.attach_many(np.array([self._cell_index[cell_id]]),
+                               np.array([throughput]), np.array([sinr]), pdu_sessions)
+        return int(ids[0])
+
+    def _release(self, slots: List[int]):
+        """Retire slots that were already removed from the cell index"""
+        if not slots:
+            return
+        slot_array = np.asarray(slots, dtype=np.int64)
+        for ue_id in self._ids[slot_array].tolist():
+            del self._slot_by_id[ue_id]
+        self._state_counts -= np.bincount(self._states[slot_array], minlength=len(UE_STATES))
+        self._cell_counts[:self.num_cells] -= np.bincount(self._cells[slot_array], minlength=self.num_cells)
+        self._cells[slot_array] = -1
+        self._retired[-1][1].extend(slots)
+
+    def detach(self, ue_id: int) -> bool:
+        """Detach a UE by RAN UE NGAP ID"""
+        slot = self._slot_by_id.get(ue_id)
+        if slot is None:
+            return False
+        cell = int(self._cells[slot])
+        self._slots_by_cell[cell] = tuple(s for s in self._slots_by_cell[cell] if s != slot)
+        self._release([slot])
+        return True
+
+    def detach_newest_many(self, cell_indexes: np.ndarray, counts: np.ndarray) -> int:
+        """Detach the newest `counts[i]` UEs of each cell in `cell_indexes`"""
+        removed: List[int] = []
+        slots_by_cell = self._slots_by_cell
+        for cell_index, count in zip(np.asarray(cell_indexes).tolist(), np.asarray(counts).tolist()):
+            if count <= 0:
+                continue
+            cell_slots = slots_by_cell[cell_index]
+            removed.extend(cell_slots[-count:])
+            slots_by_cell[cell_index] = cell_slots[:-count]
+        self._release(removed)
+        return len(removed)
+
+    def detach_newest(self, cell_index: int, count: int) -> int:
+        """Detach the `count` most recently attached UEs of a cell"""
+        return self.detach_newest_many([cell_index], [count])
+
+    def detach_cell(self, cell_index: int) -> int:
+        """Detach every UE served by a cell"""
+        return self.detach_newest(cell_index, len(self._slots_by_cell[cell_index]))
+
+    # ------------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._slot_by_id)
+
+    def __contains__(self, ue_id: int) -> bool:
+        return ue_id in self._slot_by_id
+
+    def snapshot(self) -> "UESnapshot":
+        """Capture a consistent, read-only view and start a new reclamation epoch
+
+        Slots freed after snapshot N are still readable through snapshot N and
+        older ones; they become reusable once all of those have been dropped,
+        however long a reader (fast-forward, slow SSE consumer) holds on.
+        """
+        self._epoch += 1
+        snapshot = UESnapshot(self)
+        self._snapshots.append((self._epoch, weakref.ref(snapshot)))
+        self._retired.append((self._epoch, []))
+
+        self._snapshots = deque((epoch, ref) for epoch, ref in self._snapshots if ref() is not None)
+        oldest_live = self._snapshots[0][0]
+        while self._retired[0][0] < oldest_live:
+            self._free_slots.extend(self._retired.popleft()[1])
+        return snapshot
+
+
+class UESnapshot:
+    """Read-only view of the UE store at a point in time"""
+
+    def __init__(self, store: UEStore):
+        num_cells = store.num_cells
+        self._slots_by_cell = list(store._slots_by_cell)
+        self._cell_counts = store._cell_counts[:num_cells].copy()
+        self._state_counts = store._state_counts.copy()
+        self._total = len(store)
+        self._live_cells = store._cells[:store._high_water].copy()
+
+        # Topology indexes only grow, so sharing them is safe
+        self._cell_ids = store._cell_ids[:num_cells]
+        self._cell_sites = store._cell_sites[:num_cells]
+        self._cell_index = store._cell_index
+        self._cells_by_site = store._cells_by_site
+
+        # Columns of live slots are never rewritten while this snapshot can be read
+        self._ids = store._ids
+        self._states = store._states
+        self._pdu_sessions = store._pdu_sessions
+        self._last_activity = store._last_activity
+        self._throughput = store._throughput
+        self._sinr = store._sinr
+
+    def __len__(self) -> int:
+        return self._total
+
+    def count_by_state(self, state: str) -> int:
+        return int(self._state_counts[UE_STATE_CODES[state]])
+
+    def cell_index(self, cell_id: str) -> Optional[int]:
+        return self._cell_index.get(cell_id)
+
+    @property
+    def cell_ids(self) -> List[str]:
+        """Cell ids in index order"""
+        return self._cell_ids
+
+    @property
+    def cell_counts(self) -> np.ndarray:
+        """Connected UE count per cell index"""
+        return self._cell_counts
+
+    def _site_cells(self, site_id: str) -> List[int]:
+        return [idx for idx in self._cells_by_site.get(site_id, []) if idx < len(self._slots_by_cell)]
+
+    def count_cell(self, cell_id: str) -> int:
+        idx = self._cell_index.get(cell_id)
+        return int(self._cell_counts[idx]) if idx is not None and idx < len(self._cell_counts) else 0
+
+    def count_site(self, site_id: str) -> int:
+        return int(sum(self._cell_counts[idx] for idx in self._site_cells(site_id)))
+
+    def cell_slots(self, cell_id: str) -> np.ndarray:
+        """Slots of the UEs served by a cell, in ranUeNgapId order"""
+        idx = self._cell_index.get(cell_id)
+        if idx is None or idx >= len(self._slots_by_cell):
+            return np.empty(0, dtype=np.int64)
+        return np.array(self._slots_by_cell[idx], dtype=np.int64)
+
+    def site_slots(self, site_id: str) -> np.ndarray:
+        """Slots of the UEs served by any cell of a site, in ranUeNgapId order"""
+        slots = np.fromiter(
+            (slot for idx in self._site_cells(site_id) for slot in self._slots_by_cell[idx]),
+            dtype=np.int64
+        )
+        return slots[np.argsort(self._ids[slots], kind="stable")]
+
+    def all_slots(self, limit: Optional[int] = None) -> np.ndarray:
+        """Slots of all UEs in ranUeNgapId order, or only the first `limit` of them"""
+        slots = np.flatnonzero(self._live_cells >= 0)
+        ids = self._ids[slots]
+        if limit is not None and limit < len(slots):
+            nearest = np.argpartition(ids, limit)[:limit]
+            slots, ids = slots[nearest], ids[nearest]
+        return slots[np.argsort(ids, kind="stable")]
+
+    def page(self, slots: Optional[np.ndarray] = None, after: Optional[int] = None,
+             limit: int = 100, filters: Optional[Dict[str, float]] = None) -> Tuple[np.ndarray, int, bool]:
+        """One page of UE slots in ranUeNgapId order
+
+        `slots` restricts the candidates (all live UEs if None), `after` is the
+        ranUeNgapId cursor of the previous page and `filters` maps UE_FILTERS
+        names to thresholds. Returns (page slots, total matches, more pages).
+        Only the page itself is sorted and materialized.
+        """
+        if slots is None:
+            slots = np.flatnonzero(self._live_cells >= 0)
+        ids = self._ids[slots]
+
+        if filters:
+            mask = np.ones(len(slots), dtype=bool)
+            for name, threshold in filters.items():
+                column, compare = UE_FILTERS[name]
+                mask &= compare(getattr(self, column)[slots], threshold)
+            slots, ids = slots[mask], ids[mask]
+        total = len(slots)
+
+        if after is not None:
+            remaining = ids > after
+            slots, ids = slots[remaining], ids[remaining]
+
+        has_more = len(slots) > limit
+        if has_more:
+            nearest = np.argpartition(ids, limit)[:limit]
+            slots, ids = slots[nearest], ids[nearest]
+        return slots[np.argsort(ids, kind="stable")], total, has_more
+
+    def digest_into(self, hasher):
+        """Feed every live UE, in ranUeNgapId order, into a hashlib hasher"""
+        slots = self.all_slots()
+        for column in (self._ids, self._live_cells, self._states, self._pdu_sessions,
+                       self._last_activity, self._throughput, self._sinr):
+            hasher.update(np.ascontiguousarray(column[slots]).tobytes())
+
+    def cell_slot_tuple(self, cell_index: int) -> Tuple[int, ...]:
+        """The immutable slot tuple of a cell; unchanged cells share it across snapshots"""
+        return self._slots_by_cell[cell_index]
+
+    def ue_ids(self, slots) -> List[int]:
+        return self._ids[np.asarray(slots, dtype=np.int64)].tolist()
+
+    def cell_ue_ids(self, cell_id: str) -> List[int]:
+        """UE ids served by a cell, in ranUeNgapId order"""
+        return self._ids[self.cell_slots(cell_id)].tolist()
+
+    def to_dicts(self, slots: np.ndarray, fields: Optional[List[str]] = None) -> List[Dict]:
+        """Materialize UE contexts as dicts, in the order given, optionally projected to `fields`"""
+        if len(slots) == 0:
+            return []
+
+        ues = [
+            {
+                "ranUeNgapId": ue_id,
+                "ueState": UE_STATES[state],
+                "cellId": self._cell_ids[cell],
+                "siteId": self._cell_sites[cell],
+                "pduSessions": pdu_sessions,
+                "lastActivity": datetime.utcfromtimestamp(last_activity).isoformat(),
+                "throughput_Mbps": throughput,
+                "sinr_dB": sinr
+            }
+            for ue_id, state, cell, pdu_sessions, last_activity, throughput, sinr in zip(
+                self._ids[slots].tolist(),
+                self._states[slots].tolist(),
+                self._live_cells[slots].tolist(),
+                self._pdu_sessions[slots].tolist(),
+                self._last_activity[slots].tolist(),
+                self._throughput[slots].tolist(),
+                self._sinr[slots].tolist()
+            )
+        ]
+        if fields:
+            ues = [{field: ue[field] for field in fields} for ue in ues]
+        return ues